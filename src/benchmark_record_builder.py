@@ -0,0 +1,89 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# benchmark_record_builder
+#
+# Program for timing how long it takes to build the collected data arrays from synthetic logs
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for building the arrays of data collected from logs
+from log_records import RecordBuilder, log_record_columns, players_per_log, stats_per_log
+# used for making the old way of building the arrays to compare against
+import numpy as np
+# used for timing how long building the arrays takes
+import time
+
+# returns a list of synthetic rows that look like the data collected from logs
+# only a few different rows are made and then reused so making them doesn't take longer than building the arrays
+def make_rows(count=64):
+	rows = []
+	for i in range(count):
+		rows.append({
+			"used_logs": str(2600000 + i),
+			"players": [100000000 + i * players_per_log + j for j in range(players_per_log)],
+			"gamemodes": 0,
+			"maps": i % 8,
+			"timestamps": 1650000000 + i * 86400,
+			"scores": [i % 6, (i + 3) % 6],
+			"stats": list(range(i, i + stats_per_log))
+		})
+	return rows
+
+# returns how many seconds it takes to build the arrays of n_logs logs with a RecordBuilder
+def time_record_builder(n_logs, rows):
+	start = time.perf_counter()
+	records = RecordBuilder()
+	for i in range(n_logs):
+		records.append(**rows[i % len(rows)])
+	records.finalize()
+	return time.perf_counter() - start
+
+# returns how many seconds it takes to build the arrays of n_logs logs with np.vstack() like fetch_log_data() used to
+def time_vstack(n_logs, rows):
+	start = time.perf_counter()
+	columns = {name: np.empty((0, width), int) for name, (_, width) in log_record_columns.items() if name != "used_logs"}
+	columns["used_logs"] = np.array([], dtype=str)
+	for i in range(n_logs):
+		row = rows[i % len(rows)]
+		columns["used_logs"] = np.append(columns["used_logs"], row["used_logs"])
+		for name in columns:
+			if name != "used_logs":
+				columns[name] = np.vstack((columns[name], row[name]))
+	return time.perf_counter() - start
+
+# if this is being run as its own program to time building the arrays
+if __name__ == "__main__":
+	import sys
+
+	# largest number of logs to time (1 million by default)
+	max_logs = 1000000
+	# largest number of logs to time the old np.vstack() way with (it's quadratic so it gets slow fast)
+	max_vstack_logs = 20000
+	if len(sys.argv) > 1:
+		try:
+			max_logs = int(sys.argv[1])
+		except ValueError:
+			print("ERROR: First argument must be a positive integer.")
+			exit(2)
+		if max_logs < 1:
+			print("ERROR: First argument must be a positive integer.")
+			exit(2)
+
+	rows = make_rows()
+	print(f"{'Logs':>10} {'RecordBuilder (s)':>18} {'us / log':>9} {'np.vstack (s)':>14} {'us / log':>9}")
+	n_logs = 1000
+	while n_logs <= max_logs:
+		builder_time = time_record_builder(n_logs, rows)
+		line = f"{n_logs:>10} {builder_time:>18.3f} {builder_time / n_logs * 1e6:>9.2f}"
+		if n_logs <= max_vstack_logs:
+			vstack_time = time_vstack(n_logs, rows)
+			line += f" {vstack_time:>14.3f} {vstack_time / n_logs * 1e6:>9.2f}"
+		print(line)
+		n_logs *= 10
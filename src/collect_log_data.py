@@ -21,21 +21,52 @@ from decouple import config
 # pip install beautifulsoup4 / conda install beautifulsoup4
 from bs4 import BeautifulSoup
 # used for getting data from web pages
-from urllib.request import urlopen
+from http_client import HttpClient, HttpError
 # used for getting around needing to verify logs.tf's ssl certificate to get data from the website
 import ssl
 # used for getting json data from logs.tf and turning into a python dictionary
 import json
+# used for compressing cached logs
+import gzip
 # used for handling date data from match logs
 from datetime import datetime
 # used for making sure files and folders exist
 import os
+# used for fetching multiple logs at the same time
+from concurrent.futures import ThreadPoolExecutor
+# used for keeping fetched logs in order while they are being downloaded and counting rejected logs
+from collections import deque, Counter
+# used for naming temporary files uniquely between threads
+import threading
+# used for checking how long ago steam profile urls were resolved
+import time
 # used for changing the time zone of the retrieved match times
 import pytz
 # used for putting data into arrays to be fed into the goblin
 import numpy as np
 # used for outputting data to a csv file
 import pandas as pd
+# used for building the arrays of data collected from logs
+from log_records import RecordBuilder, new_vocabularies, sid3_to_account_id, account_id_to_sid3, weekday_codes,\
+	weekday_names, log_date_columns, players_per_log
+# used for checking that logs are valid and extracting data from them
+from log_validator import parse_log_records, rejection_reasons, player_list_rejections
+# used for saving progress while collecting data from logs
+from fetch_checkpoint import FetchCheckpoint
+# used for storing the data collected from logs
+from log_dataset import store_dataset, load_dataset, dataset_exists, read_vocabularies, append_npy
+# used for storing matches in a database that can be queried
+from match_store import MatchStore
+# used for encoding players, gamemodes, and maps the same way when training and predicting
+from feature_encoders import fit_log_encoders, scale_codes, store_encoders, read_encoders, FeatureScaler
+# used for adding the form of each player going into each match to the prepared data
+from player_form import get_player_form, get_form_scaler, get_form_inputs
+# used for adding the rating of each player going into each match to the prepared data
+from player_ratings import get_player_ratings, get_rating_inputs
+# used for adding how well the players on each team have done together and against each other to the inputs
+from player_synergy import get_player_synergy, get_synergy_scaler, get_synergy_inputs
+# used for storing the lineups as sparse columns that training can use instead of the scalar player inputs
+from lineup_encoding import get_lineup_columns, canonicalize_lineups, get_mirror_columns, store_columns
 
 # name of data folder
 data_path = "../data"
@@ -50,21 +81,54 @@ log_data_file = "logs"
 sid3s_data_file = "SteamID3s"
 # name of data file containing log ids of valid logs that will be used
 used_logs_file = "used_logs"
-
-# names of input data files
+# name of data file containing log ids of invalid logs and why they weren't used
+rejected_logs_file = "rejected_logs"
+# name of data file containing the newest log id that has been collected from each player
+watermarks_data_file = "watermarks"
+# name of data file containing the steam ids that steam profile urls were resolved to
+steam_ids_data_file = "steam_ids"
+
+# name of folder of the dataset of data collected from logs
+dataset_folder = "dataset"
+# name of the sqlite database of matches that can be queried by player, map, and date
+match_store_file = "matches.sqlite"
+
+# names of input data files (only used for exporting the dataset to csv files and converting old data)
 player_data_file = "players"
 gamemode_data_file = "gamemodes"
 maps_data_file = "maps"
 dates_data_file = "dates"
 weekdays_data_file = "weekdays"
 
-# names of output data files
+# names of output data files (only used for exporting the dataset to csv files and converting old data)
 scores_data_file = "scores"
 stats_data_file = "stats"
 
 # names of data files that have been prepared to be fed into the goblin
 inputs_data_file = "raw_inputs"
 outputs_data_file = "raw_outputs"
+# names of binary files of the prepared data that training reads
+inputs_matrix_file = "inputs"
+outputs_matrix_file = "outputs"
+# name of the binary file of the sparse lineup columns of the prepared data (see lineup_encoding.py)
+lineups_matrix_file = "lineups"
+# name of the binary file of the input column that each input column comes from when red and blu are swapped
+mirror_matrix_file = "input_mirror"
+# name of the binary file of the stats of each match in the same slot order as the prepared inputs
+stats_matrix_file = "prepared_stats"
+# binary file extension
+matrix_ext = ".npy"
+# time zone that match dates are in (the standard time zone for tf2 in na)
+match_timezone = "US/Eastern"
+# name of the file of the encoders that the prepared data was encoded with
+encoders_file = "encoders.json"
+
+# name of folder that raw log json files get cached in
+log_cache_folder = "log_cache"
+# name of folder that the progress of collecting data from logs gets saved in
+checkpoint_folder = "fetch_checkpoint"
+# file extension of cached logs
+log_cache_ext = ".json.gz"
 
 # path to steam profile data file
 profile_data_path = f"{data_path}/{profile_data_file}{file_ext}"
@@ -74,6 +138,17 @@ log_data_path = f"{data_path}/{log_data_file}{file_ext}"
 sid3_data_path = f"{data_path}/{sid3s_data_file}{file_ext}"
 # path to used logs data file
 used_logs_path = f"{data_path}/{used_logs_file}{file_ext}"
+# path to rejected logs data file
+rejected_logs_path = f"{data_path}/{rejected_logs_file}{file_ext}"
+# path to watermarks data file
+watermarks_data_path = f"{data_path}/{watermarks_data_file}{file_ext}"
+# path to resolved steam ids data file
+steam_ids_data_path = f"{data_path}/{steam_ids_data_file}{file_ext}"
+
+# path to dataset folder
+dataset_path = f"{data_path}/{dataset_folder}"
+# path to match store database
+match_store_path = f"{data_path}/{match_store_file}"
 
 # paths to input data files
 player_data_path = f"{data_path}/{player_data_file}{file_ext}"
@@ -89,16 +164,96 @@ stats_data_path = f"{data_path}/{stats_data_file}{file_ext}"
 # paths to data files that have been prepared to be fed into the goblin
 inputs_data_path = f"{data_path}/{inputs_data_file}{file_ext}"
 outputs_data_path = f"{data_path}/{outputs_data_file}{file_ext}"
+inputs_matrix_path = f"{data_path}/{inputs_matrix_file}{matrix_ext}"
+outputs_matrix_path = f"{data_path}/{outputs_matrix_file}{matrix_ext}"
+lineups_matrix_path = f"{data_path}/{lineups_matrix_file}{matrix_ext}"
+mirror_matrix_path = f"{data_path}/{mirror_matrix_file}{matrix_ext}"
+stats_matrix_path = f"{data_path}/{stats_matrix_file}{matrix_ext}"
+encoders_path = f"{data_path}/{encoders_file}"
+
+# path to folder of cached raw logs
+log_cache_path = f"{data_path}/{log_cache_folder}"
+# path to folder of saved progress
+checkpoint_path = f"{data_path}/{checkpoint_folder}"
+
+# column headers of the data files
+used_logs_header = ["Log ID"]
+player_header = [\
+	"Red Scout 1", "Red Scout 2", "Red Soldier 1", "Red Soldier 2", "Red Demo", "Red Medic",\
+	"Blu Scout 1", "Blu Scout 2", "Blu Soldier 1", "Blu Soldier 2", "Blu Demo", "Blu Medic"]
+gamemode_header = ["Gamemode"]
+maps_header = ["Map"]
+dates_header = ["Year", "Month", "Day"]
+weekdays_header = ["Weekday"]
+scores_header = ["Red Score", "Blu Score"]
+stats_header = ["Match Length",\
+	"Red Scout 1 Kills", "Red Scout 1 Assists", "Red Scout 1 Deaths",\
+	"Red Scout 1 Damage", "Red Scout 1 Damage Taken",\
+	"Red Scout 2 Kills", "Red Scout 2 Assists", "Red Scout 2 Deaths",\
+	"Red Scout 2 Damage", "Red Scout 2 Damage Taken",\
+	"Red Soldier 1 Kills", "Red Soldier 1 Assists", "Red Soldier 1 Deaths",\
+	"Red Soldier 1 Damage", "Red Soldier 1 Damage Taken",\
+	"Red Soldier 2 Kills", "Red Soldier 2 Assists", "Red Soldier 2 Deaths",\
+	"Red Soldier 2 Damage", "Red Soldier 2 Damage Taken",\
+	"Red Demo Kills", "Red Demo Assists", "Red Demo Deaths",\
+	"Red Demo Damage", "Red Demo Damage Taken",\
+	"Red Medic Kills", "Red Medic Assists", "Red Medic Deaths",\
+	"Red Medic Damage", "Red Medic Damage Taken",\
+	"Red Medic Heals", "Red Medic Ubers", "Red Medic Drops",\
+	"Blu Scout 1 Kills", "Blu Scout 1 Assists", "Blu Scout 1 Deaths",\
+	"Blu Scout 1 Damage", "Blu Scout 1 Damage Taken",\
+	"Blu Scout 2 Kills", "Blu Scout 2 Assists", "Blu Scout 2 Deaths",\
+	"Blu Scout 2 Damage", "Blu Scout 2 Damage Taken",\
+	"Blu Soldier 1 Kills", "Blu Soldier 1 Assists", "Blu Soldier 1 Deaths",\
+	"Blu Soldier 1 Damage", "Blu Soldier 1 Damage Taken",\
+	"Blu Soldier 2 Kills", "Blu Soldier 2 Assists", "Blu Soldier 2 Deaths",\
+	"Blu Soldier 2 Damage", "Blu Soldier 2 Damage Taken",\
+	"Blu Demo Kills", "Blu Demo Assists", "Blu Demo Deaths",\
+	"Blu Demo Damage", "Blu Demo Damage Taken",\
+	"Blu Medic Kills", "Blu Medic Assists", "Blu Medic Deaths",\
+	"Blu Medic Damage", "Blu Medic Damage Taken",\
+	"Blu Medic Heals", "Blu Medic Ubers", "Blu Medic Drops"]
+rejected_logs_header = ["Log ID", "Reason"]
 
 # parts of logs.tf urls
 log_tf_url = "https://logs.tf/"
 json_log_url = "json/"
 profile_log_url = "profile/"
+api_log_list_url = "api/v1/log"
+
+# number of logs on each page of a player's logs.tf profile
+profile_page_size = 25
+# max number of logs to ask for in each request to the logs.tf json api
+api_page_size = 1000
 
 # create context that doesn't require ssl certificate verification when requesting from website
 # since logs.tf's ssl certificate is expired apparently lol
 unverified_context = ssl._create_unverified_context()
 
+# default number of logs to download at the same time
+default_fetch_workers = 8
+# default max number of times to send a request to logs.tf before giving up on it
+default_max_attempts = 5
+# default number of logs to check between saving progress
+default_checkpoint_interval = 500
+
+# max round score + 1 (number of values each team's score is one hot encoded into)
+score_cap = 6
+# year tf2 was released - 1 (years are encoded as the number of years since it)
+first_year = 2006
+
+# returns a new http client for sending requests to logs.tf
+# the same client should be shared by everything that sends requests so connections get reused
+def create_http_client(rate_limit=None, max_attempts=default_max_attempts, pool_size=default_fetch_workers):
+	return HttpClient(max_attempts=max_attempts, rate_limit=rate_limit, ssl_context=unverified_context,\
+		pool_size=pool_size)
+
+# prefixes of steam profile urls
+https_steam_prefix = "https://steamcommunity.com/"
+http_steam_prefix = "http://steamcommunity.com/"
+# default number of seconds before a steam profile url needs to be resolved to a steam id again (30 days)
+default_steam_id_ttl = 30 * 24 * 60 * 60
+
 # used for converting steam community id to steam id 3
 # found from https://gist.github.com/bcahue/4eae86ae1d10364bb66d
 def commid_to_steamid3(commid):
@@ -109,15 +264,225 @@ def commid_to_steamid3(commid):
     # return full steamid3
 	return "[U:1:" + str(steamidacct) + "]"
 
-# reads from a file of steam profiles and returns the log ids of the last few pages of each of their logs
-# returns an array of the log ids and steamid3s of the players it read
-def get_logs(pages, verbose=True):
+# returns a dictionary of the newest log id that has been collected from each player's profile, keyed by steamid3
+def read_watermarks():
+	# if the watermarks haven't been stored yet, then no logs have been collected from anyone
+	if not os.path.isfile(watermarks_data_path):
+		return {}
+
+	watermarks = np.array(pd.read_csv(watermarks_data_path, dtype=str))
+	return {sid3: int(log_id) for sid3, log_id in watermarks}
+
+# stores the newest log id that has been collected from each player's profile
+def store_watermarks(watermarks):
+	df_watermarks = pd.DataFrame(list(watermarks.items()), columns=["SteamID3", "Newest Log ID"])
+	df_watermarks.to_csv(watermarks_data_path, index=False)
+
+# yields the logs from the last few pages of a player's logs.tf profile web page
+# each page is a list of (log id, unix timestamp of the match) pairs going from newest to oldest
+# start_page is the first page to read
+def get_profile_log_pages_html(steam_id, pages, client, verbose=True, start_page=1):
+	for page in range(start_page, pages + 1):
+		# request page of player's log profile
+		try:
+			response = client.get(log_tf_url + profile_log_url + steam_id + f"?p={page}")
+		# if the request failed too many times, skip the rest of this player's logs
+		except HttpError as e:
+			print(f"\nHTTP Error from log profile page {page} of {steam_id}, skipping the rest of their logs: {e}")
+			return
+
+		# if there aren't any pages left in the player's logs (defaults back to logs.tf home page)
+		if response.url == log_tf_url:
+			if verbose:
+				print(f"\nNo more logs on page {page} for {steam_id}")
+			return
+
+		# create html parser to find log ids from web page
+		soup = BeautifulSoup(response.read(), "html.parser")
+		# find each <tr> element in the page (they contain the log ids)
+		trs = soup.find_all("tr", id=True)
+		# if no <tr> elements were found, don't check for a next page
+		if len(trs) < 1:
+			if verbose:
+				print(f"\nNo more logs on page {page} for {steam_id}")
+			return
+
+		page_logs = []
+		# loop through each tr element to find all of the log ids
+		for tr in trs:
+			# get the html element id of the <tr> element
+			id = tr["id"]
+			# if the html element id of the <tr> element isn't of the form "log_*log id*",
+			# then it doesn't contain a log id
+			if not id.startswith("log_"):
+				continue
+			# extract the log id from the html element id
+			id_index = id.index("_") + 1
+			log_id = id[id_index:]
+			# the date of the log is stored as a unix timestamp in one of the cells of the row
+			date_cell = tr.find(attrs={"data-timestamp": True})
+			log_timestamp = None if date_cell is None else int(date_cell["data-timestamp"])
+			page_logs.append((log_id, log_timestamp))
+
+		yield page_logs
+
+# yields the logs of a player from the logs.tf json api
+# asks for the same number of logs that are on the given number of pages of their profile web page,
+# but gets up to api_page_size of them per request instead of one profile page worth
+# each page is a list of (log id, unix timestamp of the match) pairs going from newest to oldest
+# falls back to reading the profile web pages if the api doesn't give back a list of logs
+def get_profile_log_pages_api(steam_id, pages, client, verbose=True):
+	# total number of logs to get
+	log_limit = pages * profile_page_size
+	offset = 0
+	while offset < log_limit:
+		limit = min(api_page_size, log_limit - offset)
+		log_list_url = log_tf_url + api_log_list_url + f"?player={steam_id}&limit={limit}&offset={offset}"
+
+		# request page of player's logs
+		try:
+			data = json.loads(client.get(log_list_url).read())
+		# if the request failed or didn't give back json, fall back to the profile web pages
+		except (HttpError, ValueError) as e:
+			if verbose:
+				print(f"\nError from log list {log_list_url}: {e}")
+			data = None
+
+		# if the api didn't give back a list of logs, get the rest of them from the profile web pages instead
+		if type(data) is not dict or not data.get("success", False) or "logs" not in data:
+			if verbose:
+				print(f"\nInvalid response from log list {log_list_url}, reading profile pages instead...")
+			# skip the pages that were already read from the api
+			yield from get_profile_log_pages_html(steam_id, pages, client, verbose=verbose,\
+				start_page=offset // profile_page_size + 1)
+			return
+
+		page_logs = [(str(log["id"]), log.get("date")) for log in data["logs"]]
+		# if there aren't any logs left for this player
+		if len(page_logs) < 1:
+			if verbose:
+				print(f"\nNo more logs after {offset} logs for {steam_id}")
+			return
+
+		yield page_logs
+
+		# if this was the last page of logs
+		if len(page_logs) < limit:
+			return
+		offset += len(page_logs)
+
+# functions that can be used to get the list of logs of each player
+# they all take the same arguments and yield pages of (log id, unix timestamp) pairs from newest to oldest
+log_list_backends = {
+	"api": get_profile_log_pages_api,
+	"html": get_profile_log_pages_html
+}
+
+# returns a dictionary of steam profile urls that have been resolved to steam ids before
+# each value is a tuple of the steam id, steamid3, and unix time that the url was resolved at
+def read_steam_ids():
+	# if no profiles have been resolved yet
+	if not os.path.isfile(steam_ids_data_path):
+		return {}
+
+	steam_ids = np.array(pd.read_csv(steam_ids_data_path, dtype=str))
+	return {profile: (steam_id, sid3, float(resolved_at)) for profile, steam_id, sid3, resolved_at in steam_ids}
+
+# stores the steam ids that steam profile urls were resolved to
+def store_steam_ids(steam_ids):
+	df_steam_ids = pd.DataFrame([(profile, *resolved) for profile, resolved in steam_ids.items()],\
+		columns=["Profile", "SteamID64", "SteamID3", "Resolved At"])
+	df_steam_ids.to_csv(steam_ids_data_path, index=False)
+
+# gets the steam id of a custom steam profile url (one that goes to /id/*custom name*/) from the steam api
+# raises a ValueError if the steam id couldn't be found
+def _resolve_custom_url(steam, profile):
+	# get the name from the custom url
+	custom_url = profile[30:-1]
+	# get user info from steam api
+	steam_user = steam.users.search_user(custom_url)
+	# if there was no match found or there was an error in retrieving the steam info of the user
+	if steam_user == "No match" or type(steam_user) is not dict:
+		raise ValueError(f"User not found from {profile}")
+	# if the player key is missing from the steam user dict
+	if "player" not in steam_user:
+		raise ValueError(f"'player' key missing from steam info retrieved from {profile}")
+	# if the steamid key is missing from the retrieved steam info
+	if "steamid" not in steam_user["player"]:
+		raise ValueError(f"Steam ID missing from steam info retrieved from {profile}")
+	# get the steam id of the user
+	return steam_user["player"]["steamid"]
+
+# returns a dictionary of the steam id of each steam profile url
+# custom urls are resolved with the steam api and stored so they don't need to be resolved again until they're older
+# than ttl seconds, and the ones that do need to be resolved get resolved max_workers at a time
+def resolve_steam_ids(profiles, ttl=default_steam_id_ttl, max_workers=default_fetch_workers, verbose=True):
+	# steam ids of each profile url
+	steam_ids = {}
+	# custom urls that need to be resolved with the steam api
+	custom_urls = []
+	# custom urls that were resolved before
+	resolved_steam_ids = read_steam_ids()
+	now = time.time()
+
+	for profile in profiles:
+		# if the url already contains the steam id, then just get the id from the url
+		if profile.startswith(https_steam_prefix + "profiles/") or profile.startswith(http_steam_prefix + "profiles/"):
+			steam_ids[profile] = profile[36:]
+		# if this is a custom url
+		elif profile.startswith(https_steam_prefix + "id/") or profile.startswith(http_steam_prefix + "id/"):
+			# use the stored steam id if it was resolved recently enough
+			if profile in resolved_steam_ids and now - resolved_steam_ids[profile][2] < ttl:
+				steam_ids[profile] = resolved_steam_ids[profile][0]
+			else:
+				custom_urls.append(profile)
+		else:
+			print(f"\nERROR: Could not identify steam profile format from {profile}")
+			exit(1)
+
+	# if every profile already has a steam id, there's no need to connect to the steam api
+	if len(custom_urls) < 1:
+		return steam_ids
+
 	if verbose:
-		print("Getting logs from list of players...")
+		print(f"Resolving {len(custom_urls)} custom Steam profile urls...")
 
-	# if pages isn't valid
-	if type(pages) is not int or pages < 1:
-		raise ValueError("Pages parameter must be a positive integer.")
+	# retrive steam api key to connect to steam api
+	# make sure to create a file called ".env" and put it in the root directory of this repo,
+	# and in that file put "STEAM_API_KEY=*your steam api key*"
+	# you can get a steam api key from https://steamcommunity.com/dev/apikey
+	try:
+		steam_api_key = config("STEAM_API_KEY")
+	except:
+		print("No Steam API key was found. Make a .env file and put yours in there in the right format. \
+			You can get a person Steam API key from https://steamcommunity.com/dev/apikey.")
+		exit(1)
+	# connect to steam api
+	steam = Steam(steam_api_key)
+
+	# resolve all of the custom urls at the same time
+	with ThreadPoolExecutor(max_workers=max_workers) as executor:
+		futures = [(profile, executor.submit(_resolve_custom_url, steam, profile)) for profile in custom_urls]
+		for profile, future in futures:
+			try:
+				steam_id = future.result()
+			except ValueError as e:
+				print(f"\nERROR: {e}")
+				exit(1)
+			steam_ids[profile] = steam_id
+			resolved_steam_ids[profile] = (steam_id, commid_to_steamid3(steam_id), now)
+
+	# if there isn't already a folder for the data, create one
+	if not os.path.isdir(data_path):
+		os.mkdir(data_path)
+
+	# store the newly resolved steam ids so they don't need to be resolved again next time
+	store_steam_ids(resolved_steam_ids)
+
+	return steam_ids
+
+# returns an array of the steam profile urls in the profile data file
+def read_profiles():
 	# if there isn't a folder for the data
 	if not os.path.isdir(data_path):
 		print("ERROR: Missing data folder.")
@@ -136,118 +501,129 @@ def get_logs(pages, verbose=True):
 		print("ERROR: Empty profile data file. Be sure to put a list of Steam profile links in data/profiles.csv")
 		exit(1)
 	
+	return profiles
+
+# yields the log ids of the last few pages of each player's logs as they're found
+# steam_ids is a dictionary of the steam id of each profile url
+# watermarks is a dictionary of the newest log id that has been collected from each player's profile, keyed by steamid3
+# (it gets updated with the newest logs that are found)
+# the rest of the arguments are the same as get_logs()
+# log ids can be yielded more than once if multiple players were in the same match
+def crawl_log_ids(profiles, steam_ids, pages, client, backend="api", watermarks=None, incremental=False, since=None,\
+	verbose=True):
+	# if the backend isn't valid
+	if backend not in log_list_backends:
+		raise ValueError(f"Backend parameter must be one of {list(log_list_backends)}.")
+	log_list_backend = log_list_backends[backend]
+	if watermarks is None:
+		watermarks = {}
+	# oldest match time to collect logs from
+	since_timestamp = None if since is None else since.timestamp()
 	profile_count = len(profiles)
-	if verbose:
-		print(f"Collected {profile_count} Steam profiles...")
-
-	# retrive steam api key to connect to steam api
-	# make sure to create a file called ".env" and put it in the root directory of this repo,
-	# and in that file put "STEAM_API_KEY=*your steam api key*"
-	# you can get a steam api key from https://steamcommunity.com/dev/apikey
-	try:
-		steam_api_key = config("STEAM_API_KEY")
-	except:
-		print("No Steam API key was found. Make a .env file and put yours in there in the right format. \
-			You can get a person Steam API key from https://steamcommunity.com/dev/apikey.")
-		exit(1)
-	# connect to steam api
-	steam = Steam(steam_api_key)
-	# prefix for steam url
-	https_steam_prefix = "https://steamcommunity.com/"
-	http_steam_prefix = "http://steamcommunity.com/"
-
-	# array of all of the log ids
-	log_ids = np.array([], dtype=str)
-	# array of all steamid3s
-	sid3s = np.array([], dtype=str)
 	# counter to keep track of how many profiles have been read
 	counter = 0
 
 	# for each steam profile url that was read from the file
 	for profile in profiles:
 		counter += 1
-		print()
-		# Get the steam id of the profile
-
-		steam_id = None
-		# if the url already contains the steam id, then just get the id from the url
-		if profile.startswith(https_steam_prefix + "profiles/") or profile.startswith(http_steam_prefix + "profiles/"):
-			steam_id = profile[36:]
-		# if this is a custom url
-		elif profile.startswith(https_steam_prefix + "id/") or profile.startswith(http_steam_prefix + "id/"):
-			# get the name from the custom url
-			custom_url = profile[30:-1]
-			# get user info from steam api
-			steam_user = steam.users.search_user(custom_url)
-			# if there was no match found or there was an error in retrieving the steam info of the user
-			if steam_user == "No match" or type(steam_user) is not dict:
-				print(f"\nERROR: User not found from {profile}")
-				exit(1)
-			# if the player key is missing from the steam user dict
-			if "player" not in steam_user:
-				print(f"\nERROR: 'player' key missing from steam info retrieved from {profile}")
-				exit(1)
-			# if the steamid key is missing from the retrieved steam info
-			if "steamid" not in steam_user["player"]:
-				print(f"\nERROR: Steam ID missing from steam info retrieved from {profile}")
-				exit(1)
-			# get the steam id of the user
-			steam_id = steam_user["player"]["steamid"]
-		else:
-			print(f"\nERROR: Could not identify steam profile format from {profile}")
-			exit(1)
-
-		# add steamid3 to list of steamid3s
-		sid3s = np.append(sid3s, commid_to_steamid3(steam_id))
+		if verbose:
+			print()
+		# get the steam id of the profile
+		steam_id = steam_ids[profile]
+		sid3 = commid_to_steamid3(steam_id)
+
+		# newest log that was collected from this player last time (0 if they're new or this isn't incremental)
+		watermark = watermarks.get(sid3, 0) if incremental else 0
+		# newest log found on this player's profile during this run
+		newest_log_id = watermarks.get(sid3, 0)
+		# flag to stop reading pages once logs that were already collected or are too old show up
+		reached_end = False
 
 		# collect list of log ids from last few pages of player's logs.tf profile
-		for page in range(1, pages + 1):
+		for page, page_logs in enumerate(log_list_backend(steam_id, pages, client, verbose=verbose), 1):
 			if verbose:
 				print(f"\r[{counter}/{profile_count}]: {profile} page {page}...", end="")
-			
-			# request page of player's log profile
-			response = None
-			response_success = False
-			# in case requesting http response fails on first try, loop until request succeeds
-			while not response_success:
-				try:
-					response = urlopen(log_tf_url + profile_log_url + steam_id + f"?p={page}",\
-				    	context=unverified_context)
-					response_success = True
-				except:
-					print(f"\nHTTP Error from log profile page {log_tf_url}{profile_log_url}{steam_id}?p={page},\
-						trying again...")
-
-			# if there aren't any pages left in the player's logs (defaults back to logs.tf home page)
-			if response.url == log_tf_url:
-				if verbose:
-					print(f"\nNo more logs on page {page} for {profile}")
-				break
 
-			# create html parser to find log ids from web page
-			soup = BeautifulSoup(response.read(), "html.parser")
-			# find each <tr> element in the page (they contain the log ids)
-			trs = soup.find_all("tr", id=True)
-			# if no <tr> elements were found, don't check for a next page
-			if len(trs) < 1:
+			# loop through each log on the page to find all of the new log ids
+			for log_id, log_timestamp in page_logs:
+				# logs on a profile go from newest to oldest, so once a log that was already collected shows up,
+				# the rest of them were collected too
+				if int(log_id) <= watermark:
+					reached_end = True
+					break
+				# same with logs that are older than the date cutoff
+				if since_timestamp is not None and log_timestamp is not None and log_timestamp < since_timestamp:
+					reached_end = True
+					break
+
+				newest_log_id = max(newest_log_id, int(log_id))
+				watermarks[sid3] = newest_log_id
+				yield log_id
+
+			# if this page had logs that were already collected or were too old, there's no need to read more
+			if reached_end:
 				if verbose:
-					print(f"\nNo more logs on page {page} for {profile}")
+					print(f"\nReached already collected or old logs on page {page} for {profile}")
 				break
 
-			# loop through each tr element to find all of the log ids
-			for tr in soup.find_all("tr", id=True):
-				# get the html element id of the <tr> element
-				id = tr["id"]
-				# if the html element id of the <tr> element isn't of the form "log_*log id*",
-				# then it doesn't contain a log id
-				if not id.startswith("log_"):
-					continue
-				# extract the log id from the html element id
-				id_index = id.index("_") + 1
-				log_id = id[id_index:]
-				# append the log id to the array of log ids
-				log_ids = np.append(log_ids, log_id)
-	
+		watermarks[sid3] = newest_log_id
+
+# reads from a file of steam profiles and returns the log ids of the last few pages of each of their logs
+# backend is the name of the way to get each player's logs ("api" for the logs.tf json api or "html" for reading
+# their logs.tf profile pages)
+# if incremental is true, crawling a player's profile stops once it reaches the newest log that was collected from
+# them last time, and the new log ids get added to the ones that are already in the log id data file
+# since is an optional datetime that makes crawling a player's profile stop once it reaches logs older than it
+# steam_id_ttl is how many seconds a custom steam profile url is stored for before it gets resolved again
+# client is the http client to send requests to logs.tf with (a new one is made if it's None)
+# returns an array of the log ids and steamid3s of the players it read
+def get_logs(pages, verbose=True, incremental=False, since=None, backend="api", steam_id_ttl=default_steam_id_ttl,\
+	client=None):
+	if verbose:
+		print("Getting logs from list of players...")
+
+	# if pages isn't valid
+	if type(pages) is not int or pages < 1:
+		raise ValueError("Pages parameter must be a positive integer.")
+	# if the backend isn't valid
+	if backend not in log_list_backends:
+		raise ValueError(f"Backend parameter must be one of {list(log_list_backends)}.")
+	if client is None:
+		client = create_http_client()
+	# read list of steam profile urls
+	profiles = read_profiles()
+
+	profile_count = len(profiles)
+	if verbose:
+		print(f"Collected {profile_count} Steam profiles...")
+
+	# get the steam id of each profile
+	steam_ids = resolve_steam_ids(profiles, ttl=steam_id_ttl, verbose=verbose)
+
+	# newest log id that has been collected from each player (only used to stop crawling in incremental mode)
+	watermarks = read_watermarks()
+	# list of all steamid3s
+	sid3s = [commid_to_steamid3(steam_ids[profile]) for profile in profiles]
+	# list of all of the log ids
+	log_ids = list(crawl_log_ids(profiles, steam_ids, pages, client, backend=backend, watermarks=watermarks,\
+		incremental=incremental, since=since, verbose=verbose))
+
+	# store the log ids, steamid3s, and the newest log from each player
+	return store_logs(log_ids, sid3s, watermarks, incremental=incremental, verbose=verbose)
+
+# stores the log ids and steamid3s found by get_logs() into csv files in the data folder, along with the newest log from
+# each player so the next incremental run knows where to stop
+# if incremental is true, the log ids get added to the ones that are already in the log id data file
+# returns an array of all of the log ids (without duplicates) and an array of the steamid3s
+def store_logs(log_ids, sid3s, watermarks, incremental=False, verbose=True):
+	# turn the lists into arrays all at once
+	log_ids = np.array(log_ids, dtype=str)
+	sid3s = np.array(sid3s, dtype=str)
+
+	# in incremental mode, keep all of the logs that were collected before too
+	if incremental and os.path.isfile(log_data_path):
+		log_ids = np.concatenate((read_log_ids(), log_ids))
+
 	# make sure there are no duplicate logs
 	log_ids = np.unique(log_ids)
 
@@ -255,6 +631,9 @@ def get_logs(pages, verbose=True):
 	if not os.path.isdir(data_path):
 		os.mkdir(data_path)
 
+	# store the newest log from each player so the next incremental run knows where to stop
+	store_watermarks(watermarks)
+
 	# output the log ids to a csv file
 	df_logs = pd.DataFrame(log_ids)
 	df_logs.to_csv(log_data_path, header=["Log ID"], index=False)
@@ -293,642 +672,440 @@ def read_sid3s():
 	# read the steamid3 file and return an array of the steamid3s
 	return np.array(pd.read_csv(sid3_data_path), dtype=str).flatten()
 
+# returns the path to where the raw json of a log is cached
+# logs are split into sub folders by the first digits of their id so no one folder gets too big
+def get_cached_log_path(log_id):
+	shard = str(log_id).zfill(8)[:5]
+	return f"{log_cache_path}/{shard}/{log_id}{log_cache_ext}"
+
+# returns the raw json bytes of a log from the cache, or None if the log isn't cached
+def read_cached_log(log_id):
+	cached_log_path = get_cached_log_path(log_id)
+	if not os.path.isfile(cached_log_path):
+		return None
+	try:
+		with gzip.open(cached_log_path, "rb") as cache_file:
+			return cache_file.read()
+	# if the cached file is corrupted, act like it isn't cached so it gets downloaded again
+	except (OSError, EOFError):
+		return None
+
+# stores the raw json bytes of a log in the cache
+# logs.tf logs never change once they're uploaded, so cached logs never need to be updated
+def write_cached_log(log_id, raw_log):
+	cached_log_path = get_cached_log_path(log_id)
+	os.makedirs(os.path.dirname(cached_log_path), exist_ok=True)
+	# write to a temporary file first and then rename it so a crash never leaves a half written log in the cache
+	temp_path = f"{cached_log_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+	with gzip.open(temp_path, "wb") as cache_file:
+		cache_file.write(raw_log)
+	os.replace(temp_path, cached_log_path)
+
+# requests the raw json bytes of a log from logs.tf with an http client
+# if use_cache is true, the log is read from the cache before requesting it and gets stored in the cache after
+# if offline is true, the log is only read from the cache and None is returned if it isn't cached
+# returns None if the log couldn't be downloaded
+def fetch_raw_log(log_id, client, use_cache=True, offline=False):
+	# try to get the log from the cache first
+	if use_cache or offline:
+		raw_log = read_cached_log(log_id)
+		if raw_log is not None:
+			return raw_log
+	# if the log isn't cached and no requests are allowed
+	if offline:
+		return None
+
+	# concatenate to form json url and original log page url
+	log_json_url = log_tf_url + json_log_url + log_id
+
+	# request data from json file of log
+	try:
+		raw_log = client.get(log_json_url).read()
+	# if the request failed too many times
+	except HttpError as e:
+		print(f"HTTP Error from log id {log_id}: {e}")
+		return None
+
+	# store the raw log so it never needs to be downloaded again
+	if use_cache:
+		write_cached_log(log_id, raw_log)
+
+	return raw_log
+
+# requests the raw json bytes of many logs at the same time with an http client
+# yields (log id, raw json bytes) pairs in the same order as log_ids
+# (raw json is None for logs that couldn't be downloaded or aren't cached when offline)
+# max_workers is how many logs get downloaded at once
+def fetch_raw_logs(log_ids, client, max_workers=default_fetch_workers, use_cache=True, offline=False):
+	if type(max_workers) is not int or max_workers < 1:
+		raise ValueError("max_workers parameter must be a positive integer.")
+
+	with ThreadPoolExecutor(max_workers=max_workers) as executor:
+		# downloads that have been started but not yielded yet, in the order of log_ids
+		# only a few requests per worker are queued up at a time so memory stays bounded for long lists of logs
+		pending = deque()
+		window = max_workers * 2
+		for log_id in log_ids:
+			pending.append((log_id, executor.submit(fetch_raw_log, log_id, client, use_cache, offline)))
+			if len(pending) >= window:
+				next_id, future = pending.popleft()
+				yield next_id, future.result()
+		# yield the rest of the downloads once all of them have been started
+		while pending:
+			next_id, future = pending.popleft()
+			yield next_id, future.result()
+
+# returns a dictionary of memory mapped arrays of each column of the dataset (see log_dataset.py)
+# data collected before the dataset existed gets converted from the old csv files the first time it's read
+def read_log_dataset(mmap=True):
+	# if there isn't a folder for the data
+	if not os.path.isdir(data_path):
+		raise FileNotFoundError("Missing data folder.")
+	if not dataset_exists(dataset_path):
+		# if the used log ids are missing
+		if not os.path.isfile(used_logs_path):
+			raise FileNotFoundError("Missing log dataset")
+		convert_csv_data()
+	return load_dataset(dataset_path, mmap=mmap)
+
+# returns a dictionary of the Vocabulary of the gamemode and map codes in the dataset
+def read_log_vocabularies():
+	# make sure the dataset exists (and convert old data if it hasn't been)
+	read_log_dataset()
+	return read_vocabularies(dataset_path)
+
+# converts data files that were stored as csv files into the dataset
+def convert_csv_data():
+	records = {}
+	for name, path in [("used_logs", used_logs_path), ("players", player_data_path), ("gamemodes", gamemode_data_path),\
+		("maps", maps_data_path), ("dates", dates_data_path), ("weekdays", weekdays_data_path),\
+		("scores", scores_data_path), ("stats", stats_data_path)]:
+		if not os.path.isfile(path):
+			raise FileNotFoundError(f"Missing {name} data file")
+		# read the csv file without the index column
+		records[name] = np.delete(np.array(pd.read_csv(path, dtype=str if name == "used_logs" else None)), 0, 1)
+
+	# turn the strings into codes
+	vocabularies = new_vocabularies()
+	records["players"] = np.vectorize(sid3_to_account_id, otypes=[np.int64])(records["players"])
+	records["gamemodes"] = vocabularies["gamemodes"].encode(records["gamemodes"])
+	records["maps"] = vocabularies["maps"].encode(records["maps"])
+	records["weekdays"] = np.vectorize(weekday_codes.get, otypes=[np.int64])(records["weekdays"])
+	# the csv files only have the date of each match, so the time is guessed as noon
+	records["timestamps"] = get_date_timestamps(records["dates"])
+	store_dataset(dataset_path, records, vocabularies)
+
+# stores every column of the dataset into csv files with an index column and headers so they can be read by people
+# (codes are turned back into steamid3s, gamemodes, maps, and days of the week)
+def export_csv_data(verbose=True):
+	dataset = read_log_dataset()
+	vocabularies = read_vocabularies(dataset_path)
+	columns = {
+		"used_logs": dataset["used_logs"],
+		"players": np.vectorize(account_id_to_sid3, otypes=[object])(dataset["players"]),
+		"gamemodes": vocabularies["gamemodes"].decode(dataset["gamemodes"]),
+		"maps": vocabularies["maps"].decode(dataset["maps"]),
+		"dates": dataset["dates"],
+		"weekdays": np.array(weekday_names)[np.asarray(dataset["weekdays"]) - 1],
+		"scores": dataset["scores"],
+		"stats": dataset["stats"]
+	}
+	for name, path, header in [("used_logs", used_logs_path, used_logs_header),\
+		("players", player_data_path, player_header), ("gamemodes", gamemode_data_path, gamemode_header),\
+		("maps", maps_data_path, maps_header), ("dates", dates_data_path, dates_header),\
+		("weekdays", weekdays_data_path, weekdays_header), ("scores", scores_data_path, scores_header),\
+		("stats", stats_data_path, stats_header)]:
+		_store_data_frame(pd.DataFrame(np.asarray(columns[name])), path, header)
+	if verbose:
+		print(f"Exported dataset to csv files in {data_path}")
+
+# returns an array of log ids of logs that were used the last time data was collected by fetch_log_data()
+def read_used_logs():
+	# read the used log ids from the dataset and return them as strings like the rest of the log ids
+	return np.asarray(read_log_dataset()["used_logs"]).astype(str)
+
+# returns an array of log ids of logs that were rejected by fetch_log_data() and an array of the reasons why
+def read_rejected_logs():
+	# if there isn't a folder for the data
+	if not os.path.isdir(data_path):
+		raise FileNotFoundError("Missing data folder.")
+	# if the rejected log ids are missing
+	if not os.path.isfile(rejected_logs_path):
+		raise FileNotFoundError("Missing rejected log data file")
+
+	# read the rejected log file and split it into log ids and reasons
+	rejected_logs = np.array(pd.read_csv(rejected_logs_path, dtype=str))
+	return rejected_logs[:, 0], rejected_logs[:, 1]
+
+# stores a data frame into a csv file in the data folder with an index column
+# if append is true and the file already exists, the rows get added to the end of the file with the index continuing
+# on from start_index
+def _store_data_frame(df, path, header, append=False, start_index=0):
+	# column name of index column in csv files
+	index_label = "Index"
+
+	if append and os.path.isfile(path):
+		df.index += start_index
+		df.to_csv(path, mode="a", index_label=index_label, header=False)
+	else:
+		df.to_csv(path, index_label=index_label, header=header)
+
+# returns a set of the ids of logs that were already checked by an earlier run of fetch_log_data() (used or rejected)
+# and the number of logs that are already in the data files
+def read_checked_logs():
+	checked_logs = set()
+	used_log_count = 0
+	if dataset_exists(dataset_path) or os.path.isfile(used_logs_path):
+		used_logs = read_used_logs()
+		used_log_count = used_logs.size
+		checked_logs.update(used_logs)
+	if os.path.isfile(rejected_logs_path):
+		# (files from older runs can have logs that were only rejected because of the list of players)
+		rejected_ids, rejections = read_rejected_logs()
+		checked_logs.update(rejected_ids[~np.isin(rejections, list(player_list_rejections))])
+	return checked_logs, used_log_count
+
+# returns a dictionary of the "dates" ([year, month, day]), "weekdays" (1 for sunday to 7 for saturday), and "hours"
+# (hour of the day with minutes as a fraction) that matches were played at from an array of their unix timestamps
+# every timestamp is converted to the match time zone at once instead of one at a time
+def get_match_dates(timestamps):
+	match_datetimes = pd.DatetimeIndex(pd.to_datetime(np.asarray(timestamps, dtype=np.int64).reshape(-1), unit="s",\
+		utc=True)).tz_convert(match_timezone)
+	return {
+		"dates": np.column_stack((match_datetimes.year, match_datetimes.month, match_datetimes.day)),
+		# pandas counts days of the week from monday = 0
+		"weekdays": (np.asarray(match_datetimes.dayofweek) + 1) % 7 + 1,
+		"hours": np.asarray(match_datetimes.hour) + np.asarray(match_datetimes.minute) / 60
+	}
+
+# returns the unix timestamps of noon in the match time zone on each [year, month, day] of an array of dates
+# (used for data that was collected before timestamps were stored)
+def get_date_timestamps(dates):
+	dates = np.asarray(dates, dtype=np.int64).reshape(-1, 3)
+	noons = pd.DatetimeIndex(pd.to_datetime({"year": dates[:, 0], "month": dates[:, 1], "day": dates[:, 2], "hour": 12}))
+	return np.asarray((noons.tz_localize(match_timezone) - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1),\
+		dtype=np.int64)
+
+# returns a dictionary of arrays of each column with the date columns (see log_records.py) worked out from the
+# timestamps added to it, if they aren't already in it
+def add_date_columns(records):
+	if all(name in records for name in log_date_columns):
+		return records
+	match_dates = get_match_dates(records["timestamps"])
+	return {**records, "dates": match_dates["dates"], "weekdays": match_dates["weekdays"].reshape(-1, 1)}
+
+# returns a row of the compact data of a log to add to a RecordBuilder
+# record is a record from parse_log_records()
+# vocabularies is the dictionary of the Vocabulary of the gamemode and map codes
+def encode_log_record(log_id, record, vocabularies):
+	players, gamemode, map_name, date, score, match_stats = record
+	return {
+		"used_logs": log_id,
+		"players": [sid3_to_account_id(player) for player in players],
+		"gamemodes": vocabularies["gamemodes"].code(gamemode),
+		"maps": vocabularies["maps"].code(map_name),
+		"timestamps": date,
+		"scores": score,
+		"stats": match_stats
+	}
+
+# prints how many logs were rejected for each reason from a counter of rejection codes
+# (rejections resumed from older runs can have codes that aren't used anymore)
+def print_rejection_counts(rejection_counts):
+	for rejection, count in rejection_counts.most_common():
+		print(f"{count:>8} {rejection}: {rejection_reasons.get(rejection, 'No longer a rejection reason')}")
+
+# stores the data collected from logs into the dataset in the data folder
+# records is a dictionary of arrays of each column made by RecordBuilder.finalize()
+# vocabularies is the dictionary of the Vocabulary of the gamemode and map codes in records
+# rejected_logs is a list of (log id, rejection code) pairs of logs that weren't used
+# if append is true, the data gets added to the end of the dataset
+# if store_matches is true, the matches also get stored in the match store (see match_store.py)
+def store_log_data(records, vocabularies, rejected_logs, append=False, store_matches=False):
+	# if there isn't already a folder for the data, create one
+	if not os.path.isdir(data_path):
+		os.mkdir(data_path)
+
+	# store ids of logs that were valid and will be used along with the input and output data of each of them
+	records = add_date_columns(records)
+	store_dataset(dataset_path, records, vocabularies, append=append)
+
+	if store_matches:
+		# fill a new match store with the whole dataset so it never has gaps, otherwise just add the new matches
+		new_store = not append or not os.path.isfile(match_store_path)
+		match_store = MatchStore(match_store_path)
+		if new_store:
+			match_store.clear()
+			match_store.add_matches(read_log_dataset(), read_vocabularies(dataset_path))
+		else:
+			match_store.add_matches(records, vocabularies)
+		match_store.close()
+
+	# store ids of logs that weren't used and the code of why, so incremental runs don't check them again
+	# logs that couldn't be downloaded or are missing from the cache when running offline aren't included
+	# since they might be valid, and neither are logs that were only rejected because of who was in them, so they get
+	# checked again once the list of players changes
+	rejected_logs = [(log_id, rejection) for log_id, rejection in rejected_logs if rejection not in player_list_rejections]
+	df_rejected_logs = pd.DataFrame(rejected_logs, columns=rejected_logs_header)
+	if append and os.path.isfile(rejected_logs_path):
+		df_rejected_logs.to_csv(rejected_logs_path, mode="a", header=False, index=False)
+	else:
+		df_rejected_logs.to_csv(rejected_logs_path, index=False)
+
 # collects data from log files of list of log ids and puts the data in csv files in the data folder
+# max_workers is how many logs get downloaded at the same time
+# rate_limit is the max number of requests per second to send to logs.tf (None for no limit)
+# client is the http client to send requests to logs.tf with (a new one with rate_limit is made if it's None)
+# processes is how many processes to parse and check logs with (None or 1 parses them in this process)
+# use_cache makes it read and store raw logs in the log cache, and offline makes it only use logs that are cached
+# if checkpoint_interval is given, the progress is saved every checkpoint_interval logs so an interrupted run can be
+# picked up where it left off by running it again with resume set to true
+# if incremental is true, logs that were already used or rejected by an earlier run are skipped
+# and the data from new logs gets added onto the end of the existing data files instead of replacing them
+# if store_matches is true, the matches also get stored in the match store so they can be queried
 # returns the number of valid logs that it stored data from, along with numpy arrays the data that was collected
-def fetch_log_data(log_ids, sid3s, include_randos=True, verbose=True):
+# (in incremental mode, only the newly collected data is returned)
+def fetch_log_data(log_ids, sid3s, include_randos=True, verbose=True, max_workers=default_fetch_workers,\
+	rate_limit=None, use_cache=True, offline=False, incremental=False, client=None, processes=None,\
+	checkpoint_interval=None, resume=False, store_matches=False):
 	if verbose:
 		print("Extracting log data and weeding out invalid logs...")
 
-	# array of ids of logs that were actually used
-	used_logs = np.array([], dtype=str)
+	if checkpoint_interval is not None and (type(checkpoint_interval) is not int or checkpoint_interval < 1):
+		raise ValueError("checkpoint_interval parameter must be a positive integer.")
 
-	# arrays of input data to collect from each log
-	players = np.empty((0, 12), str)
-	gamemodes = np.empty((0, 1), int)
-	maps = np.empty((0, 1), str)
-	dates = np.empty((0, 3), int)
-	weekdays = np.empty((0, 1), str)
+	if client is None:
+		client = create_http_client(rate_limit=rate_limit, pool_size=max_workers)
 
-	# arrays of output data to collect from each log
-	scores = np.empty((0, 2), int)
-	stats = np.empty((0, 67), int)
+	# if only new logs should be checked
+	if incremental:
+		# log ids that have already been checked by an earlier run
+		seen_logs = read_checked_logs()[0]
+		# only keep the logs that haven't been checked yet
+		log_ids = np.array([log_id for log_id in log_ids if str(log_id) not in seen_logs], dtype=str)
+		if verbose:
+			print(f"Skipping {len(seen_logs)} logs that were already checked...")
+
+	# list of (log id, rejection code) pairs of logs that weren't used
+	rejected_logs = []
+	# steamid3s that every player in a log has to be in (None lets any player be in a log)
+	valid_sid3s = None if include_randos else set(sid3s)
+
+	# builds the arrays of ids of logs that were actually used, input data, and output data from each log
+	records = RecordBuilder()
+	# codes of each gamemode and map (the ones already in the dataset are kept when adding onto it)
+	vocabularies = read_log_vocabularies() if incremental and dataset_exists(dataset_path) else new_vocabularies()
 
 	# number of logs to check
 	log_count = len(log_ids)
 	# counter for how many logs have been checked
 	counter = 0
-	# collect data from each log
-	for log_id in log_ids:
+
+	# saves the progress every few logs
+	checkpoint = None
+	if checkpoint_interval is not None or resume:
+		if checkpoint_interval is None:
+			checkpoint_interval = default_checkpoint_interval
+		checkpoint = FetchCheckpoint(checkpoint_path, log_ids, {"include_randos": include_randos,\
+			"incremental": incremental})
+		# pick up from the last checkpoint (if there is one)
+		if resume:
+			counter = checkpoint.load(records, rejected_logs, vocabularies)
+			if verbose and counter > 0:
+				print(f"Resuming from log {counter} of {log_count}...")
+		# start over if this isn't resuming (or there was nothing to resume)
+		if counter == 0:
+			checkpoint.clear()
+	# number of logs that were already checked before this run
+	start_counter = counter
+
+	# download logs on multiple threads
+	raw_logs = fetch_raw_logs(log_ids[start_counter:], client, max_workers=max_workers, use_cache=use_cache,\
+		offline=offline)
+	# collect data from each log (downloaded and parsed concurrently, but checked in the same order as log_ids)
+	for log_id, record, rejection in parse_log_records(raw_logs, sid3s=valid_sid3s, processes=processes):
+		# save the progress of all of the logs checked so far
+		if checkpoint is not None and counter > start_counter and (counter - start_counter) % checkpoint_interval == 0:
+			checkpoint.save(counter, records, rejected_logs, vocabularies)
 		counter += 1
 		if verbose:
 			print(f"\r[{counter}/{log_count}]: ", end="")
-		# Read json data of log
-
-		# concatenate to form json url and original log page url
-		log_json_url = log_tf_url + json_log_url + log_id
 
-		# request data from json file of log
-		response = None
-		response_success = False
-		data = None
-		# in case requesting http response fails on first try, loop until request succeeds
-		while not response_success:
-			try:
-				response = urlopen(log_json_url, context=unverified_context)
-				# turn data from json file into dictionary
-				data = json.loads(response.read())
-				response_success = True
-			except:
-				print(f"HTTP Error from log id {log_id}, trying again...")
-
-		# Check that all necessary dictionary keys exist
-
-		# make sure there is version data
-		if "version" not in data:
+		# if the log couldn't be downloaded or running offline and this log was never cached
+		# (these logs aren't counted as rejected since they might be valid next time)
+		if record is None and rejection is None:
 			if verbose:
-				print(f"Log version missing from log {log_id}")
+				print(f"Log {log_id} couldn't be downloaded or is not cached")
 			continue
-		# make sure there team data
-		if "teams" not in data:
-			if verbose:
-				print(f"Team data missing from log {log_id}")
-			continue
-		# make sure red and blu teams aren't missing
-		if "Red" not in data["teams"]:
-			if verbose:
-				print(f"Red team missing from log {log_id}")
-			continue
-		if "Blue" not in data["teams"]:
-			if verbose:
-				print(f"Blu team missing from log {log_id}")
-			continue
-		# make sure scores aren't missing from red and blu teams
-		if "score" not in data["teams"]["Red"]:
-			if verbose:
-				print(f"Score missing from red team in log {log_id}")
-			continue
-		if "score" not in data["teams"]["Blue"]:
-			if verbose:
-				print(f"Score missing from blu team in log {log_id}")
-			continue
-		# make sure there is player data
-		if "players" not in data:
-			if verbose:
-				print(f"Player data missing from log {log_id}")
-			continue
-		# make sure there is name data
-		if "names" not in data:
-			if verbose:
-				print(f"Names are missing from log {log_id}")
-			continue
-		# make sure there is extra info data
-		if "info" not in data:
-			if verbose:
-				print(f"Info field missing from log {log_id}")
-			continue
-		# make sure there is match length data
-		if "total_length" not in data["info"]:
-			if verbose:
-				print(f"Match length missing from log {log_id}")
-			continue
-		# make sure the map was recorded
-		if "map" not in data["info"]:
-			if verbose:
-				print(f"Map missing from log {log_id}")
+		# if the log isn't valid, record why and move on to the next one
+		if rejection is not None:
+			rejected_logs.append((log_id, rejection))
 			continue
-		# make sure there was a recorded date
-		if "date" not in data["info"]:
-			if verbose:
-				print(f"Date missing from log {log_id}")
-			continue
-
-		# Validate and extract necessary data from log
-
-		# make sure log version is correct
-		if data["version"] != 3:
-			if verbose:
-				print(f"Log version is not 3 in log {log_id}")
-			continue
-
-		# make sure scores are valid
-		if data["teams"]["Red"]["score"] > 5:
-			if verbose:
-				print(f"Red team score is too high (>5) in log {log_id}")
-			continue
-		if data["teams"]["Red"]["score"] < 0:
-			if verbose:
-				print(f"Red team score is too low (<0) in log {log_id}")
-			continue
-		if data["teams"]["Blue"]["score"] > 5:
-			if verbose:
-				print(f"Blu team score is too high (>5) in log {log_id}")
-			continue
-		if data["teams"]["Blue"]["score"] < 0:
-			if verbose:
-				print(f"Blu team score is too low (<0) in log {log_id}")
-			continue
-		# collect the scores of each team
-		score = np.array([data["teams"]["Red"]["score"], data["teams"]["Blue"]["score"]])
-
-		# collect the length of the match
-		match_length = np.array([data["info"]["total_length"]])
-
-		# find out if map is koth or control points
-		if "_" not in data["info"]["map"]:
-			if verbose:
-				print(f"Gamemode not found from map name in log {log_id}")
-			continue
-		# get the gamemode from the substring that comes before the first underscore in the map name
-		gamemode = np.array([data["info"]["map"][:data["info"]["map"].index("_")]])
-
-		# get map name
-		map_name_str = data["info"]["map"]
-		# remove map version from name if there is one
-		# (any characters after a second underscore, including the underscore)
-		if map_name_str.count("_") > 1:
-			first_underscore_index = map_name_str.index("_")
-			second_underscore_index = map_name_str[first_underscore_index + 1:].index("_") + first_underscore_index + 1
-			map_name_str = map_name_str[:second_underscore_index]
-		map_name = np.array(map_name_str, ndmin=1)
-
-		# get player data
-		player_data = data["players"]
-		# make sure there are 12 players
-		if len(player_data) != 12:
-			if verbose:
-				print(f"Player count is not 12 in log {log_id}")
-			continue
-
-		# adds player stats to numpy arrays
-		def _add_class_stats(player_stats, player, *keys):
-			# adds stats to stats list
-			for key in keys:
-				player_stats = np.append(player_stats, player[key])
-			
-			return player_stats
-
-		# arrays of players playing each class on each team that will be concatenated later
-		red_scouts = np.array([], dtype=str)
-		red_soldiers = np.array([], dtype=str)
-		red_demo = np.array([], dtype=str)
-		red_med = np.array([], dtype=str)
-		blu_scouts = np.array([], dtype=str)
-		blu_soldiers = np.array([], dtype=str)
-		blu_demo = np.array([], dtype=str)
-		blu_med = np.array([], dtype=str)
-		# arrays of stats for each player on each team
-		red_scouts_stats = np.array([], dtype=str)
-		red_soldiers_stats = np.array([], dtype=str)
-		red_demo_stats = np.array([], dtype=str)
-		red_med_stats = np.array([], dtype=str)
-		blu_scouts_stats = np.array([], dtype=str)
-		blu_soldiers_stats = np.array([], dtype=str)
-		blu_demo_stats = np.array([], dtype=str)
-		blu_med_stats = np.array([], dtype=str)
-
-		# flag to tell function to drop this log if there was en error encountered inside the loop
-		error = False
-
-		# loop through each player and put them in the correct list for their team and class
-		for sid3 in player_data:
-			# if include_randos argument was false
-			# make sure this is a player that was inputted to be trained on by the neural net
-			if not include_randos and sid3 not in sid3s:
-				if verbose:
-					print(f"Player {sid3} in log {log_id} not in list of players to train on")
-				error = True
-				break
-
-			player = player_data[sid3]
-			# keys names for each statistic
-			key_team = "team"
-			key_stats = "class_stats"
-			key_type = "type"
-			key_kills = "kills"
-			key_assists = "assists"
-			key_deaths = "deaths"
-			key_dmg = "dmg"
-			key_dt = "dt"
-			# make sure the team value exists for this player
-			if key_team not in player:
-				if verbose:
-					print(f"Team info missing for player {sid3} in log {log_id}")
-				error = True
-				break
-			# make sure the class_stats value exists for this player
-			if key_stats not in player or len(player[key_stats]) < 1:
-				if verbose:
-					print(f"Class stats missing for player {sid3} in log {log_id}")
-				error = True
-				break
-			# make sure the type of class the player played exists for this player
-			if key_type not in player[key_stats][0]:
-				if verbose:
-					print(f"Class type missing for player {sid3} in log {log_id}")
-				error = True
-				break
-			# make sure the kills were recorded
-			if key_kills not in player:
-				if verbose:
-					print(f"Kills missing from player {sid3} in log {log_id}")
-				error = True
-				break
-			# make sure the assists were recorded
-			if key_assists not in player:
-				if verbose:
-					print(f"Assists missing from player {sid3} in log {log_id}")
-				error = True
-				break
-			# make sure the deaths were recorded
-			if key_deaths not in player:
-				if verbose:
-					print(f"Deaths missing from player {sid3} in log {log_id}")
-				error = True
-				break
-			# make sure the damage was recorded
-			if key_dmg not in player:
-				if verbose:
-					print(f"Damage missing from player {sid3} in log {log_id}")
-				error = True
-				break
-			# make sure the damage taken was recorded
-			if key_dt not in player:
-				if verbose:
-					print(f"Damage taken missing from player {sid3} in log {log_id}")
-				error = True
-				break
-
-			# if the player was on the red team
-			if player[key_team] == "Red":
-				# determine which class the player played
-				if player[key_stats][0][key_type] == "scout":
-					# place them in the correct team / class list for sorting
-					red_scouts = np.append(red_scouts, sid3)
-					# add their stats to the correct team / class list for sorting
-					red_scouts_stats = _add_class_stats(red_scouts_stats, player, key_kills, key_assists,\
-						key_deaths, key_dmg, key_dt)
-				elif player[key_stats][0][key_type] == "soldier":
-					red_soldiers = np.append(red_soldiers, sid3)
-					red_soldiers_stats = _add_class_stats(red_soldiers_stats, player, key_kills, key_assists,\
-						key_deaths, key_dmg, key_dt)
-				elif player[key_stats][0][key_type] == "demoman":
-					red_demo = np.append(red_demo, sid3)
-					red_demo_stats = _add_class_stats(red_demo_stats, player, key_kills, key_assists,\
-						key_deaths, key_dmg, key_dt)
-				elif player[key_stats][0][key_type] == "medic":
-					# key names for each medic statistic
-					key_heals = "heal"
-					key_ubers = "ubers"
-					key_drops = "drops"
-					# make sure keys for medic stats exist for each class
-					if key_heals not in player:
-						if verbose:
-							print(f"Heals missing from from medic {sid3} in log {log_id}")
-						error = True
-						break
-					if key_ubers not in player:
-						if verbose:
-							print(f"Ubers missing from medic {sid3} in log {log_id}")
-						error = True
-						break
-					if key_drops not in player:
-						if verbose:
-							print(f"Drops missing from medic {sid3} in log {log_id}")
-						error = True
-						break
-					# place them in the correct team / class list for sorting
-					red_med = np.append(red_med, sid3)
-					# add their stats to the correct team / class list for sorting
-					red_med_stats = _add_class_stats(red_med_stats, player, key_kills, key_assists,\
-				    	key_deaths, key_dmg, key_dt, key_heals, key_ubers, key_drops)
-				# if the class isn't a meta sixes class
-				else:
-					if verbose:
-						print(f"Primary class is non-sixes meta for player {sid3} in log {log_id}")
-					error = True
-					break
-			# if the player was on the blu team
-			elif player[key_team] == "Blue":
-				# determine which class the player played
-				if player[key_stats][0][key_type] == "scout":
-					# place them in the correct team / class list for sorting
-					blu_scouts = np.append(blu_scouts, sid3)
-					# add their stats to the correct team / class list for sorting
-					blu_scouts_stats = _add_class_stats(blu_scouts_stats, player, key_kills, key_assists,\
-						key_deaths, key_dmg, key_dt)
-				elif player[key_stats][0][key_type] == "soldier":
-					blu_soldiers = np.append(blu_soldiers, sid3)
-					blu_soldiers_stats = _add_class_stats(blu_soldiers_stats, player, key_kills, key_assists,\
-						key_deaths, key_dmg, key_dt)
-				elif player[key_stats][0][key_type] == "demoman":
-					blu_demo = np.append(blu_demo, sid3)
-					blu_demo_stats = _add_class_stats(blu_demo_stats, player, key_kills, key_assists,\
-						key_deaths, key_dmg, key_dt)
-				elif player[key_stats][0][key_type] == "medic":
-					# key names for each medic statistic
-					key_heals = "heal"
-					key_ubers = "ubers"
-					key_drops = "drops"
-					# make sure keys for medic stats exist for each class
-					if key_heals not in player:
-						if verbose:
-							print(f"Heals missing from from medic {sid3} in log {log_id}")
-						error = True
-						break
-					if key_ubers not in player:
-						if verbose:
-							print(f"Ubers missing from medic {sid3} in log {log_id}")
-						error = True
-						break
-					if key_drops not in player:
-						if verbose:
-							print(f"Drops missing from medic {sid3} in log {log_id}")
-						error = True
-						break
-					# place them in the correct team / class list for sorting
-					blu_med = np.append(blu_med, sid3)
-					# add their stats to the correct team / class list for sorting
-					blu_med_stats = _add_class_stats(blu_med_stats, player, key_kills, key_assists,\
-						key_deaths, key_dmg, key_dt, key_heals, key_ubers, key_drops)
-				# if the class isn't a meta sixes class
-				else:
-					if verbose:
-						print(f"Primary class is non-sixes meta for player {sid3} in log {log_id}")
-					error = True
-					break
-			# if the team wasn't recognized
-			else:
-				if verbose:
-					print(f"Unknown team for player {sid3} in log {log_id}")
-				error = True
-				break
-		
-		# if there was an error encountered inside the loop
-		if error:
-			# stop using this log and move to next one
-			continue
-
-		# make sure there are the correct amount of players for each class on each team
-		if len(red_scouts) != 2:
-			if verbose:
-				print(f"Not 2 scouts on red team in log {log_id}")
-			continue
-		elif len(red_soldiers) != 2:
-			if verbose:
-				print(f"Not 2 soldiers on red team in log {log_id}")
-			continue
-		elif len(red_demo) != 1:
-			if verbose:
-				print(f"Not 1 demo on red team in log {log_id}")
-			continue
-		elif len(red_med) != 1:
-			if verbose:
-				print(f"Not 1 med on red team in log {log_id}")
-			continue
-		elif len(blu_scouts) != 2:
-			if verbose:
-				print(f"Not 2 scouts on blu team in log {log_id}")
-			continue
-		elif len(blu_soldiers) != 2:
-			if verbose:
-				print(f"Not 2 soldiers on blu team in log {log_id}")
-			continue
-		elif len(blu_demo) != 1:
-			if verbose:
-				print(f"Not 1 demo on blu team in log {log_id}")
-			continue
-		elif len(blu_med) != 1:
-			if verbose:
-				print(f"Not 1 med on blu team in log {log_id}")
-			continue
-
-		# combine all steam id 3s into one array
-		player_sid3s = np.hstack((red_scouts, red_soldiers, red_demo, red_med,\
-			blu_scouts, blu_soldiers, blu_demo, blu_med))
-		# combine all stats into one array including match length
-		match_stats = np.hstack((match_length, red_scouts_stats, red_soldiers_stats, red_demo_stats, red_med_stats,\
-			blu_scouts_stats, blu_soldiers_stats, blu_demo_stats, blu_med_stats))
-
-		# get all player names
-		player_names = data["names"]
-		# make sure there are 12 player names
-		if len(player_names) != 12:
-			if verbose:
-				print(f"There aren't 12 player names in log {log_id}")
-			continue
-
-		# flag to tell function to drop this log if there was en error encountered inside the loop
-		error = False
-
-		# print out each player name and steam id 3
-		for sid3 in player_sid3s:
-			# make sure all of the steam id 3s have a player name linked to them
-			if sid3 not in player_names:
-				if verbose:
-					print(f"Player {sid3} doesn't have a name in log {log_id}")
-				error = True
-				break
-
-		# if there was an error encountered inside the loop
-		if error:
-			continue
-
-		# get match date in us eastern timezone (since that's the standard timezone for tf2 in na)
-		match_datetime = datetime.fromtimestamp(data["info"]["date"], tz=pytz.timezone("US/Eastern"))
-		# get match year, month, day, and day of the week
-		match_date = np.array([match_datetime.year, match_datetime.month, match_datetime.day])
-		match_weekday = np.array(match_datetime.strftime("%A"), ndmin=1)
 
 		# add all of the data collected from this match to the collective data arrays
+		# (log id that was used, input data, and output data)
+		records.append(**encode_log_record(log_id, record, vocabularies))
 
-		# log id that was used
-		used_logs = np.append(used_logs, log_id)
-
-		# input data
-		players = np.vstack((players, player_sid3s))
-		gamemodes = np.vstack((gamemodes, gamemode))
-		maps = np.vstack((maps, map_name))
-		dates = np.vstack((dates, match_date))
-		weekdays = np.vstack((weekdays, match_weekday))
-
-		# output data
-		scores = np.vstack((scores, score))
-		stats = np.vstack((stats, match_stats))
+	# turn the collected data into arrays all at once (and work out the dates of every match at once)
+	records = add_date_columns(records.finalize())
+	used_logs = records["used_logs"]
 
 	if verbose:
-		print(f"\nUsed {used_logs.size} logs. Storing data into csv files...")
-
-	# if there isn't already a folder for the data, create one
-	if not os.path.isdir(data_path):
-		os.mkdir(data_path)
-	
-	# create data frames for each array
-	df_used_logs = pd.DataFrame(used_logs)
-
-	df_players = pd.DataFrame(players)
-	df_gamemodes = pd.DataFrame(gamemodes)
-	df_maps = pd.DataFrame(maps)
-	df_dates = pd.DataFrame(dates)
-	df_weekdays = pd.DataFrame(weekdays)
+		print(f"\nUsed {used_logs.size} logs and rejected {len(rejected_logs)} logs.")
+		# print how many logs were rejected for each reason
+		print_rejection_counts(Counter(rejection for _, rejection in rejected_logs))
+		print("Storing data into csv files...")
 
-	df_scores = pd.DataFrame(scores)
-	df_stats = pd.DataFrame(stats)
+	store_log_data(records, vocabularies, rejected_logs, append=incremental, store_matches=store_matches)
+	# the checkpoint isn't needed anymore once everything is stored
+	if checkpoint is not None:
+		checkpoint.clear()
 
-	# column name of index column in csv files
-	index_label = "Index"
-
-	# store ids of logs that were valid and will be used to csv files
-	df_used_logs.to_csv(used_logs_path, index_label=index_label, header=["Log ID"])
-
-	# store input data into csv files
-	df_players.to_csv(player_data_path, index_label=index_label, header=[\
-		"Red Scout 1", "Red Scout 2", "Red Soldier 1", "Red Soldier 2", "Red Demo", "Red Medic",\
-		"Blu Scout 1", "Blu Scout 2", "Blu Soldier 1", "Blu Soldier 2", "Blu Demo", "Blu Medic"])
-	df_gamemodes.to_csv(gamemode_data_path, index_label=index_label, header=["Gamemode"])
-	df_maps.to_csv(maps_data_path, index_label=index_label, header=["Map"])
-	df_dates.to_csv(dates_data_path, index_label=index_label, header=["Year", "Month", "Day"])
-	df_weekdays.to_csv(weekdays_data_path, index_label=index_label, header=["Weekday"])
-
-	# store output data into csv files
-	df_scores.to_csv(scores_data_path, index_label=index_label, header=["Red Score", "Blu Score"])
-	df_stats.to_csv(stats_data_path, index_label=index_label, header=["Match Length",\
-		"Red Scout 1 Kills", "Red Scout 1 Assists", "Red Scout 1 Deaths",\
-		"Red Scout 1 Damage", "Red Scout 1 Damage Taken",\
-		"Red Scout 2 Kills", "Red Scout 2 Assists", "Red Scout 2 Deaths",\
-		"Red Scout 2 Damage", "Red Scout 2 Damage Taken",\
-		"Red Soldier 1 Kills", "Red Soldier 1 Assists", "Red Soldier 1 Deaths",\
-		"Red Soldier 1 Damage", "Red Soldier 1 Damage Taken",\
-		"Red Soldier 2 Kills", "Red Soldier 2 Assists", "Red Soldier 2 Deaths",\
-		"Red Soldier 2 Damage", "Red Soldier 2 Damage Taken",\
-		"Red Demo Kills", "Red Demo Assists", "Red Demo Deaths",\
-		"Red Demo Damage", "Red Demo Damage Taken",\
-		"Red Medic Kills", "Red Medic Assists", "Red Medic Deaths",\
-		"Red Medic Damage", "Red Medic Damage Taken",\
-		"Red Medic Heals", "Red Medic Ubers", "Red Medic Drops",\
-		"Blu Scout 1 Kills", "Blu Scout 1 Assists", "Blu Scout 1 Deaths",\
-		"Blu Scout 1 Damage", "Blu Scout 1 Damage Taken",\
-		"Blu Scout 2 Kills", "Blu Scout 2 Assists", "Blu Scout 2 Deaths",\
-		"Blu Scout 2 Damage", "Blu Scout 2 Damage Taken",\
-		"Blu Soldier 1 Kills", "Blu Soldier 1 Assists", "Blu Soldier 1 Deaths",\
-		"Blu Soldier 1 Damage", "Blu Soldier 1 Damage Taken",\
-		"Blu Soldier 2 Kills", "Blu Soldier 2 Assists", "Blu Soldier 2 Deaths",\
-		"Blu Soldier 2 Damage", "Blu Soldier 2 Damage Taken",\
-		"Blu Demo Kills", "Blu Demo Assists", "Blu Demo Deaths",\
-		"Blu Demo Damage", "Blu Demo Damage Taken",\
-		"Blu Medic Kills", "Blu Medic Assists", "Blu Medic Deaths",\
-		"Blu Medic Damage", "Blu Medic Damage Taken",\
-		"Blu Medic Heals", "Blu Medic Ubers", "Blu Medic Drops"])
-	
 	if verbose:
 		print("Data stored.")
 
+	players = records["players"]
+	gamemodes = records["gamemodes"]
+	maps = records["maps"]
+	dates = records["dates"]
+	weekdays = records["weekdays"]
+	scores = records["scores"]
+	stats = records["stats"]
+
 	# return the number of valid logs that it stored data from, along with all of the data collected
 	return used_logs.size, used_logs, players, gamemodes, maps, dates, weekdays, scores, stats
 
-# converts an np array from any value type / range into an array of scalar values between 0 and 1
-def to_scalars(values):
-	classes = np.unique(values)
-	indexed_values = np.searchsorted(classes, values) + 1
-	return get_scaled(indexed_values)
-
-# returns a scaled version of an np array of numbers down to between 0 and 1 (assuming the values are nonnegative)
-def get_scaled(values):
-	max_value = np.max(values)
-	return values / max_value
-
-# converts a string of the day of the week into a scalar value between 0 and 1
-def weekday_to_scalar(weekday):
-	match weekday.lower():
-		case "sunday":
-			return 1 / 7
-		case "monday":
-			return 2 / 7
-		case "tuesday":
-			return 3 / 7
-		case "wednesday":
-			return 4 / 7
-		case "thursday":
-			return 5 / 7
-		case "friday":
-			return 6 / 7
-		case "saturday":
-			return 1
-		case _:
-			raise ValueError("Invalid day of the week")
-
-# prepares data to be fed into the goblin
-# reads data from csv files if data that was passed is none
-def prepare_log_data(players=None, gamemodes=None, maps=None, dates=None, weekdays=None, scores=None, stats=None, verbose=True):
-	# if there isn't a folder for the data
-	if not os.path.isdir(data_path):
-		raise FileNotFoundError("Missing data folder.")
-	
-	if verbose:
-		print("Recollecting data to prepare it...")
-
-	# if not data was passed as a parameter, read data from csv files and turn it into arrays
-	if players is None:
-		# if any of the data files are missing
-		if not os.path.isfile(player_data_path):
-			raise FileNotFoundError("Missing player data file")
-		players = np.delete(np.array(pd.read_csv(player_data_path)), 0, 1)
-	if gamemodes is None:
-		if not os.path.isfile(gamemode_data_path):
-			raise FileNotFoundError("Missing gamemode data file")
-		gamemodes = np.delete(np.array(pd.read_csv(gamemode_data_path)), 0, 1)
-	if maps is None:
-		if not os.path.isfile(maps_data_path):
-			raise FileNotFoundError("Missing map data file")
-		maps = np.delete(np.array(pd.read_csv(maps_data_path)), 0, 1)
-	if dates is None:
-		if not os.path.isfile(dates_data_path):
-			raise FileNotFoundError("Missing date data file")
-		dates = np.delete(np.array(pd.read_csv(dates_data_path)), 0, 1)
-	if weekdays is None:
-		if not os.path.isfile(weekdays_data_path):
-			raise FileNotFoundError("Missing weekday data file")
-		weekdays = np.delete(np.array(pd.read_csv(weekdays_data_path)), 0, 1)
-	if scores is None:
-		if not os.path.isfile(scores_data_path):
-			raise FileNotFoundError("Missing score data file")
-		scores = np.delete(np.array(pd.read_csv(scores_data_path)), 0, 1)
-	if stats is None:
-		if not os.path.isfile(stats_data_path):
-			raise FileNotFoundError("Missing stats data file")
-		stats = np.delete(np.array(pd.read_csv(stats_data_path)), 0, 1)
-
-	# Encode the categorical data with one hot encoding
-
-	if verbose:
-		print("Preparing data to be fed into the goblin...")
-
-	# index players from steam IDs to normalized numbers
-	players_indexed = to_scalars(players)
-
-	# index gamemodes from strings to normalized numbers
-
-	# get unique gamemodes
-	classes = np.unique(gamemodes)
-	# make sure both koth and control points are encoded in
-	if "koth" not in classes:
-		classes = np.append(classes, "koth")
-	if "cp" not in classes:
-		classes = np.append(classes, "cp")
-	gamemodes_indexed = np.searchsorted(classes, gamemodes.flatten()) + 1
-	gamemodes_indexed = get_scaled(gamemodes_indexed)
+# returns an array of the sine and cosine of the month, day of the week, and hour of the day of each match, so values
+# that are next to each other in time (like december and january) are next to each other as inputs
+# dates is the array of [year, month, day], weekdays is the array of their codes, and hours is from get_match_dates()
+def get_cyclical_date_features(dates, weekdays, hours):
+	angles = np.column_stack(((np.asarray(dates)[:, 1] - 1) / 12, (np.asarray(weekdays).reshape(-1) - 1) / 7,\
+		np.asarray(hours).reshape(-1) / 24)) * 2 * np.pi
+	return np.hstack((np.sin(angles), np.cos(angles)))
+
+# returns the inputs of the goblin of who played each match and where and when it was played (before any of the
+# optional features of prepare_log_data())
+# players, gamemodes, maps, dates, and weekdays are the columns of the dataset, vocabularies is the dictionary of the
+# Vocabulary that the gamemode and map codes are from, and encoders is the dictionary of encoders from
+# prepare_log_data(), so rows that are added later are encoded the same way as the rows they're added to
+def encode_log_inputs(players, gamemodes, maps, dates, weekdays, vocabularies, encoders):
+	dates = np.asarray(dates).reshape(-1, 3)
+
+	# index players from account ids to normalized numbers
+	players_indexed = encoders["players"].scale(players)
+
+	# index gamemodes from codes to normalized numbers
+	gamemodes_indexed = scale_codes(encoders["gamemodes"], np.asarray(gamemodes).flatten(), vocabularies["gamemodes"])
 	# reshape array so it can be stacked horizontally with players_indexed
 	gamemodes_indexed = np.reshape(gamemodes_indexed, (gamemodes_indexed.size, 1))
 
-	# index maps from strings to normalized numbers
-	maps_indexed = to_scalars(maps)
+	# index maps from codes to normalized numbers
+	maps_indexed = scale_codes(encoders["maps"], np.asarray(maps).flatten(), vocabularies["maps"])
 	# reshape array so it can be stacked horizontally with players_indexed
 	maps_indexed = np.reshape(maps_indexed, (maps_indexed.size, 1))
 
 	# get years as normalized numbers
-	years = dates[:, 0] - 2006 # year tf2 was released - 1
-	years = get_scaled(years)
-	# reshape array so it can be stacked horizontally with players_indexed
-	years = np.reshape(years, (years.size, 1))
+	years = encoders["years"].scale(dates[:, :1] - first_year)
 
 	# get months as normalized numbers
 	months = dates[:, 1] / 12
@@ -940,18 +1117,103 @@ def prepare_log_data(players=None, gamemodes=None, maps=None, dates=None, weekda
 	# reshape array so it can be stacked horizontally with players_indexed
 	days = np.reshape(days, (days.size, 1))
 
-	# index weekdays from strings to normalized numbers
-	weekdays_indexed = np.array([weekday_to_scalar(weekday) for weekday in weekdays.flatten()])
+	# index weekdays from codes to normalized numbers
+	weekdays_indexed = np.asarray(weekdays).flatten() / 7
 	# reshape array so it can be stacked horizontally with players_indexed
 	weekdays_indexed = np.reshape(weekdays_indexed, (weekdays_indexed.size, 1))
 
+	return np.hstack((players_indexed, gamemodes_indexed, maps_indexed, years, months, days, weekdays_indexed))
+
+# returns the outputs of the goblin of the scores of each match (the score of each team one hot encoded)
+def encode_log_outputs(scores):
+	scores = np.asarray(scores)
+	return np.eye(score_cap)[scores].reshape(scores.shape[0], scores.shape[1] * score_cap)
+
+# prepares data to be fed into the goblin
+# reads data from the dataset if data that was passed is none
+# vocabularies is the dictionary of the Vocabulary that the gamemode and map codes are from (read from the dataset if
+# it's none)
+# if cyclical_dates is true, the sine and cosine of the month, day of the week, and hour of the day (from timestamps,
+# which are read from the dataset if they're none) are added onto the end of the inputs
+# if player_form is true, the form of each player going into each match (see player_form.py) is added onto the end of
+# the inputs, worked out only from the matches that were played before it
+# if player_ratings is true, the rating of each player going into each match (see player_ratings.py) is added onto the
+# end of the inputs the same way
+# if player_synergy is true, how well each team's players have done together and against the other team's players going
+# into each match (see player_synergy.py) is added onto the end of the inputs the same way
+# if canonical_lineups is true, players of the same class on the same team (and their stats) are sorted by account id
+# so the same lineup is always in the same order
+# the input column that each input column comes from when red and blu are swapped is stored too, so training can add
+# mirrored matches
+def prepare_log_data(players=None, gamemodes=None, maps=None, dates=None, weekdays=None, scores=None, stats=None,\
+	verbose=True, vocabularies=None, timestamps=None, cyclical_dates=False, player_form=False, player_ratings=False,\
+	player_synergy=False, canonical_lineups=True):
+	# if there isn't a folder for the data
+	if not os.path.isdir(data_path):
+		raise FileNotFoundError("Missing data folder.")
+	
+	if verbose:
+		print("Recollecting data to prepare it...")
+
+	# if not data was passed as a parameter, read it from the dataset
+	if players is None or gamemodes is None or maps is None or dates is None or weekdays is None or scores is None or\
+		stats is None:
+		dataset = read_log_dataset()
+		players = dataset["players"] if players is None else players
+		gamemodes = dataset["gamemodes"] if gamemodes is None else gamemodes
+		maps = dataset["maps"] if maps is None else maps
+		dates = dataset["dates"] if dates is None else dates
+		weekdays = dataset["weekdays"] if weekdays is None else weekdays
+		scores = dataset["scores"] if scores is None else scores
+		stats = dataset["stats"] if stats is None else stats
+	if vocabularies is None:
+		vocabularies = read_log_vocabularies()
+	# put players of the same class on the same team in order (every match at once)
+	if canonical_lineups:
+		players, stats = canonicalize_lineups(players, stats)
+
+	# Encode the categorical data with one hot encoding
+
+	if verbose:
+		print("Preparing data to be fed into the goblin...")
+
+	# fit the encoders of players, gamemodes, and maps, which get stored with the model so matches are encoded the same
+	# way when predicting (making sure both koth and control points are encoded in)
+	encoders = fit_log_encoders(players, gamemodes, maps, vocabularies)
+
+	# the years are scaled by the latest year, which gets stored with the encoders so rows added later are scaled the
+	# same way
+	encoders["years"] = FeatureScaler([np.max(dates[:, 0]) - first_year])
+	inputs = [encode_log_inputs(players, gamemodes, maps, dates, weekdays, vocabularies, encoders)]
+
+	# get the cyclical encodings of when each match was played
+	if (cyclical_dates or player_form or player_ratings or player_synergy) and timestamps is None:
+		timestamps = read_log_dataset()["timestamps"]
+	if cyclical_dates:
+		inputs.append(get_cyclical_date_features(dates, weekdays, get_match_dates(timestamps)["hours"]))
+
+	# get the form and rating of each player going into each match from the matches they played before it
+	# (the form is scaled by fixed scales that are stored with the encoders, and the ratings are kept in rows that are the
+	# codes of the player encoder)
+	player_features = []
+	if player_form:
+		encoders["form"] = get_form_scaler()
+		player_features.append(get_form_inputs(get_player_form(players, timestamps, stats, scores), encoders["form"]))
+	if player_ratings:
+		player_features.append(get_rating_inputs(get_player_ratings(players, timestamps, scores,\
+			player_encoder=encoders["players"])[0]))
+	# get the synergy of each team going into each match the same way
+	team_features = []
+	if player_synergy:
+		encoders["synergy"] = get_synergy_scaler()
+		team_features.append(get_synergy_inputs(get_player_synergy(players, timestamps, scores,\
+			player_encoder=encoders["players"]), encoders["synergy"]))
+
 	# one hot encode team scores
-	score_cap = 6
-	scores_onehot = np.eye(score_cap)[scores].reshape(scores.shape[0], scores.shape[1] * score_cap)
+	scores_onehot = encode_log_outputs(scores)
 
 	# use np.hstack() to horizontally combine the input arrays together
-	inputs = np.hstack((players_indexed, gamemodes_indexed, maps_indexed, years, months, days,\
-		weekdays_indexed))
+	inputs = np.hstack((*inputs, *player_features, *team_features))
 	
 	if verbose:
 		print("Data prepared for goblin feeding. Storing prepared data into csv files...")
@@ -963,35 +1225,93 @@ def prepare_log_data(players=None, gamemodes=None, maps=None, dates=None, weekda
 	# write inputs and outputs to csv files
 	df_inputs.to_csv(inputs_data_path, header=False, index=False)
 	df_outputs.to_csv(outputs_data_path, header=False, index=False)
+	# write inputs and outputs to binary files that training can memory map
+	store_matrices(inputs, scores_onehot)
+	# write the sparse lineup columns, which can be fed in instead of the scalar player inputs
+	store_columns(get_lineup_columns(players, encoders["players"]), lineups_matrix_path)
+	# write the stats in the same slot order as the player columns of the inputs
+	_store_matrix(np.asarray(stats), stats_matrix_path)
+	# write where each input column comes from when red and blu are swapped (the player columns come first and the
+	# form, rating, and synergy columns come last)
+	slot_columns = [(0, 1)]
+	team_columns = []
+	start = inputs.shape[1] - sum(features.shape[1] for features in [*player_features, *team_features])
+	for features in player_features:
+		slot_columns.append((start, features.shape[1] // players_per_log))
+		start += features.shape[1]
+	for features in team_features:
+		team_columns.append((start, features.shape[1] // 2))
+		start += features.shape[1]
+	store_columns(get_mirror_columns(inputs.shape[1], slot_columns, team_columns), mirror_matrix_path)
+	# write the encoders that the inputs were encoded with
+	store_encoders(encoders, encoders_path)
 
 	if verbose:
 		print("Prepared data stored.")
 	
 	return inputs, scores_onehot, stats
 
+# stores an array into a .npy file
+# it's written to a temporary file and then renamed so training never reads a half written file
+def _store_matrix(matrix, path):
+	temp_path = f"{path}.{os.getpid()}.tmp"
+	with open(temp_path, "wb") as matrix_file:
+		np.save(matrix_file, matrix)
+	os.replace(temp_path, path)
+
+# stores the prepared inputs as float32 and the one hot outputs as uint8 into .npy files
+def store_matrices(inputs, outputs):
+	_store_matrix(np.asarray(inputs, dtype=np.float32), inputs_matrix_path)
+	_store_matrix(np.asarray(outputs, dtype=np.uint8), outputs_matrix_path)
+
+# adds prepared inputs, outputs, lineup columns, and stats of new matches onto the end of the .npy files stored by
+# prepare_log_data() in place, without reading or rewriting the rows already in them
+# rows is how many rows the files had after the last time they were stored (rows past it are left over from an append
+# that didn't finish and get written over)
+# a file whose header has no room for more rows is stored again with the new rows instead
+def append_matrices(inputs, outputs, lineups, stats, rows):
+	for matrix, path in [(np.asarray(inputs, dtype=np.float32), inputs_matrix_path),\
+		(np.asarray(outputs, dtype=np.uint8), outputs_matrix_path),\
+		(np.asarray(lineups, dtype=np.int32), lineups_matrix_path), (np.asarray(stats), stats_matrix_path)]:
+		if not append_npy(path, matrix, rows):
+			_store_matrix(np.concatenate((np.load(path)[:rows], matrix)), path)
+
 # gets the inputs and outputs
-def read_log_data(with_stats=False, verbose=True):
+# they're memory mapped from the .npy files made by prepare_log_data(), so reading them is almost instant and every
+# process that reads them shares the same memory (inputs are float32 and outputs are uint8)
+# if with_stats is true, the stats of each match are returned too, in the same slot order as the player columns of the
+# inputs (players of the same class on the same team are sorted the same way as when the data was prepared)
+# if mmap is false, they're read into memory instead
+def read_log_data(with_stats=False, verbose=True, mmap=True):
 	if verbose:
-		print("Reading prepared data from csv files...")
+		print("Reading prepared data...")
 
 	# if there isn't a folder for the data
 	if not os.path.isdir(data_path):
 		raise FileNotFoundError("Missing data folder.")
-	# make sure csv data files exist
-	if not os.path.isfile(inputs_data_path):
-		raise FileNotFoundError("Missing input data file")
-	if not os.path.isfile(outputs_data_path):
-		raise FileNotFoundError("Missing output data file")
-	if with_stats and not os.path.isfile(stats_data_path):
-		raise FileNotFoundError("Missing stats data file")
-	
-	# get inputs and outputs for goblin from csv files
-	inputs = np.array(pd.read_csv(inputs_data_path, header=None))
-	outputs = np.array(pd.read_csv(outputs_data_path, header=None))
+	# data prepared before the .npy files existed only has csv files, so convert them once
+	if not os.path.isfile(inputs_matrix_path) or not os.path.isfile(outputs_matrix_path):
+		# make sure csv data files exist
+		if not os.path.isfile(inputs_data_path):
+			raise FileNotFoundError("Missing input data file")
+		if not os.path.isfile(outputs_data_path):
+			raise FileNotFoundError("Missing output data file")
+		store_matrices(np.array(pd.read_csv(inputs_data_path, header=None)),\
+			np.array(pd.read_csv(outputs_data_path, header=None)))
+
+	# get inputs and outputs for goblin from the binary files
+	mmap_mode = "r" if mmap else None
+	inputs = np.load(inputs_matrix_path, mmap_mode=mmap_mode)
+	outputs = np.load(outputs_matrix_path, mmap_mode=mmap_mode)
 	# if the stats were requested
 	if with_stats:
-		# get stats from csv file
-		stats = np.array(pd.read_csv(stats_data_path))
+		# get the stats that were stored with the prepared data
+		if os.path.isfile(stats_matrix_path):
+			stats = np.load(stats_matrix_path, mmap_mode=mmap_mode)
+		# data prepared before the stats were stored with it gets the stats from the dataset put in the same order
+		else:
+			dataset = read_log_dataset(mmap=mmap)
+			stats = canonicalize_lineups(dataset["players"], dataset["stats"])[1]
 
 		if verbose:
 			print("Prepared data collected")
@@ -1035,27 +1355,260 @@ if __name__ == "__main__":
 			exit(2)
 
 	verbose = True
-	# user can provide argument to not print any messages during execution
-	if len(sys.argv) > 3:
-		if sys.argv[3] == "-s" or sys.argv[3] == "--silent":
+	max_workers = default_fetch_workers
+	rate_limit = None
+	max_attempts = default_max_attempts
+	processes = None
+	use_cache = True
+	offline = False
+	incremental = False
+	since = None
+	backend = "api"
+	stream = False
+	chunk_size = None
+	checkpoint_interval = None
+	resume = False
+	export_csv = False
+	store_matches = False
+	cyclical_dates = False
+	player_form = False
+	player_ratings = False
+	player_synergy = False
+
+	# loop through each optional argument after the required ones
+	i = 3
+	while i < len(sys.argv):
+		# user can provide argument to not print any messages during execution
+		if sys.argv[i] == "-s" or sys.argv[i] == "--silent":
 			verbose = False
+		# argument to set how many logs get downloaded at the same time
+		elif sys.argv[i] == "-w" or sys.argv[i] == "--workers":
+			i += 1
+			# make sure there is a follow up argument that is a positive integer
+			if i >= len(sys.argv):
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+			try:
+				max_workers = int(sys.argv[i])
+			except ValueError:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+			if max_workers < 1:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+		# argument to set the max number of requests per second sent to logs.tf
+		elif sys.argv[i] == "-r" or sys.argv[i] == "--rate-limit":
+			i += 1
+			# make sure there is a follow up argument that is a positive number
+			if i >= len(sys.argv):
+				print(f"ERROR: {sys.argv[i-1]} requires a positive number after it.")
+				exit(2)
+			try:
+				rate_limit = float(sys.argv[i])
+			except ValueError:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive number after it.")
+				exit(2)
+			if rate_limit <= 0:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive number after it.")
+				exit(2)
+		# argument to set how many times a request to logs.tf gets sent before giving up on it
+		elif sys.argv[i] == "-a" or sys.argv[i] == "--attempts":
+			i += 1
+			# make sure there is a follow up argument that is a positive integer
+			if i >= len(sys.argv):
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+			try:
+				max_attempts = int(sys.argv[i])
+			except ValueError:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+			if max_attempts < 1:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+		# argument to set how many processes to parse and check logs with
+		elif sys.argv[i] == "-p" or sys.argv[i] == "--processes":
+			i += 1
+			# make sure there is a follow up argument that is a positive integer
+			if i >= len(sys.argv):
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+			try:
+				processes = int(sys.argv[i])
+			except ValueError:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+			if processes < 1:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+		# argument to only use logs from the log cache instead of requesting them from logs.tf
+		elif sys.argv[i] == "-o" or sys.argv[i] == "--offline":
+			offline = True
+		# argument to not read from or store logs in the log cache
+		elif sys.argv[i] == "-nc" or sys.argv[i] == "--no-cache":
+			use_cache = False
+		# argument to only check logs that haven't been checked before and add them onto the existing data
+		elif sys.argv[i] == "-inc" or sys.argv[i] == "--incremental":
+			incremental = True
+		# argument to choose how to get the list of logs of each player
+		elif sys.argv[i] == "-b" or sys.argv[i] == "--backend":
+			i += 1
+			# make sure there is a follow up argument that is a backend name
+			if i >= len(sys.argv) or sys.argv[i] not in log_list_backends:
+				print(f"ERROR: {sys.argv[i-1]} requires one of {', '.join(log_list_backends)} after it.")
+				exit(2)
+			backend = sys.argv[i]
+		# argument to stop reading a player's logs once they're older than a date
+		elif sys.argv[i] == "--since":
+			i += 1
+			# make sure there is a follow up argument that is a date
+			if i >= len(sys.argv):
+				print(f"ERROR: {sys.argv[i-1]} requires a date in the format YYYY-MM-DD after it.")
+				exit(2)
+			try:
+				since = pytz.timezone("US/Eastern").localize(datetime.strptime(sys.argv[i], "%Y-%m-%d"))
+			except ValueError:
+				print(f"ERROR: {sys.argv[i-1]} requires a date in the format YYYY-MM-DD after it.")
+				exit(2)
+		# argument to crawl, download, check, and store logs as one stream
+		elif sys.argv[i] == "--stream":
+			stream = True
+		# argument to set how many logs get stored at a time when streaming
+		elif sys.argv[i] == "-c" or sys.argv[i] == "--chunk-size":
+			i += 1
+			# make sure there is a follow up argument that is a positive integer
+			if i >= len(sys.argv):
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+			try:
+				chunk_size = int(sys.argv[i])
+			except ValueError:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+			if chunk_size < 1:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+		# argument to save progress every few logs while collecting data from them
+		elif sys.argv[i] == "-cp" or sys.argv[i] == "--checkpoint":
+			i += 1
+			# make sure there is a follow up argument that is a positive integer
+			if i >= len(sys.argv):
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+			try:
+				checkpoint_interval = int(sys.argv[i])
+			except ValueError:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+			if checkpoint_interval < 1:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+				exit(2)
+		# argument to pick up from the last saved progress of a run that was interrupted
+		elif sys.argv[i] == "--resume":
+			resume = True
+		# argument to also store the collected data as csv files that can be read by people
+		elif sys.argv[i] == "--csv":
+			export_csv = True
+		# argument to also store the matches in the match store so they can be queried
+		elif sys.argv[i] == "--matches":
+			store_matches = True
+		# argument to add the sine and cosine of the month, day of the week, and hour to the prepared inputs
+		elif sys.argv[i] == "--cyclical-dates":
+			cyclical_dates = True
+		# argument to add the form of each player going into each match to the prepared inputs
+		elif sys.argv[i] == "--player-form":
+			player_form = True
+		# argument to add the rating of each player going into each match to the prepared inputs
+		elif sys.argv[i] == "--player-ratings":
+			player_ratings = True
+		# argument to add the synergy of each team going into each match to the prepared inputs
+		elif sys.argv[i] == "--player-synergy":
+			player_synergy = True
+		# if the argument isn't recognized
 		else:
-			print("ERROR: Third argument not recognized.")
+			print(f"ERROR: Argument {i} not recognized: {sys.argv[i]}")
 			exit(2)
 
+		i += 1
+
+	if offline and not use_cache:
+		print("ERROR: --offline and --no-cache can't be used together.")
+		exit(2)
+
 	delimiter = "-" * 50
 
-	# get a fresh set of logs and data
-	log_ids, sid3s = get_logs(pages, verbose=verbose)
-	if verbose:
-		print(delimiter)
-	num_logs, used_logs, players, gamemodes, maps, dates, weekdays, scores, stats = fetch_log_data(\
-		log_ids, sid3s, include_randos=include_randos, verbose=verbose)
+	if chunk_size is not None and not stream:
+		print("ERROR: --chunk-size can only be used with --stream.")
+		exit(2)
+	if stream and store_matches:
+		print("ERROR: --matches can't be used with --stream. Run 'python match_store.py build' after streaming instead.")
+		exit(2)
+	if stream and (checkpoint_interval is not None or resume):
+		print("ERROR: --checkpoint and --resume can't be used with --stream (streamed rows are stored as they're made).")
+		exit(2)
+
+	# http client that is shared by everything that sends requests to logs.tf
+	client = create_http_client(rate_limit=rate_limit, max_attempts=max_attempts, pool_size=max_workers)
+
+	# when streaming, the rows are stored (and added onto the prepared data) as they're made
+	if stream:
+		from stream_pipeline import stream_log_data, default_chunk_size
+		stream_log_data(pages, include_randos=include_randos, verbose=verbose, max_workers=max_workers,\
+			use_cache=use_cache, offline=offline, incremental=incremental, since=since, backend=backend, client=client,\
+			processes=processes, chunk_size=default_chunk_size if chunk_size is None else chunk_size,\
+			cyclical_dates=cyclical_dates, player_form=player_form, player_ratings=player_ratings,\
+			player_synergy=player_synergy)
+		client.close()
+		if export_csv:
+			export_csv_data(verbose=verbose)
+		inputs, targets = read_log_data(verbose=verbose)
+		if verbose:
+			print(delimiter)
+			print("Inputs:")
+			print(inputs)
+			print(inputs.shape)
+			print("Targets:")
+			print(targets)
+			print(targets.shape)
+		exit(0)
+
+	# when running offline or resuming, reuse the log ids and steamid3s from the last time logs were collected
+	if offline or resume:
+		log_ids = read_log_ids()
+		sid3s = read_sid3s()
+	# otherwise get a fresh set of logs
+	else:
+		log_ids, sid3s = get_logs(pages, verbose=verbose, incremental=incremental, since=since,\
+			backend=backend, client=client)
+		if verbose:
+			print(delimiter)
+	# a checkpoint that was made for a different run can't be resumed
+	try:
+		num_logs, used_logs, players, gamemodes, maps, dates, weekdays, scores, stats = fetch_log_data(\
+			log_ids, sid3s, include_randos=include_randos, verbose=verbose, max_workers=max_workers,\
+			rate_limit=rate_limit, use_cache=use_cache, offline=offline, incremental=incremental, client=client,\
+			processes=processes, checkpoint_interval=checkpoint_interval, resume=resume, store_matches=store_matches)
+	except ValueError as e:
+		client.close()
+		print(f"ERROR: {e}")
+		exit(2)
 	if verbose:
+		request_stats = client.stats()
+		print(f"Sent {request_stats['requests']} requests to logs.tf over {request_stats['connections']} connections "\
+			f"with {request_stats['retries']} retries and {request_stats['failures']} failures")
 		print(delimiter)
-	inputs, targets, stats = prepare_log_data(\
-		players=players, gamemodes=gamemodes, maps=maps, dates=dates, weekdays=weekdays, scores=scores, stats=stats,\
-		verbose=verbose)
+	client.close()
+	if export_csv:
+		export_csv_data(verbose=verbose)
+	# incremental runs only return the new data, so prepare the full data set from the data files
+	if incremental:
+		inputs, targets, stats = prepare_log_data(verbose=verbose, cyclical_dates=cyclical_dates,\
+			player_form=player_form, player_ratings=player_ratings, player_synergy=player_synergy)
+	else:
+		inputs, targets, stats = prepare_log_data(\
+			players=players, gamemodes=gamemodes, maps=maps, dates=dates, weekdays=weekdays, scores=scores, stats=stats,\
+			verbose=verbose, cyclical_dates=cyclical_dates, player_form=player_form,\
+			player_ratings=player_ratings, player_synergy=player_synergy)
 	if verbose:
 		print(delimiter)
 		print("Inputs:")
@@ -0,0 +1,313 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# distributed_collection
+#
+# Program for collecting data from logs with many worker processes (on one or more machines) sharing a work queue
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for reading the log ids, downloading logs, and storing the merged data
+from collect_log_data import data_path, default_fetch_workers, default_max_attempts, create_http_client, read_log_ids,\
+	read_sid3s, read_checked_logs, fetch_raw_logs, encode_log_record, store_log_data, print_rejection_counts
+# used for sharing batches of logs between workers
+from work_queue import WorkQueue, default_lease_time, default_max_claims
+# used for building the rows of each batch
+from log_records import RecordBuilder, new_vocabularies
+# used for checking that logs are valid and extracting data from them
+from log_validator import parse_log_records
+# used for running several workers on one machine
+from multiprocessing import Process
+# used for counting rejected logs
+from collections import Counter
+# used for naming workers
+import socket
+# used for making sure files and folders exist
+import os
+# used for storing the results of each batch
+import numpy as np
+
+# name of the work queue database file
+work_queue_file = "work_queue.sqlite"
+# name of the folder that each batch's results get stored in
+shards_folder = "shards"
+
+# path to the work queue database
+work_queue_path = f"{data_path}/{work_queue_file}"
+# path to the folder of shards
+shards_path = f"{data_path}/{shards_folder}"
+
+# default number of logs in each batch
+default_batch_size = 200
+# number of logs to check between renewing a lease
+lease_renew_interval = 50
+
+# puts the log ids from the log id data file into the work queue in batches of batch_size logs
+# include_randos and incremental mean the same as in fetch_log_data(), and are stored in the queue so every worker
+# and the merge step use the same settings
+# returns the number of batches
+def init_queue(batch_size=default_batch_size, include_randos=True, incremental=False, verbose=True):
+	log_ids = read_log_ids()
+	# if only new logs should be checked
+	if incremental:
+		checked_logs = read_checked_logs()[0]
+		log_ids = [log_id for log_id in log_ids if log_id not in checked_logs]
+
+	# remove the shards of the last run so they don't get mixed in
+	if os.path.isdir(shards_path):
+		for shard in os.listdir(shards_path):
+			os.remove(f"{shards_path}/{shard}")
+	os.makedirs(shards_path, exist_ok=True)
+
+	queue = WorkQueue(work_queue_path)
+	batch_count = queue.populate(log_ids, batch_size, settings={"include_randos": include_randos,\
+		"incremental": incremental})
+	queue.close()
+	if verbose:
+		print(f"Queued {len(log_ids)} logs in {batch_count} batches to {work_queue_path}")
+	return batch_count
+
+# returns the path to the shard of a batch
+def get_shard_path(batch_id):
+	return f"{shards_path}/batch_{batch_id:06}.npz"
+
+# checks a batch of logs and stores the results in its shard
+# returns false if the lease on the batch was lost before it was done
+def _process_batch(queue, worker, batch_id, log_ids, client, valid_sid3s, max_workers, use_cache, offline, processes,\
+	lease_time):
+	records = RecordBuilder()
+	# each shard has its own codes for gamemodes and maps, which get changed to the same codes when merging
+	vocabularies = new_vocabularies()
+	rejected_logs = []
+	raw_logs = fetch_raw_logs(log_ids, client, max_workers=max_workers, use_cache=use_cache, offline=offline)
+	for counter, (log_id, record, rejection) in enumerate(parse_log_records(raw_logs, sid3s=valid_sid3s,\
+		processes=processes), 1):
+		# hold onto the batch while it's being worked on
+		if counter % lease_renew_interval == 0 and not queue.renew(batch_id, worker, lease_time):
+			return False
+		# logs that couldn't be downloaded aren't stored since they might be valid next time
+		if record is None and rejection is None:
+			continue
+		if rejection is not None:
+			rejected_logs.append((log_id, rejection))
+			continue
+
+		records.append(**encode_log_record(log_id, record, vocabularies))
+
+	# write to a temporary file first and then rename it so a crash never leaves a half written shard
+	# (if two workers end up storing the same batch, they store the same thing)
+	shard_path = get_shard_path(batch_id)
+	temp_path = f"{shard_path}.{socket.gethostname()}.{os.getpid()}.tmp"
+	with open(temp_path, "wb") as shard_file:
+		np.savez(shard_file, rejected_ids=np.array([log_id for log_id, _ in rejected_logs], dtype=str),\
+			rejected_reasons=np.array([rejection for _, rejection in rejected_logs], dtype=str),\
+			**{f"{name}_values": np.array(vocabulary.values, dtype=str) for name, vocabulary in vocabularies.items()},\
+			**records.finalize())
+	os.replace(temp_path, shard_path)
+	return queue.complete(batch_id, worker, shard_path)
+
+# claims batches from the work queue and checks them until there are none left
+# worker is the name of this worker (defaults to the host name and process id)
+# the rest of the arguments are the same as fetch_log_data()
+# lease_time is how many seconds a batch is held before other workers can claim it if it isn't renewed
+# returns the number of batches this worker finished
+def run_worker(worker=None, verbose=True, max_workers=default_fetch_workers, rate_limit=None,\
+	max_attempts=default_max_attempts, use_cache=True, offline=False, processes=None, lease_time=default_lease_time,\
+	max_claims=default_max_claims):
+	if worker is None:
+		worker = f"{socket.gethostname()}-{os.getpid()}"
+	if not os.path.isfile(work_queue_path):
+		raise FileNotFoundError("Missing work queue. Run this program with 'init' first.")
+
+	queue = WorkQueue(work_queue_path)
+	settings = queue.settings()
+	# steamid3s that every player in a log has to be in (None lets any player be in a log)
+	valid_sid3s = None if settings["include_randos"] else set(read_sid3s())
+	client = create_http_client(rate_limit=rate_limit, max_attempts=max_attempts, pool_size=max_workers)
+
+	finished = 0
+	while True:
+		batch = queue.claim(worker, lease_time=lease_time, max_claims=max_claims)
+		if batch is None:
+			break
+		batch_id, log_ids = batch
+		if _process_batch(queue, worker, batch_id, log_ids, client, valid_sid3s, max_workers, use_cache, offline,\
+			processes, lease_time):
+			finished += 1
+			if verbose:
+				print(f"[{worker}]: finished batch {batch_id} ({len(log_ids)} logs)")
+		elif verbose:
+			print(f"[{worker}]: lost the lease on batch {batch_id}")
+
+	client.close()
+	queue.close()
+	return finished
+
+# runs count workers as separate processes on this machine and waits for them to finish
+def run_workers(count, **worker_args):
+	workers = [Process(target=run_worker, kwargs=worker_args) for _ in range(count)]
+	for worker in workers:
+		worker.start()
+	for worker in workers:
+		worker.join()
+
+# prints how many batches are in each state
+def print_progress():
+	queue = WorkQueue(work_queue_path)
+	progress = queue.progress()
+	queue.close()
+	print(", ".join(f"{count} {status}" for status, count in progress.items()))
+	return progress
+
+# combines the shards of every finished batch (in the order of the log id data file) into the dataset
+# returns the number of logs that were used
+def merge_shards(verbose=True):
+	if not os.path.isfile(work_queue_path):
+		raise FileNotFoundError("Missing work queue. Run this program with 'init' first.")
+
+	queue = WorkQueue(work_queue_path)
+	settings = queue.settings()
+	progress = queue.progress()
+	done_batches = queue.done_batches()
+	failed_batches = queue.failed_batches()
+	queue.close()
+	# merging before every batch is done would leave a gap that incremental runs would never fill in
+	if progress["pending"] > 0 or progress["leased"] > 0:
+		raise ValueError(f"{progress['pending'] + progress['leased']} batches still need to be finished before merging.")
+
+	records = RecordBuilder()
+	vocabularies = new_vocabularies()
+	rejected_logs = []
+	for batch_id, shard_path in done_batches:
+		with np.load(shard_path) as shard:
+			columns = {name: shard[name] for name in records.columns}
+			# change the codes of the shard into codes of the merged vocabularies
+			for name, vocabulary in vocabularies.items():
+				code_map = np.array([vocabulary.code(value) for value in shard[f"{name}_values"].tolist()], dtype=np.int64)
+				if len(code_map) > 0:
+					columns[name] = code_map[columns[name]]
+			records.extend(columns)
+			rejected_logs.extend(zip(shard["rejected_ids"].tolist(), shard["rejected_reasons"].tolist()))
+	records = records.finalize()
+
+	if verbose:
+		print(f"Merged {len(done_batches)} batches. Used {records['used_logs'].size} logs and rejected "\
+			f"{len(rejected_logs)} logs.")
+		print_rejection_counts(Counter(rejection for _, rejection in rejected_logs))
+		for batch_id, log_ids in failed_batches:
+			print(f"Batch {batch_id} failed too many times and was skipped (logs {log_ids[0]} to {log_ids[-1]})")
+
+	store_log_data(records, vocabularies, rejected_logs, append=settings["incremental"])
+	if verbose:
+		print("Data stored.")
+	return records["used_logs"].size
+
+# if this is being run as its own program
+if __name__ == "__main__":
+	import sys
+
+	# first argument must be the step to run
+	if len(sys.argv) < 2 or sys.argv[1] not in ("init", "worker", "status", "merge"):
+		print("ERROR: First argument must be 'init', 'worker', 'status', or 'merge'.")
+		exit(2)
+	step = sys.argv[1]
+
+	verbose = True
+	batch_size = default_batch_size
+	include_randos = True
+	incremental = False
+	count = 1
+	worker_args = {}
+
+	# parses the positive integer after the argument at index i
+	def parse_positive_int(i):
+		if i >= len(sys.argv):
+			print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+			exit(2)
+		try:
+			value = int(sys.argv[i])
+		except ValueError:
+			print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+			exit(2)
+		if value < 1:
+			print(f"ERROR: {sys.argv[i-1]} requires a positive integer after it.")
+			exit(2)
+		return value
+
+	# loop through each optional argument after the step
+	i = 2
+	while i < len(sys.argv):
+		# user can provide argument to not print any messages during execution
+		if sys.argv[i] == "--silent":
+			verbose = False
+		# argument to set how many logs go in each batch
+		elif step == "init" and (sys.argv[i] == "-bs" or sys.argv[i] == "--batch-size"):
+			i += 1
+			batch_size = parse_positive_int(i)
+		# arguments to include or skip logs with players not in profiles.csv
+		elif step == "init" and (sys.argv[i] == "-i" or sys.argv[i] == "--include"):
+			include_randos = True
+		elif step == "init" and (sys.argv[i] == "-s" or sys.argv[i] == "--skip"):
+			include_randos = False
+		# argument to only queue logs that haven't been checked before
+		elif step == "init" and (sys.argv[i] == "-inc" or sys.argv[i] == "--incremental"):
+			incremental = True
+		# argument to set how many worker processes to run on this machine
+		elif step == "worker" and (sys.argv[i] == "-n" or sys.argv[i] == "--count"):
+			i += 1
+			count = parse_positive_int(i)
+		# argument to set how many logs each worker downloads at the same time
+		elif step == "worker" and (sys.argv[i] == "-w" or sys.argv[i] == "--workers"):
+			i += 1
+			worker_args["max_workers"] = parse_positive_int(i)
+		# argument to set how many processes each worker parses logs with
+		elif step == "worker" and (sys.argv[i] == "-p" or sys.argv[i] == "--processes"):
+			i += 1
+			worker_args["processes"] = parse_positive_int(i)
+		# argument to set how many times a request to logs.tf gets sent before giving up on it
+		elif step == "worker" and (sys.argv[i] == "-a" or sys.argv[i] == "--attempts"):
+			i += 1
+			worker_args["max_attempts"] = parse_positive_int(i)
+		# argument to set how many seconds a worker holds onto a batch without renewing it
+		elif step == "worker" and (sys.argv[i] == "-l" or sys.argv[i] == "--lease"):
+			i += 1
+			worker_args["lease_time"] = parse_positive_int(i)
+		# argument to only use logs from the log cache
+		elif step == "worker" and (sys.argv[i] == "-o" or sys.argv[i] == "--offline"):
+			worker_args["offline"] = True
+		# argument to not read from or store logs in the log cache
+		elif step == "worker" and (sys.argv[i] == "-nc" or sys.argv[i] == "--no-cache"):
+			worker_args["use_cache"] = False
+		# if the argument isn't recognized
+		else:
+			print(f"ERROR: Argument {i} not recognized: {sys.argv[i]}")
+			exit(2)
+
+		i += 1
+
+	if worker_args.get("offline") and worker_args.get("use_cache") is False:
+		print("ERROR: --offline and --no-cache can't be used together.")
+		exit(2)
+
+	match step:
+		case "init":
+			init_queue(batch_size=batch_size, include_randos=include_randos, incremental=incremental, verbose=verbose)
+		case "worker":
+			if count == 1:
+				run_worker(verbose=verbose, **worker_args)
+			else:
+				run_workers(count, verbose=verbose, **worker_args)
+		case "status":
+			print_progress()
+		case "merge":
+			try:
+				merge_shards(verbose=verbose)
+			except ValueError as e:
+				print(f"ERROR: {e}")
+				exit(1)
@@ -0,0 +1,133 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# feature_encoders
+#
+# Module for turning players, maps, gamemodes, and numeric features into the same scalar values during training and when
+# predicting
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for storing encoders
+import json
+import os
+# used for the arrays of values and codes
+import numpy as np
+# used for its hash table index, which looks up a whole array of values at once
+import pandas as pd
+
+# code that values an encoder wasn't fitted on get
+unknown_code = 0
+# version of the encoder file format
+encoders_version = 1
+
+# turns values (like account ids or map names) into codes and scalar values between 0 and 1
+# an encoder is fitted once on the training data and then stored next to the model, so every value keeps the same code
+# when the data changes and matches can be encoded when predicting without the training data
+# values are looked up in a hash table, so encoding takes the same time for each value no matter how many there are,
+# and values that weren't in the training data go in the unknown bucket (code 0)
+class CategoryEncoder:
+	def __init__(self, classes=(), divisor=None):
+		# values in the order of their codes (starting at 1)
+		self.classes = list(classes)
+		# what codes get divided by to turn them into scalar values
+		self.divisor = divisor if divisor is not None else max(len(self.classes), 1)
+		self.index = pd.Index(self.classes)
+
+	def __len__(self):
+		return len(self.classes)
+
+	# returns an array of the code of each value (unknown_code for values the encoder wasn't fitted on)
+	def encode(self, values):
+		values = np.asarray(values)
+		if len(self.classes) == 0:
+			return np.full(values.shape, unknown_code, dtype=np.int64)
+		# values that aren't in the index get -1, which becomes the unknown code (0)
+		return (self.index.get_indexer(values.reshape(-1)) + 1).reshape(values.shape)
+
+	# returns an array of the scalar value of each value
+	def scale(self, values):
+		return self.encode(values) / self.divisor
+
+	# returns an array of the values of an array of codes (None for the unknown code)
+	def decode(self, codes):
+		return np.array([None, *self.classes], dtype=object)[np.asarray(codes)]
+
+	# returns a dictionary that can be stored as json
+	def to_dict(self):
+		return {"type": "category", "classes": np.asarray(self.classes).tolist(), "divisor": self.divisor}
+
+# turns numeric features (like each player's form) into scalar values between 0 and 1 by dividing each feature by a
+# fixed scale, with values above the scale clipped to 1
+# the scales are fixed instead of fitted on the data, so no match's inputs depend on matches played after it, and
+# they're stored with the encoders so a single new match is scaled the same way when predicting
+class FeatureScaler:
+	def __init__(self, scales):
+		# scale of each feature (the last axis of the values)
+		self.scales = np.asarray(scales, dtype=np.float64)
+
+	# returns an array of the scalar value of each feature (the last axis of values is the features)
+	def scale(self, values):
+		return np.clip(np.asarray(values, dtype=np.float64) / self.scales, 0, 1)
+
+	# returns a dictionary that can be stored as json
+	def to_dict(self):
+		return {"type": "scaler", "scales": self.scales.tolist()}
+
+# returns a CategoryEncoder fitted on an array of values
+# values are given codes in sorted order starting at 1, and the scalar values are the codes divided by the number of
+# classes, so they're between 0 and 1
+# extra_values are given codes after the values if they aren't in them (so they can be encoded even if they weren't in
+# the data), and they count towards the number of classes so their scalar values are never above 1
+def fit_encoder(values, extra_values=()):
+	classes = np.unique(np.asarray(values).reshape(-1)).tolist()
+	classes += [value for value in extra_values if value not in classes]
+	return CategoryEncoder(classes)
+
+# returns a dictionary of the encoders of players (account ids), gamemodes, and maps fitted on the data collected from
+# logs
+# gamemodes and maps are codes from vocabularies (see log_records.py), but the encoders are fitted on their names so
+# they don't depend on the dataset
+def fit_log_encoders(players, gamemodes, maps, vocabularies):
+	encoders = {"players": fit_encoder(players)}
+	for name, codes, extra_values in [("gamemodes", gamemodes, ["koth", "cp"]), ("maps", maps, [])]:
+		present_codes = np.unique(np.asarray(codes))
+		encoders[name] = fit_encoder(np.array(vocabularies[name].values, dtype=object)[present_codes], extra_values)
+	return encoders
+
+# returns the scalar values of an array of codes from a Vocabulary
+# each value in the vocabulary is only looked up once, then the codes pick out their scalar values
+def scale_codes(encoder, codes, vocabulary):
+	return encoder.scale(np.array(vocabulary.values, dtype=object))[np.asarray(codes)]
+
+# stores a dictionary of encoders in a json file
+# the file is written to a temporary file and then renamed so a model is never left with half written encoders
+def store_encoders(encoders, path):
+	temp_path = f"{path}.tmp"
+	with open(temp_path, "w") as encoders_file:
+		json.dump({"version": encoders_version, "encoders": {name: encoder.to_dict() for name, encoder in\
+			encoders.items()}}, encoders_file)
+	os.replace(temp_path, path)
+
+# returns the encoder of a dictionary from to_dict() (encoders stored before there were scalers are all category
+# encoders)
+def _read_encoder(data):
+	if data.get("type") == "scaler":
+		return FeatureScaler(data["scales"])
+	return CategoryEncoder(data["classes"], data["divisor"])
+
+# returns the dictionary of encoders stored in a json file by store_encoders()
+def read_encoders(path):
+	if not os.path.isfile(path):
+		raise FileNotFoundError(f"Missing encoders file {path}")
+	with open(path, "r") as encoders_file:
+		data = json.load(encoders_file)
+	if data.get("version") != encoders_version:
+		raise ValueError(f"Encoders in {path} have an unsupported version.")
+	return {name: _read_encoder(encoder) for name, encoder in data["encoders"].items()}
@@ -0,0 +1,132 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# fetch_checkpoint
+#
+# Module for saving the progress of collecting data from logs so an interrupted run can pick up where it left off
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for storing which logs the checkpoint is for and how far along it is
+import json
+# used for telling if a checkpoint was made for the same list of logs
+import hashlib
+# used for making and removing checkpoint files
+import os
+import shutil
+# used for storing the rows collected between checkpoints
+import numpy as np
+
+# name of the file in a checkpoint folder that says how far along collecting is
+manifest_file = "checkpoint.json"
+# version of the checkpoint format
+checkpoint_version = 2
+
+# saves the rows collected by fetch_log_data() every few logs
+# each save only writes the rows collected since the last save to a new part file, so saving takes the same amount of
+# time no matter how many logs have been collected
+# every file is written to a temporary file and then renamed, and the manifest is only updated once its part file is
+# done, so a crash at any point leaves the last complete checkpoint behind
+class FetchCheckpoint:
+	def __init__(self, path, log_ids, parameters=None):
+		# folder that the checkpoint gets stored in
+		self.path = path
+		self.manifest_path = f"{path}/{manifest_file}"
+		# number of logs being collected
+		self.log_count = len(log_ids)
+		# hash of the log ids and anything else that changes which logs get used, so a checkpoint is never resumed
+		# for a different run
+		fingerprint = hashlib.sha256()
+		fingerprint.update(json.dumps(parameters, sort_keys=True).encode())
+		for log_id in log_ids:
+			fingerprint.update(f"{log_id}\n".encode())
+		self.fingerprint = fingerprint.hexdigest()
+		# number of part files, rows, and rejected logs that have been saved
+		self.parts = 0
+		self.saved_rows = 0
+		self.saved_rejections = 0
+
+	# returns the path to a part file
+	def _get_part_path(self, part):
+		return f"{self.path}/part_{part:05}.npz"
+
+	# writes a file by calling write() with a temporary file and then renaming it
+	def _write_atomic(self, path, write):
+		temp_path = f"{path}.{os.getpid()}.tmp"
+		with open(temp_path, "wb") as file:
+			write(file)
+			file.flush()
+			os.fsync(file.fileno())
+		os.replace(temp_path, path)
+
+	# saves the rows and rejected logs that were added since the last save
+	# cursor is how many of the log ids have been checked
+	# records is the RecordBuilder of every row collected so far
+	# rejected_logs is the list of every (log id, rejection code) pair so far
+	# vocabularies is the dictionary of the Vocabulary of each coded column that the codes in records are from
+	def save(self, cursor, records, rejected_logs, vocabularies):
+		os.makedirs(self.path, exist_ok=True)
+		new_rows = records.finalize(start=self.saved_rows)
+		new_rejections = rejected_logs[self.saved_rejections:]
+		rejected_ids = np.array([log_id for log_id, _ in new_rejections], dtype=str)
+		rejected_reasons = np.array([rejection for _, rejection in new_rejections], dtype=str)
+
+		part = self.parts + 1
+		self._write_atomic(self._get_part_path(part), lambda file: np.savez(file, rejected_ids=rejected_ids,\
+			rejected_reasons=rejected_reasons, **new_rows))
+
+		manifest = {
+			"version": checkpoint_version,
+			"fingerprint": self.fingerprint,
+			"log_count": self.log_count,
+			"cursor": cursor,
+			"parts": part,
+			"vocabularies": {name: list(vocabulary.values) for name, vocabulary in vocabularies.items()}
+		}
+		self._write_atomic(self.manifest_path, lambda file: file.write(json.dumps(manifest).encode()))
+
+		self.parts = part
+		self.saved_rows = len(records)
+		self.saved_rejections = len(rejected_logs)
+
+	# loads the last checkpoint and adds its rows to records, its rejected logs to rejected_logs, and the values its
+	# codes are for to vocabularies
+	# returns the cursor (how many of the log ids were checked), or 0 if there isn't a checkpoint
+	# raises a ValueError if the checkpoint was made for a different list of logs
+	def load(self, records, rejected_logs, vocabularies):
+		if not os.path.isfile(self.manifest_path):
+			return 0
+		with open(self.manifest_path, "rb") as file:
+			manifest = json.loads(file.read())
+		if manifest.get("version") != checkpoint_version or manifest.get("fingerprint") != self.fingerprint:
+			raise ValueError(f"Checkpoint in {self.path} was made for a different list of logs.")
+
+		# the vocabularies only ever get values added onto the end, so the saved ones start with the same values
+		for name, values in manifest["vocabularies"].items():
+			for value in values:
+				vocabularies[name].code(value)
+
+		# part files past the one in the manifest are from a save that didn't finish, so they're ignored
+		for part in range(1, manifest["parts"] + 1):
+			with np.load(self._get_part_path(part)) as part_data:
+				records.extend({name: part_data[name] for name in records.columns})
+				rejected_logs.extend(zip(part_data["rejected_ids"].tolist(), part_data["rejected_reasons"].tolist()))
+
+		self.parts = manifest["parts"]
+		self.saved_rows = len(records)
+		self.saved_rejections = len(rejected_logs)
+		return manifest["cursor"]
+
+	# removes the checkpoint once the data it was for has been stored
+	def clear(self):
+		if os.path.isdir(self.path):
+			shutil.rmtree(self.path)
+		self.parts = 0
+		self.saved_rows = 0
+		self.saved_rejections = 0
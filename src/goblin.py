@@ -52,7 +52,7 @@ if __name__ == "__main__":
 				exit(2)
 		# argument to train a new neural network
 		elif sys.argv[i] == "-t" or sys.argv[i] == "--train":
-			train == True
+			train = True
 		# if the argument isn't recognized
 		else:
 			print(f"ERROR: Argument {i} not recognized: {sys.argv[i]}")
@@ -62,20 +62,13 @@ if __name__ == "__main__":
 	
 	delimiter = "-" * 50
 
-	# if new data was requested with an argument
-	if new_data:
+	# if new data or training a new neural network was requested
+	if new_data or train:
 
-		# get a fresh set of logs and data
-		log_ids, sid3s = get_logs(pages, verbose=verbose)
-		if verbose:
-			print(delimiter)
-		num_logs, used_logs, players, gamemodes, maps, dates, weekdays, scores, stats = fetch_log_data(\
-			log_ids, sid3s, verbose=verbose)
-		if verbose:
-			print(delimiter)
-		inputs, targets, stats = prepare_log_data(\
-			players=players, gamemodes=gamemodes, maps=maps, dates=dates, weekdays=weekdays, scores=scores, stats=stats,\
-			verbose=verbose)
+		# only rebuild the stages whose inputs changed (new data always crawls for a fresh set of log ids)
+		pipeline = Pipeline(get_data_stages(pages=pages if new_data else None, verbose=verbose))
+		pipeline.run("prepared", force=["log_ids"] if new_data else [], verbose=verbose)
+		inputs, targets = read_log_data(verbose=verbose)
 		if verbose:
 			print(delimiter)
 			print("Inputs:")
@@ -88,14 +81,8 @@ if __name__ == "__main__":
 	# if training a new neural network was requested
 	if train:
 
-		# if fresh data wasn't requested and is already loaded, load data from csv files
-		if not new_data:
-			inputs, targets = read_log_data(verbose=verbose)
-			if verbose:
-				print(delimiter)
-				print("Inputs:")
-				print(inputs)
-				print(inputs.shape)
-				print("Targets:")
-				print(targets)
-				print(targets.shape)
+		# train the goblin unless it was already trained on the same data with the same settings
+		if verbose:
+			print(delimiter)
+		pipeline.add_stage(get_model_stage(verbose=verbose))
+		pipeline.run("model", verbose=verbose)
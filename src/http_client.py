@@ -0,0 +1,251 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# http_client
+#
+# Module for sending http requests to logs.tf with pooled connections, retries, and rate limiting
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for sending requests over connections that stay open between requests
+import http.client
+# used for parsing and joining urls
+from urllib.parse import urlparse, urljoin
+# used for parsing retry-after headers that are dates
+from email.utils import parsedate_to_datetime
+# used for keeping idle connections around to reuse them
+import queue
+# used for making the client safe to share between threads
+import threading
+# used for waiting between retries
+import time
+# used for adding jitter to the time waited between retries
+import random
+
+# http status codes that mean the request got redirected somewhere else
+redirect_statuses = {301, 302, 303, 307, 308}
+# http status codes that mean the request might work if it's sent again
+retry_statuses = {408, 429, 500, 502, 503, 504}
+# max number of redirects to follow for one request
+max_redirects = 5
+
+# raised when a request fails and won't be retried anymore
+class HttpError(Exception):
+	def __init__(self, message, url, status=None):
+		super().__init__(message)
+		# url that the request was sent to
+		self.url = url
+		# http status code of the last response (None if there was no response)
+		self.status = status
+
+# response to a request after all of its redirects have been followed
+class HttpResponse:
+	def __init__(self, status, url, headers, data):
+		self.status = status
+		# final url after redirects
+		self.url = url
+		self.headers = headers
+		# body of the response as bytes
+		self.data = data
+
+	def read(self):
+		return self.data
+
+# limits how many requests per second get sent to each host
+# shared between threads so that concurrent requests don't flood a website
+class RateLimiter:
+	def __init__(self, rate_limit=None):
+		# max requests per second for each host (None means no limit)
+		self.rate_limit = rate_limit
+		# time that the next request to each host is allowed to be sent at
+		self.next_times = {}
+		self.lock = threading.Lock()
+
+	# blocks until a request is allowed to be sent to the host of the given url
+	def wait(self, url):
+		if self.rate_limit is None or self.rate_limit <= 0:
+			return
+		host = urlparse(url).netloc
+		interval = 1 / self.rate_limit
+		# reserve the next open time slot for this host
+		with self.lock:
+			now = time.monotonic()
+			send_time = max(now, self.next_times.get(host, now))
+			self.next_times[host] = send_time + interval
+		# sleep outside of the lock so other threads can reserve their own slots
+		delay = send_time - time.monotonic()
+		if delay > 0:
+			time.sleep(delay)
+
+# http client that keeps connections open to reuse them, retries failed requests with exponential backoff,
+# and keeps count of how many requests were sent, retried, and failed
+# one client can be shared by all of the threads that are sending requests
+class HttpClient:
+	def __init__(self, max_attempts=5, timeout=30, backoff_base=0.5, backoff_max=30, max_retry_after=300,\
+		rate_limit=None, ssl_context=None, pool_size=8):
+		if type(max_attempts) is not int or max_attempts < 1:
+			raise ValueError("max_attempts parameter must be a positive integer.")
+
+		# max number of times to send a request before giving up
+		self.max_attempts = max_attempts
+		# seconds to wait for a connection or response before giving up on an attempt
+		self.timeout = timeout
+		# seconds to wait after the first failed attempt (doubles after each attempt)
+		self.backoff_base = backoff_base
+		# max seconds to wait between attempts
+		self.backoff_max = backoff_max
+		# max seconds to wait when a server responds with a retry-after header
+		self.max_retry_after = max_retry_after
+		# ssl context used for https connections (None for the default context)
+		self.ssl_context = ssl_context
+		# max number of idle connections to keep open to each host
+		self.pool_size = pool_size
+		self.rate_limiter = RateLimiter(rate_limit)
+
+		# idle connections for each (scheme, host) pair
+		self.pools = {}
+		self.pools_lock = threading.Lock()
+
+		# counters of requests that were sent
+		self.counters = {"requests": 0, "retries": 0, "failures": 0, "connections": 0}
+		self.counters_lock = threading.Lock()
+
+	# adds to one of the counters
+	def _count(self, counter, amount=1):
+		with self.counters_lock:
+			self.counters[counter] += amount
+
+	# returns a copy of the counters of requests, retries, failures, and opened connections
+	def stats(self):
+		with self.counters_lock:
+			return dict(self.counters)
+
+	# returns the queue of idle connections for a host
+	def _get_pool(self, key):
+		with self.pools_lock:
+			if key not in self.pools:
+				self.pools[key] = queue.LifoQueue(maxsize=self.pool_size)
+			return self.pools[key]
+
+	# gets an idle connection to a host or opens a new one
+	def _get_connection(self, key):
+		try:
+			return self._get_pool(key).get_nowait()
+		except queue.Empty:
+			pass
+
+		scheme, netloc = key
+		self._count("connections")
+		if scheme == "https":
+			return http.client.HTTPSConnection(netloc, timeout=self.timeout, context=self.ssl_context)
+		return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+	# puts a connection back in the pool so it can be reused, or closes it if the pool is full
+	def _release_connection(self, key, connection):
+		try:
+			self._get_pool(key).put_nowait(connection)
+		except queue.Full:
+			connection.close()
+
+	# closes all idle connections
+	def close(self):
+		with self.pools_lock:
+			pools = list(self.pools.values())
+			self.pools = {}
+		for pool in pools:
+			while not pool.empty():
+				pool.get_nowait().close()
+
+	# sends one request without retrying and returns the status, headers, and body of the response
+	def _send(self, url):
+		parsed_url = urlparse(url)
+		if parsed_url.scheme not in ("http", "https"):
+			raise ValueError(f"Unsupported url scheme in {url}")
+		key = (parsed_url.scheme, parsed_url.netloc)
+		path = parsed_url.path or "/"
+		if parsed_url.query:
+			path += "?" + parsed_url.query
+
+		self.rate_limiter.wait(url)
+		connection = self._get_connection(key)
+		try:
+			connection.request("GET", path, headers={"Connection": "keep-alive"})
+			response = connection.getresponse()
+			data = response.read()
+		# if the connection broke (idle connections can get closed by the server), don't reuse it
+		except BaseException:
+			connection.close()
+			raise
+
+		if response.will_close:
+			connection.close()
+		else:
+			self._release_connection(key, connection)
+		return response.status, response.headers, data
+
+	# returns how many seconds to wait before retrying a request
+	def _get_backoff(self, attempt, headers=None):
+		# if the server said how long to wait, wait that long
+		if headers is not None and headers.get("Retry-After") is not None:
+			retry_after = headers.get("Retry-After")
+			try:
+				delay = float(retry_after)
+			# retry-after can also be a date to wait until
+			except ValueError:
+				try:
+					delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+				except (TypeError, ValueError):
+					delay = None
+			if delay is not None:
+				return min(max(delay, 0), self.max_retry_after)
+		# otherwise wait a random amount of time up to an exponentially growing limit
+		return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+	# sends a get request to a url, following redirects and retrying if it fails
+	# returns an HttpResponse with the final url after redirects
+	# raises an HttpError if the request fails max_attempts times, gets a response that won't change by retrying, or
+	# gets redirected more than max_redirects times
+	def get(self, url):
+		self._count("requests")
+		for attempt in range(self.max_attempts):
+			if attempt > 0:
+				self._count("retries")
+
+			current_url = url
+			headers = None
+			try:
+				# follow redirects until there's a response with content
+				for _ in range(max_redirects + 1):
+					status, headers, data = self._send(current_url)
+					if status not in redirect_statuses or headers.get("Location") is None:
+						break
+					current_url = urljoin(current_url, headers.get("Location"))
+				# if it's still being redirected after max_redirects, it's a redirect loop that retrying won't fix
+				else:
+					self._count("failures")
+					raise HttpError(f"Request to {url} was redirected more than {max_redirects} times", url, status)
+			# if the connection failed or timed out, try again
+			except (OSError, http.client.HTTPException) as e:
+				error = HttpError(f"Request to {url} failed: {e}", url)
+				if attempt + 1 < self.max_attempts:
+					time.sleep(self._get_backoff(attempt))
+				continue
+
+			if status < 400:
+				return HttpResponse(status, current_url, headers, data)
+
+			error = HttpError(f"Request to {url} failed with status {status}", url, status)
+			# if the request would fail again no matter how many times it gets sent
+			if status not in retry_statuses:
+				break
+			if attempt + 1 < self.max_attempts:
+				time.sleep(self._get_backoff(attempt, headers))
+
+		self._count("failures")
+		raise error
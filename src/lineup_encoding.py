@@ -0,0 +1,127 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# lineup_encoding
+#
+# Module for encoding the lineup of each match as the sparse multi-hot columns of which player played which class on
+# which team
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for storing the lineups
+import os
+# used for the arrays of column indexes
+import numpy as np
+# used for the layout of the lineup
+from log_records import players_per_log
+from log_validator import class_slots, team_size, player_stat_keys, medic_stat_keys, slot_classes, stat_offsets
+
+# index of the team and class block of each slot in the lineup (red scout, red soldier, ..., blu medic)
+# slots of the same class on the same team share a block, so it doesn't matter which of them a player was in
+slot_blocks = np.array([(slot // team_size) * len(class_slots) +\
+	list(class_slots).index(slot_classes[slot % team_size]) for slot in range(players_per_log)])
+# number of team and class blocks in the lineup
+block_count = len(class_slots) * (players_per_log // team_size)
+# slot that each slot in the lineup comes from when red and blu are swapped
+team_swap = (np.arange(players_per_log) + team_size) % players_per_log
+# number of stats of each slot in the stats row
+slot_stat_counts = np.array([len(player_stat_keys) + (len(medic_stat_keys) if slot_classes[slot % team_size] == "medic"\
+	else 0) for slot in range(players_per_log)])
+
+# returns an array with a row for each match of the slot that each slot's player comes from when players of the same
+# class on the same team are sorted by account id
+# players is the array of account ids, and every match is sorted at once by sorting on the slot's block and then the
+# account id (blocks are already in order, so only players in the same block move)
+def get_canonical_order(players):
+	players = np.asarray(players, dtype=np.int64).reshape(-1, players_per_log)
+	return np.argsort((slot_blocks.astype(np.int64) << 32) | players, axis=1, kind="stable")
+
+# returns the players and stats of each match with players of the same class on the same team sorted by account id, so
+# the same lineup always has the same order no matter what order the players were in the log
+# the stats of each player are moved along with them
+def canonicalize_lineups(players, stats):
+	players = np.asarray(players).reshape(-1, players_per_log)
+	stats = np.asarray(stats)
+	order = get_canonical_order(players)
+	canonical_stats = stats.copy()
+	rows = np.arange(players.shape[0])[:, None]
+	offsets = np.array(stat_offsets)
+	# slots of the same class have the same number of stats, so each slot's stats can be swapped in one go
+	for slot in range(players_per_log):
+		canonical_stats[:, offsets[slot] + np.arange(slot_stat_counts[slot])] =\
+			stats[rows, offsets[order[:, slot]][:, None] + np.arange(slot_stat_counts[slot])]
+	return np.take_along_axis(players, order, axis=1), canonical_stats
+
+# returns an array of the input column that each input column comes from when red and blu are swapped
+# column_count is the number of input columns, and slot_columns is a list of (first column, columns for each slot) of
+# every group of columns that has a value (or values) for each slot in the lineup, in the order of the slots
+# team_columns is a list of (first column, columns for each team) of every group of columns that has values for red and
+# then blu (like the synergy of each team)
+# the rest of the columns (like the map) stay where they are
+def get_mirror_columns(column_count, slot_columns, team_columns=()):
+	columns = np.arange(column_count)
+	for start, width in slot_columns:
+		slot_range = np.arange(players_per_log * width)
+		columns[start + slot_range] = start + team_swap[slot_range // width] * width + slot_range % width
+	for start, width in team_columns:
+		team_range = np.arange(2 * width)
+		columns[start + team_range] = start + (team_range + width) % (2 * width)
+	return columns
+
+# returns the sparse lineup columns (from get_lineup_columns()) of each match with red and blu swapped
+# each player moves to the other team's block of their class, and the slots are swapped to match
+def mirror_lineup_columns(columns, width):
+	columns = np.asarray(columns).reshape(-1, players_per_log)[:, team_swap]
+	block_width = width // block_count
+	blocks = (columns // block_width + len(class_slots)) % block_count
+	return (blocks * block_width + columns % block_width).astype(columns.dtype)
+
+# returns the inputs and one hot score targets with a mirrored copy of every match added onto the end, where red and
+# blu are swapped (the players and their inputs, and the two halves of the scores)
+# mirror_columns is from get_mirror_columns(), and lineups are optional sparse lineup columns of each match that
+# lineup_width is the width of, which get mirrored too (None is returned for them if they aren't given)
+# every match is mirrored at once by indexing the columns, so it doubles the data without going through each match
+def mirror_matches(inputs, targets, mirror_columns, lineups=None, lineup_width=None):
+	inputs = np.asarray(inputs)
+	targets = np.asarray(targets)
+	score_width = targets.shape[1] // 2
+	target_columns = (np.arange(targets.shape[1]) + score_width) % targets.shape[1]
+	mirrored_inputs = np.concatenate((inputs, inputs[:, mirror_columns]))
+	mirrored_targets = np.concatenate((targets, targets[:, target_columns]))
+	mirrored_lineups = None
+	if lineups is not None:
+		mirrored_lineups = np.concatenate((lineups, mirror_lineup_columns(lineups, lineup_width)))
+	return mirrored_inputs, mirrored_targets, mirrored_lineups
+
+# returns the number of columns in the lineup matrix of a player encoder (a block of a column for each code, including
+# the unknown code, for each team and class)
+def get_lineup_width(player_encoder):
+	return block_count * (len(player_encoder) + 1)
+
+# returns an array with a row for each match of the column of each slot in the lineup matrix
+# players is the array of account ids and player_encoder is the CategoryEncoder of players (see feature_encoders.py)
+# each player's column is their code plus the offset of their team and class block
+def get_lineup_columns(players, player_encoder):
+	codes = player_encoder.encode(np.asarray(players).reshape(-1, players_per_log))
+	return (slot_blocks * (len(player_encoder) + 1) + codes).astype(np.int32)
+
+# stores an array of column indexes (like the lineup columns or the mirror columns) into a .npy file
+# only the column indexes of the lineups are stored since every row of the matrix has the same number of entries, and
+# the file is written to a temporary file and then renamed so training never reads a half written file
+def store_columns(columns, path):
+	temp_path = f"{path}.{os.getpid()}.tmp"
+	with open(temp_path, "wb") as columns_file:
+		np.save(columns_file, np.asarray(columns, dtype=np.int32))
+	os.replace(temp_path, path)
+
+# returns the column indexes stored by store_columns() (memory mapped if mmap is true)
+def read_columns(path, mmap=True):
+	if not os.path.isfile(path):
+		raise FileNotFoundError(f"Missing columns file {path}")
+	return np.load(path, mmap_mode="r" if mmap else None)
@@ -0,0 +1,258 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# log_dataset
+#
+# Module for storing the data collected from logs as one columnar dataset of .npy files that can be memory mapped
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for storing the schema of the dataset
+import json
+# used for making and removing the files of the dataset
+import os
+# used for storing the columns of the dataset
+import numpy as np
+# used for the types of each column and the vocabularies of coded columns
+from log_records import log_record_columns, log_date_columns, Vocabulary
+
+# name of the file in a dataset folder that lists its columns and which files they're in
+schema_file = "schema.json"
+# version of the dataset format
+dataset_version = 3
+
+# column name: (data type, number of values in each row)
+# the columns are the same compact integers that are collected (see log_records.py) along with the dates worked out from
+# the timestamps, except that the log ids of the used logs are stored as integers too so the dataset can be indexed by
+# them
+# the values of the gamemode and map codes are stored in the schema
+log_dataset_columns = {**log_record_columns, **log_date_columns, "used_logs": (np.int64, 1)}
+# columns that are codes into a vocabulary
+coded_columns = ["gamemodes", "maps"]
+
+# returns the path to the schema of a dataset
+def _get_schema_path(path):
+	return f"{path}/{schema_file}"
+
+# returns the path to the file of a column in one generation of a dataset
+def _get_column_path(path, name, generation):
+	return f"{path}/{name}.{generation}.npy"
+
+# returns the path to the log order of a dataset from its schema (datasets that were stored before the columns could
+# grow in place keep it next to the columns of their generation)
+def _get_order_path(path, schema):
+	if "log_order" in schema:
+		return f"{path}/{schema['log_order']}"
+	return _get_column_path(path, "log_order", schema["generation"])
+
+# returns the schema of a dataset, or None if there isn't a dataset in the folder
+def read_schema(path):
+	schema_path = _get_schema_path(path)
+	if not os.path.isfile(schema_path):
+		return None
+	with open(schema_path, "r") as schema_file:
+		schema = json.load(schema_file)
+	if schema.get("version") != dataset_version:
+		raise ValueError(f"Dataset in {path} has an unsupported version.")
+	return schema
+
+# returns whether there's a dataset in the folder
+def dataset_exists(path):
+	return os.path.isfile(_get_schema_path(path))
+
+# turns an array into the type and shape of a column
+def _to_column(array, dtype, width, rows):
+	array = np.asarray(array).astype(dtype)
+	# single value columns are stored as 1 dimensional arrays
+	if width == 1:
+		return array.reshape(rows)
+	return array.reshape(rows, width)
+
+# returns a dictionary of the vocabularies of the coded columns of a dataset
+def read_vocabularies(path):
+	schema = read_schema(path)
+	if schema is None:
+		raise FileNotFoundError(f"Missing dataset in {path}")
+	return {name: Vocabulary(schema["vocabularies"][name]) for name in coded_columns}
+
+# adds the rows of an array onto the end of a .npy file in place, without reading or rewriting the rows already in it
+# rows is how many rows of the file to keep (rows past it are left over from a write that didn't finish, and get written
+# over), or None to keep all of them
+# the rows are written first and then the shape in the header, so the header never has more rows than the file
+# returns False without changing the file if its header doesn't have room for the new shape (np.save() leaves room for
+# the number of rows to grow, but older versions of numpy didn't)
+def append_npy(path, array, rows=None):
+	with open(path, "r+b") as npy_file:
+		version = np.lib.format.read_magic(npy_file)
+		if version == (1, 0):
+			length_size = 2
+			shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(npy_file)
+		elif version == (2, 0):
+			length_size = 4
+			shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(npy_file)
+		else:
+			return False
+		data_start = npy_file.tell()
+		# the header starts after the magic string, the version, and the header length
+		header_start = len(np.lib.format.MAGIC_PREFIX) + 2 + length_size
+		if fortran_order or len(shape) == 0:
+			return False
+		rows = shape[0] if rows is None else rows
+		if rows > shape[0]:
+			raise ValueError(f"{path} has {shape[0]} rows, not {rows}.")
+		array = np.ascontiguousarray(np.asarray(array).astype(dtype).reshape(-1, *shape[1:]))
+
+		header_space = data_start - header_start
+		header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,\
+			"shape": (rows + array.shape[0], *shape[1:])})
+		if len(header) + 1 > header_space:
+			return False
+		npy_file.seek(data_start + rows * dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64)))
+		npy_file.truncate()
+		npy_file.write(array.tobytes())
+		npy_file.seek(header_start)
+		npy_file.write(f"{header.ljust(header_space - 1)}\n".encode("latin1"))
+	return True
+
+# replaces the schema of a dataset all at once, then removes every .npy file in the folder that it doesn't use
+def _store_schema(path, schema):
+	schema_path = _get_schema_path(path)
+	temp_path = f"{schema_path}.{os.getpid()}.tmp"
+	with open(temp_path, "w") as schema_file:
+		json.dump(schema, schema_file, indent=1)
+	os.replace(temp_path, schema_path)
+
+	used_files = {os.path.basename(_get_column_path(path, name, schema["generation"])) for name in schema["columns"]}
+	used_files.add(os.path.basename(_get_order_path(path, schema)))
+	for file_name in os.listdir(path):
+		if file_name.endswith(".npy") and file_name not in used_files:
+			os.remove(f"{path}/{file_name}")
+
+# returns the name of the log order file of a dataset with a number of rows (it's rewritten whenever rows are added)
+def _get_order_file(generation, rows):
+	return f"log_order.{generation}.{rows}.npy"
+
+# adds new rows onto the end of each column file of a dataset in place and rebuilds the log order
+# the columns must be the same as the dataset's, and codes must already be from its vocabularies
+# returns False if a column file can't grow in place (the dataset is still the same, since the schema isn't changed)
+def _append_dataset(path, schema, new_columns, vocabulary_values):
+	if set(new_columns) != set(schema["columns"]):
+		return False
+	generation = schema["generation"]
+	old_rows = schema["rows"]
+	for name, array in new_columns.items():
+		if not append_npy(_get_column_path(path, name, generation), array, old_rows):
+			return False
+	rows = old_rows + len(new_columns["used_logs"])
+
+	# merge the new rows into the log order instead of sorting every row again
+	used_logs = np.load(_get_column_path(path, "used_logs", generation), mmap_mode="r")[:rows]
+	old_order = np.load(_get_order_path(path, schema))
+	added_order = old_rows + np.argsort(new_columns["used_logs"], kind="stable")
+	positions = np.searchsorted(used_logs[old_order], used_logs[added_order], side="right")
+	log_order = np.insert(old_order, positions, added_order)
+
+	new_schema = {
+		**schema,
+		"rows": rows,
+		"columns": {name: {**column, "shape": [rows, *column["shape"][1:]]} for name, column in\
+			schema["columns"].items()},
+		"vocabularies": vocabulary_values,
+		"log_order": _get_order_file(generation, rows)
+	}
+	np.save(_get_order_path(path, new_schema), log_order)
+	_store_schema(path, new_schema)
+	return True
+
+# stores a dictionary of arrays for each column into a dataset folder
+# vocabularies is a dictionary of the Vocabulary of each coded column that the codes in arrays are from
+# if append is true and there's already a dataset in the folder, the rows get added onto the end of it
+# (codes are changed to match the dataset's vocabularies if they came from different ones)
+# appending only writes the new rows onto the end of each column file (and a new log order), and the schema keeps the
+# number of rows, so a crash before the schema is replaced leaves the dataset the way it was
+# every other store writes a new generation of column files and then replaces the schema to point to them, so a crash
+# never leaves a dataset with some columns updated and some not
+def store_dataset(path, arrays, vocabularies, columns=log_dataset_columns, append=False):
+	os.makedirs(path, exist_ok=True)
+	rows = len(arrays[next(iter(columns))])
+	new_columns = {name: _to_column(arrays[name], dtype, width, rows) for name, (dtype, width) in columns.items()}
+	vocabulary_values = {name: list(vocabularies[name].values) for name in coded_columns}
+
+	old_schema = read_schema(path)
+	generation = 1 if old_schema is None else old_schema["generation"] + 1
+	if append and old_schema is not None:
+		# add any new values onto the end of the dataset's vocabularies and change the new codes to match
+		for name in coded_columns:
+			vocabulary = Vocabulary(old_schema["vocabularies"][name])
+			code_map = np.array([vocabulary.code(value) for value in vocabulary_values[name]], dtype=np.int64)
+			if len(code_map) > 0:
+				new_columns[name] = code_map[new_columns[name]].astype(new_columns[name].dtype)
+			vocabulary_values[name] = vocabulary.values
+
+		if _append_dataset(path, old_schema, new_columns, vocabulary_values):
+			return
+
+		# columns that can't grow in place get rewritten into a new generation with the new rows
+		old_columns = load_dataset(path, mmap=True)
+		for name in columns:
+			new_columns[name] = np.concatenate((old_columns[name], new_columns[name]))
+		rows += old_schema["rows"]
+		del old_columns
+
+	# rows in order of their log ids, so rows can be found by log id with a binary search
+	log_order = np.argsort(new_columns["used_logs"], kind="stable")
+
+	schema = {
+		"version": dataset_version,
+		"generation": generation,
+		"rows": rows,
+		"columns": {name: {"dtype": array.dtype.str, "shape": list(array.shape)} for name, array in new_columns.items()},
+		"vocabularies": vocabulary_values,
+		"log_order": _get_order_file(generation, rows)
+	}
+	for name, array in new_columns.items():
+		np.save(_get_column_path(path, name, generation), array)
+	np.save(_get_order_path(path, schema), log_order)
+
+	# switch to the new generation all at once (which removes the files of older generations)
+	_store_schema(path, schema)
+
+# returns a list of the paths to the column files of a dataset (not including the log order)
+def get_dataset_files(path):
+	schema = read_schema(path)
+	if schema is None:
+		raise FileNotFoundError(f"Missing dataset in {path}")
+	return [_get_column_path(path, name, schema["generation"]) for name in schema["columns"]]
+
+# returns a dictionary of arrays for each column of a dataset, along with "log_order" (the row indexes in order of
+# their log ids)
+# if mmap is true, the arrays are memory mapped from the files instead of being read into memory
+def load_dataset(path, mmap=True):
+	schema = read_schema(path)
+	if schema is None:
+		raise FileNotFoundError(f"Missing dataset in {path}")
+	mmap_mode = "r" if mmap else None
+	# column files can have rows past the end of the dataset from an append that didn't finish
+	dataset = {name: np.load(_get_column_path(path, name, schema["generation"]), mmap_mode=mmap_mode)[:schema["rows"]]\
+		for name in schema["columns"]}
+	dataset["log_order"] = np.load(_get_order_path(path, schema), mmap_mode=mmap_mode)
+	return dataset
+
+# returns an array of the row index of each log id in a dataset loaded by load_dataset()
+# raises a KeyError if any of the log ids aren't in the dataset
+def find_rows(dataset, log_ids):
+	log_ids = np.asarray(log_ids, dtype=np.int64).reshape(-1)
+	sorted_logs = dataset["used_logs"][dataset["log_order"]]
+	positions = np.searchsorted(sorted_logs, log_ids)
+	positions = np.minimum(positions, max(len(sorted_logs) - 1, 0))
+	found = len(sorted_logs) > 0 and sorted_logs[positions] == log_ids
+	if not np.all(found):
+		missing = log_ids if len(sorted_logs) == 0 else log_ids[~found]
+		raise KeyError(f"Logs not in dataset: {missing[:10].tolist()}")
+	return np.asarray(dataset["log_order"][positions])
@@ -0,0 +1,165 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# log_records
+#
+# Module for building the arrays of data collected from logs one log at a time
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for storing the collected data in arrays
+import numpy as np
+
+# number of players in each log
+players_per_log = 12
+# number of stats collected from each log (match length + 5 stats for each player + 3 extra stats for each medic)
+stats_per_log = 67
+
+# number of rows that buffers start out with
+default_capacity = 1024
+
+# names of the days of the week in order of their codes (starting at 1 for sunday)
+weekday_names = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+# code of each day of the week
+weekday_codes = {weekday: code for code, weekday in enumerate(weekday_names, 1)}
+
+# column name: (data type, number of values in each row)
+# everything is stored as compact integers and only turned into strings when it's shown to people:
+# players are the account ids from their steamid3s, gamemodes and maps are codes into a Vocabulary,
+# and timestamps are the unix timestamps that matches were played at
+# string columns are stored as python objects while they're being built and turned into numpy strings at the end
+log_record_columns = {
+	"used_logs": (str, 1),
+	"players": (np.uint32, players_per_log),
+	"gamemodes": (np.uint8, 1),
+	"maps": (np.uint16, 1),
+	"timestamps": (np.int64, 1),
+	"scores": (np.uint8, 2),
+	"stats": (np.int32, stats_per_log)
+}
+# columns that are worked out from the timestamps of a whole array of rows at once (see get_match_dates() in
+# collect_log_data.py): [year, month, day] and the code of the day of the week from weekday_codes
+log_date_columns = {
+	"dates": (np.int16, 3),
+	"weekdays": (np.uint8, 1)
+}
+
+# returns the account id in a steamid3 (the number after "[U:1:")
+def sid3_to_account_id(sid3):
+	return int(sid3[5:-1])
+
+# returns the steamid3 of an account id
+def account_id_to_sid3(account_id):
+	return f"[U:1:{account_id}]"
+
+# gives each string value (like a map name) a small integer code in the order they're first seen, starting at 0
+# the codes index into the list of values, so an array of codes can be turned back into strings with
+# np.array(vocabulary.values)[codes]
+class Vocabulary:
+	def __init__(self, values=()):
+		self.values = []
+		self.codes = {}
+		for value in values:
+			self.code(value)
+
+	def __len__(self):
+		return len(self.values)
+
+	# returns the code of a value, giving it a new code if it hasn't been seen before
+	def code(self, value):
+		code = self.codes.get(value)
+		if code is None:
+			code = len(self.values)
+			self.codes[value] = code
+			self.values.append(value)
+		return code
+
+	# returns an array of the codes of an array of values
+	def encode(self, values):
+		return np.array([self.code(value) for value in np.asarray(values).flatten()], dtype=np.int64)\
+			.reshape(np.shape(values))
+
+	# returns an array of the values of an array of codes
+	def decode(self, codes):
+		return np.array(self.values, dtype=str)[np.asarray(codes)]
+
+# returns a new dictionary of the vocabularies of each coded column
+def new_vocabularies(values=None):
+	values = values or {}
+	return {name: Vocabulary(values.get(name, ())) for name in ["gamemodes", "maps"]}
+
+# builds the columns of data collected from logs one row at a time
+# each column is stored in a preallocated buffer that doubles in size when it runs out of room,
+# so adding a row doesn't copy the whole column like np.append() and np.vstack() do
+class RecordBuilder:
+	def __init__(self, columns=log_record_columns, capacity=default_capacity):
+		if type(capacity) is not int or capacity < 1:
+			raise ValueError("capacity parameter must be a positive integer.")
+
+		self.columns = columns
+		# number of rows that have been added
+		self.size = 0
+		# number of rows the buffers have room for
+		self.capacity = capacity
+		self.buffers = {name: self._allocate(dtype, width, capacity) for name, (dtype, width) in columns.items()}
+
+	# returns an empty buffer for a column
+	def _allocate(self, dtype, width, capacity):
+		if dtype is str:
+			dtype = object
+		return np.empty((capacity, width), dtype=dtype)
+
+	# doubles the size of the buffers
+	def _grow(self):
+		self.capacity *= 2
+		for name, (dtype, width) in self.columns.items():
+			buffer = self._allocate(dtype, width, self.capacity)
+			buffer[:self.size] = self.buffers[name][:self.size]
+			self.buffers[name] = buffer
+
+	def __len__(self):
+		return self.size
+
+	# removes all of the rows so the buffers can be reused without allocating them again
+	def clear(self):
+		self.size = 0
+
+	# adds a row of data with a value (or list of values) for each column
+	def append(self, **row):
+		if self.size >= self.capacity:
+			self._grow()
+		for name in self.columns:
+			self.buffers[name][self.size] = row[name]
+		self.size += 1
+
+	# adds all of the rows of a dictionary of arrays for each column (like the ones returned by finalize())
+	def extend(self, arrays):
+		count = len(arrays[next(iter(self.columns))])
+		while self.size + count > self.capacity:
+			self._grow()
+		for name, (dtype, width) in self.columns.items():
+			self.buffers[name][self.size:self.size + count] = arrays[name].reshape(count, width)
+		self.size += count
+
+	# returns a dictionary of arrays for each column that only contain the rows that were added
+	# (starting from the row at index start)
+	# single value columns are 1 dimensional for the used log ids and 2 dimensional (with 1 column) for everything else
+	# to match the shape of the data files
+	def finalize(self, start=0):
+		arrays = {}
+		for name, (dtype, width) in self.columns.items():
+			array = self.buffers[name][start:self.size]
+			if dtype is str:
+				array = array.astype(str)
+			else:
+				array = array.copy()
+			if name == "used_logs":
+				array = array.flatten()
+			arrays[name] = array
+		return arrays
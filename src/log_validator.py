@@ -0,0 +1,319 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# log_validator
+#
+# Module for checking that logs.tf logs are valid sixes matches and extracting the data used by the goblin from them
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for parsing the json data of logs
+# orjson is used instead if it's installed since it's a lot faster
+# pip install orjson
+try:
+	import orjson
+	parse_log_json = orjson.loads
+except ImportError:
+	import json
+	parse_log_json = json.loads
+# used for parsing and checking logs on multiple cpu cores at the same time
+from concurrent.futures import ProcessPoolExecutor
+# used for keeping parsed logs in order
+from collections import deque
+
+# Schema of a valid log
+
+# keys that every log needs to have, as paths of keys into the log's json data, along with the rejection code for logs
+# that are missing them
+# parents have to come before their children so each nested dictionary only gets looked up once
+required_keys = [
+	(("version",), "missing_version"),
+	(("teams",), "missing_teams"),
+	(("teams", "Red"), "missing_red_team"),
+	(("teams", "Blue"), "missing_blu_team"),
+	(("teams", "Red", "score"), "missing_red_score"),
+	(("teams", "Blue", "score"), "missing_blu_score"),
+	(("players",), "missing_players"),
+	(("names",), "missing_names"),
+	(("info",), "missing_info"),
+	(("info", "total_length"), "missing_length"),
+	(("info", "map"), "missing_map"),
+	(("info", "date"), "missing_date")
+]
+
+# version of logs.tf logs that can be read
+log_version = 3
+# range of valid round scores for each team
+min_score = 0
+max_score = 5
+# number of players in a sixes match
+player_count = 12
+
+# names of each team in logs and which half of the lineup they go in
+teams = {"Red": 0, "Blue": 1}
+# number of players of each class on each team, in the order they go in the lineup
+class_slots = {"scout": 2, "soldier": 2, "demoman": 1, "medic": 1}
+# number of players on each team
+team_size = sum(class_slots.values())
+# where the first player of each class goes in a team's half of the lineup
+class_offsets = {"scout": 0, "soldier": 2, "demoman": 4, "medic": 5}
+# default number of logs to send to a worker process at a time
+default_batch_size = 64
+
+# stats collected from every player, in the order they go in the stats row
+player_stat_keys = ["kills", "assists", "deaths", "dmg", "dt"]
+# extra stats collected from medics
+medic_stat_keys = ["heal", "ubers", "drops"]
+
+# number of stats in each team's half of the stats row
+team_stat_count = team_size * len(player_stat_keys) + class_slots["medic"] * len(medic_stat_keys)
+# number of stats collected from each log (match length + stats of each player)
+stat_count = 1 + 2 * team_stat_count
+# class of each slot in a team's half of the lineup
+slot_classes = [class_name for class_name, count in class_slots.items() for _ in range(count)]
+
+# returns the index of the first stat of each slot in the stats row (after the match length)
+def _get_stat_offsets():
+	offsets = []
+	offset = 1
+	for slot in range(player_count):
+		offsets.append(offset)
+		offset += len(player_stat_keys)
+		if slot_classes[slot % team_size] == "medic":
+			offset += len(medic_stat_keys)
+	return offsets
+
+# index of the first stat of each slot in the stats row
+stat_offsets = _get_stat_offsets()
+
+# descriptions of each rejection code
+rejection_reasons = {
+	"bad_json": "Log isn't valid json",
+	"missing_version": "Log version missing",
+	"missing_teams": "Team data missing",
+	"missing_red_team": "Red team missing",
+	"missing_blu_team": "Blu team missing",
+	"missing_red_score": "Score missing from red team",
+	"missing_blu_score": "Score missing from blu team",
+	"missing_players": "Player data missing",
+	"missing_names": "Names are missing",
+	"missing_info": "Info field missing",
+	"missing_length": "Match length missing",
+	"missing_map": "Map missing",
+	"missing_date": "Date missing",
+	"bad_version": f"Log version is not {log_version}",
+	"bad_score": f"Team score is not between {min_score} and {max_score}",
+	"no_gamemode": "Gamemode not found from map name",
+	"bad_player_count": f"Player count is not {player_count}",
+	"unlisted_player": "Player not in list of players to train on",
+	"missing_team": "Team info missing for a player",
+	"missing_class_stats": "Class stats missing for a player",
+	"missing_class": "Class type missing for a player",
+	"missing_player_stat": "Kills, assists, deaths, damage, or damage taken missing from a player",
+	"missing_medic_stat": "Heals, ubers, or drops missing from a medic",
+	"off_class": "Primary class is non-sixes meta for a player",
+	"unknown_team": "Unknown team for a player",
+	"bad_class_count": "Wrong number of players of a class on a team"
+}
+# rejection codes that depend on the list of players to train on instead of the log itself, so they aren't stored as
+# checked (the log might be valid once the list changes)
+player_list_rejections = {"unlisted_player"}
+
+# gets the gamemode and map name (without the version) from the name of the map file
+# returns None for the gamemode if it couldn't be found
+def parse_map_name(map_name):
+	# find out if map is koth or control points
+	if "_" not in map_name:
+		return None, map_name
+	# get the gamemode from the substring that comes before the first underscore in the map name
+	first_underscore_index = map_name.index("_")
+	gamemode = map_name[:first_underscore_index]
+	# remove map version from name if there is one
+	# (any characters after a second underscore, including the underscore)
+	second_underscore_index = map_name.find("_", first_underscore_index + 1)
+	if second_underscore_index != -1:
+		map_name = map_name[:second_underscore_index]
+	return gamemode, map_name
+
+# checks that a log is a valid sixes match and extracts the data used by the goblin from it in one pass
+# data is the dictionary of the log's json data
+# sid3s is an optional set of steamid3s that every player has to be in (None lets any player be in the log)
+# returns a tuple of (record, None) if the log is valid, or (None, rejection code) if it isn't
+# a record is a dictionary of the players (12 steamid3s in lineup order), gamemode, map, date (unix timestamp),
+# scores (red, blu), and stats (match length then each player's stats in lineup order)
+def extract_log_record(data, sid3s=None):
+	# make sure all of the required keys exist
+	values = {(): data}
+	for path, code in required_keys:
+		parent = values[path[:-1]]
+		if type(parent) is not dict or path[-1] not in parent:
+			return None, code
+		values[path] = parent[path[-1]]
+
+	# make sure log version is correct
+	if values[("version",)] != log_version:
+		return None, "bad_version"
+
+	# make sure scores are valid
+	red_score = values[("teams", "Red", "score")]
+	blu_score = values[("teams", "Blue", "score")]
+	if not (min_score <= red_score <= max_score and min_score <= blu_score <= max_score):
+		return None, "bad_score"
+
+	gamemode, map_name = parse_map_name(values[("info", "map")])
+	if gamemode is None:
+		return None, "no_gamemode"
+
+	# make sure there are 12 players
+	player_data = values[("players",)]
+	if len(player_data) != player_count:
+		return None, "bad_player_count"
+
+	# lineup of players in order of team then class
+	players = [None] * player_count
+	# stats of each player in the same order as the lineup
+	player_stats = [None] * player_count
+	# number of players of each class that have been found on each team
+	found = [dict.fromkeys(class_slots, 0) for _ in teams]
+
+	# put each player in the right spot of the lineup
+	for sid3, player in player_data.items():
+		# make sure this is a player that was inputted to be trained on by the neural net
+		if sid3s is not None and sid3 not in sid3s:
+			return None, "unlisted_player"
+		if "team" not in player:
+			return None, "missing_team"
+		class_stats = player.get("class_stats")
+		if not class_stats:
+			return None, "missing_class_stats"
+		if "type" not in class_stats[0]:
+			return None, "missing_class"
+		try:
+			stats = [player[key] for key in player_stat_keys]
+		except KeyError:
+			return None, "missing_player_stat"
+
+		# the class the player played the most is listed first
+		class_name = class_stats[0]["type"]
+		if class_name not in class_slots:
+			return None, "off_class"
+		if class_name == "medic":
+			try:
+				stats += [player[key] for key in medic_stat_keys]
+			except KeyError:
+				return None, "missing_medic_stat"
+
+		team = teams.get(player["team"])
+		if team is None:
+			return None, "unknown_team"
+
+		# make sure there's still an open spot for this class on this team
+		class_count = found[team][class_name]
+		if class_count >= class_slots[class_name]:
+			return None, "bad_class_count"
+		found[team][class_name] = class_count + 1
+
+		slot = team * team_size + class_offsets[class_name] + class_count
+		players[slot] = sid3
+		player_stats[slot] = stats
+
+	# make sure every spot in the lineup was filled
+	if None in players:
+		return None, "bad_class_count"
+
+	# combine all stats into one list including match length
+	match_stats = [values[("info", "total_length")]]
+	for stats in player_stats:
+		match_stats += stats
+
+	return {
+		"players": players,
+		"gamemode": gamemode,
+		"map": map_name,
+		"date": values[("info", "date")],
+		"scores": [red_score, blu_score],
+		"stats": match_stats
+	}, None
+
+# parses the raw json bytes of a log, checks that it's a valid sixes match, and extracts the data from it
+# sid3s is an optional set of steamid3s that every player has to be in (None lets any player be in the log)
+# returns a tuple of (record, None) if the log is valid, or (None, rejection code) if it isn't
+# records are compact tuples of (players, gamemode, map, date, scores, stats) so they're quick to send between processes
+def parse_log_record(raw_log, sid3s=None):
+	try:
+		data = parse_log_json(raw_log)
+	except ValueError:
+		return None, "bad_json"
+
+	record, rejection = extract_log_record(data, sid3s=sid3s)
+	if rejection is not None:
+		return None, rejection
+	return (tuple(record["players"]), record["gamemode"], record["map"], record["date"], tuple(record["scores"]),\
+		tuple(record["stats"])), None
+
+# set of steamid3s used by parse_log_record() in each worker process
+# (sent once when the process starts instead of with every batch of logs)
+_worker_sid3s = None
+
+# sets up a worker process
+def _init_worker(sid3s):
+	global _worker_sid3s
+	_worker_sid3s = sid3s
+
+# parses a batch of raw logs in a worker process and returns a list of (record, rejection code) pairs
+# logs that are None (couldn't be downloaded) give back (None, None)
+def _parse_log_batch(raw_logs):
+	return [(None, None) if raw_log is None else parse_log_record(raw_log, _worker_sid3s) for raw_log in raw_logs]
+
+# parses, checks, and extracts the data from a stream of (log id, raw json bytes) pairs
+# if processes is more than 1, logs are sent to that many worker processes in batches of batch_size logs so parsing
+# them uses every cpu core
+# yields (log id, record, rejection code) in the same order as raw_logs
+# record is None if the log was rejected, and both are None if the raw log was None (it couldn't be downloaded)
+def parse_log_records(raw_logs, sid3s=None, processes=None, batch_size=default_batch_size):
+	# parse logs in this process if there's only one process to use
+	if processes is None or processes <= 1:
+		for log_id, raw_log in raw_logs:
+			if raw_log is None:
+				yield log_id, None, None
+			else:
+				yield (log_id, *parse_log_record(raw_log, sid3s))
+		return
+
+	if type(batch_size) is not int or batch_size < 1:
+		raise ValueError("batch_size parameter must be a positive integer.")
+
+	with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(sid3s,)) as executor:
+		# batches that have been sent to worker processes but not yielded yet, in order
+		# only a couple batches per process are sent at a time so memory stays bounded
+		pending = deque()
+		window = processes * 2
+		batch_ids = []
+		batch_logs = []
+
+		# yields the results of the oldest batch that was sent to a worker process
+		def _finish_batch():
+			log_ids, future = pending.popleft()
+			for log_id, (record, rejection) in zip(log_ids, future.result()):
+				yield log_id, record, rejection
+
+		for log_id, raw_log in raw_logs:
+			batch_ids.append(log_id)
+			batch_logs.append(raw_log)
+			if len(batch_ids) >= batch_size:
+				pending.append((batch_ids, executor.submit(_parse_log_batch, batch_logs)))
+				batch_ids = []
+				batch_logs = []
+				if len(pending) >= window:
+					yield from _finish_batch()
+		# send the last partial batch
+		if len(batch_ids) > 0:
+			pending.append((batch_ids, executor.submit(_parse_log_batch, batch_logs)))
+		while pending:
+			yield from _finish_batch()
@@ -0,0 +1,240 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# match_store
+#
+# Module for storing the data collected from logs in an sqlite database so matches can be found with indexed queries
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for storing the matches in a file that can be queried
+import sqlite3
+# used for building the rows of each table
+import numpy as np
+# used for turning steamid3s into account ids
+from log_records import sid3_to_account_id, account_id_to_sid3, players_per_log
+# used for the layout of the lineup and stats of each log
+from log_validator import team_size, player_stat_keys, slot_classes, stat_offsets
+
+# names of each team in the order they go in the lineup
+team_names = ["Red", "Blu"]
+# columns of the player_stats table (medic stats are null for every other class)
+stat_columns = ["kills", "assists", "deaths", "damage", "damage_taken", "heals", "ubers", "drops"]
+
+# sqlite database of matches, the lineup of each match, and the stats of each player in each match
+# players are stored by their account id (the number in their steamid3), so looking up a player's matches is an
+# indexed integer lookup
+# dates are stored as "YYYY-MM-DD" strings, so they can be compared with each other
+class MatchStore:
+	def __init__(self, path, timeout=60):
+		self.path = path
+		# isolation_level=None so transactions are only started when they're asked for
+		self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+		self.connection.execute("""CREATE TABLE IF NOT EXISTS matches (
+			log_id INTEGER PRIMARY KEY,
+			gamemode TEXT NOT NULL,
+			map TEXT NOT NULL,
+			date TEXT NOT NULL,
+			weekday INTEGER NOT NULL,
+			length INTEGER NOT NULL,
+			red_score INTEGER NOT NULL,
+			blu_score INTEGER NOT NULL
+		)""")
+		self.connection.execute("""CREATE TABLE IF NOT EXISTS lineups (
+			log_id INTEGER NOT NULL,
+			slot INTEGER NOT NULL,
+			account_id INTEGER NOT NULL,
+			team TEXT NOT NULL,
+			class TEXT NOT NULL,
+			PRIMARY KEY (log_id, slot)
+		) WITHOUT ROWID""")
+		self.connection.execute(f"""CREATE TABLE IF NOT EXISTS player_stats (
+			log_id INTEGER NOT NULL,
+			slot INTEGER NOT NULL,
+			{", ".join(f"{column} INTEGER" for column in stat_columns)},
+			PRIMARY KEY (log_id, slot)
+		) WITHOUT ROWID""")
+		self.connection.execute("CREATE INDEX IF NOT EXISTS lineups_player ON lineups (account_id, log_id)")
+		self.connection.execute("CREATE INDEX IF NOT EXISTS matches_map ON matches (map, date)")
+		self.connection.execute("CREATE INDEX IF NOT EXISTS matches_date ON matches (date)")
+
+	def close(self):
+		self.connection.close()
+
+	# runs write(connection) in one transaction, so a crash never leaves some of the rows stored and some not
+	def _write(self, write):
+		self.connection.execute("BEGIN IMMEDIATE")
+		try:
+			write(self.connection)
+			self.connection.execute("COMMIT")
+		except:
+			self.connection.execute("ROLLBACK")
+			raise
+
+	# removes every match
+	def clear(self):
+		def write(connection):
+			for table in ["matches", "lineups", "player_stats"]:
+				connection.execute(f"DELETE FROM {table}")
+		self._write(write)
+
+	# adds the matches in a dictionary of arrays of each column (from RecordBuilder.finalize() or load_dataset())
+	# vocabularies is the dictionary of the Vocabulary of the gamemode and map codes in records
+	# matches that are already stored get replaced
+	# returns the number of matches that were added
+	def add_matches(self, records, vocabularies):
+		log_ids = np.asarray(records["used_logs"]).astype(np.int64).reshape(-1)
+		if log_ids.size == 0:
+			return 0
+		dates = np.asarray(records["dates"]).astype(np.int64)
+		date_strings = [f"{year:04}-{month:02}-{day:02}" for year, month, day in dates.tolist()]
+		gamemodes = np.array(vocabularies["gamemodes"].values, dtype=str)[np.asarray(records["gamemodes"]).reshape(-1)]
+		maps = np.array(vocabularies["maps"].values, dtype=str)[np.asarray(records["maps"]).reshape(-1)]
+		scores = np.asarray(records["scores"]).astype(np.int64)
+		stats = np.asarray(records["stats"]).astype(np.int64)
+		weekdays = np.asarray(records["weekdays"]).reshape(-1)
+		match_rows = zip(log_ids.tolist(), gamemodes.tolist(), maps.tolist(), date_strings, weekdays.tolist(),\
+			stats[:, 0].tolist(), scores[:, 0].tolist(), scores[:, 1].tolist())
+
+		# one row for each player in each match (log id, slot) in lineup order
+		match_index = np.repeat(np.arange(log_ids.size), players_per_log)
+		slot_index = np.tile(np.arange(players_per_log), log_ids.size)
+		slot_teams = [team_names[slot // team_size] for slot in range(players_per_log)] * log_ids.size
+		slot_class_names = [slot_classes[slot % team_size] for slot in range(players_per_log)] * log_ids.size
+		players = np.asarray(records["players"]).astype(np.int64).reshape(-1)
+		lineup_rows = zip(log_ids[match_index].tolist(), slot_index.tolist(), players.tolist(), slot_teams,\
+			slot_class_names)
+
+		# gather each player's stats out of the stats rows all at once (medic stats are only kept for medics)
+		stat_index = np.array(stat_offsets)[:, None] + np.arange(len(stat_columns))
+		player_stats = stats[:, stat_index].reshape(-1, len(stat_columns)).astype(object)
+		is_medic = np.array([slot_class == "medic" for slot_class in slot_class_names])
+		player_stats[~is_medic, len(player_stat_keys):] = None
+		stat_rows = zip(log_ids[match_index].tolist(), slot_index.tolist(), *player_stats.T.tolist())
+
+		def write(connection):
+			connection.execute("CREATE TEMPORARY TABLE IF NOT EXISTS new_logs (log_id INTEGER PRIMARY KEY)")
+			connection.execute("DELETE FROM new_logs")
+			connection.executemany("INSERT OR IGNORE INTO new_logs VALUES (?)", ((log_id,) for log_id in log_ids.tolist()))
+			# replace matches that are already stored
+			for table in ["matches", "lineups", "player_stats"]:
+				connection.execute(f"DELETE FROM {table} WHERE log_id IN (SELECT log_id FROM new_logs)")
+			connection.executemany("INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?)", match_rows)
+			connection.executemany("INSERT INTO lineups VALUES (?, ?, ?, ?, ?)", lineup_rows)
+			connection.executemany(f"INSERT INTO player_stats VALUES ({', '.join(['?'] * (len(stat_columns) + 2))})",\
+				stat_rows)
+		self._write(write)
+		return log_ids.size
+
+	# returns the where clause and its parameters that filter matches (as "m") by the given values
+	# player is a steamid3 that has to be in the match, map_name and gamemode have to match exactly,
+	# and since and until are "YYYY-MM-DD" dates that the match has to be on or after / before
+	def _get_filters(self, player=None, map_name=None, gamemode=None, since=None, until=None):
+		conditions = []
+		parameters = []
+		if player is not None:
+			conditions.append("m.log_id IN (SELECT log_id FROM lineups WHERE account_id = ?)")
+			parameters.append(sid3_to_account_id(player))
+		if map_name is not None:
+			conditions.append("m.map = ?")
+			parameters.append(map_name)
+		if gamemode is not None:
+			conditions.append("m.gamemode = ?")
+			parameters.append(gamemode)
+		if since is not None:
+			conditions.append("m.date >= ?")
+			parameters.append(since)
+		if until is not None:
+			conditions.append("m.date < ?")
+			parameters.append(until)
+		return (" WHERE " + " AND ".join(conditions)) if conditions else "", parameters
+
+	# returns the number of stored matches that pass the filters (same as _get_filters())
+	def count_matches(self, **filters):
+		where, parameters = self._get_filters(**filters)
+		return self.connection.execute(f"SELECT COUNT(*) FROM matches AS m{where}", parameters).fetchone()[0]
+
+	# returns a sorted array of the log ids of the matches that pass the filters (same as _get_filters())
+	# the rows of those matches in the dataset can be found with log_dataset.find_rows()
+	def find_matches(self, **filters):
+		where, parameters = self._get_filters(**filters)
+		rows = self.connection.execute(f"SELECT m.log_id FROM matches AS m{where} ORDER BY m.log_id", parameters)
+		return np.array([log_id for log_id, in rows], dtype=np.int64)
+
+	# returns a list of dictionaries of each match that passes the filters (same as _get_filters()), in order of date
+	def get_matches(self, **filters):
+		where, parameters = self._get_filters(**filters)
+		cursor = self.connection.execute(f"SELECT m.* FROM matches AS m{where} ORDER BY m.date, m.log_id", parameters)
+		columns = [description[0] for description in cursor.description]
+		return [dict(zip(columns, row)) for row in cursor]
+
+	# returns a list of the steamid3s in the lineup of a match, in lineup order
+	def get_lineup(self, log_id):
+		rows = self.connection.execute("SELECT account_id FROM lineups WHERE log_id = ? ORDER BY slot", (int(log_id),))
+		return [account_id_to_sid3(account_id) for account_id, in rows]
+
+	# returns a list of dictionaries of a player's stats in each match that passes the filters (same as
+	# _get_filters(), along with the log id, date, map, team, and class of the match), in order of date
+	def get_player_stats(self, player, **filters):
+		where, parameters = self._get_filters(**filters)
+		where = f"{where} AND" if where else " WHERE"
+		cursor = self.connection.execute(f"SELECT m.log_id, m.date, m.map, l.team, l.class, "\
+			f"{', '.join(f's.{column}' for column in stat_columns)} FROM matches AS m "\
+			"JOIN lineups AS l ON l.log_id = m.log_id "\
+			"JOIN player_stats AS s ON s.log_id = l.log_id AND s.slot = l.slot"\
+			f"{where} l.account_id = ? ORDER BY m.date, m.log_id", [*parameters, sid3_to_account_id(player)])
+		columns = [description[0] for description in cursor.description]
+		return [dict(zip(columns, row)) for row in cursor]
+
+# builds the match store from the dataset, or finds matches in it
+if __name__ == "__main__":
+	import sys
+	from collect_log_data import match_store_path, read_log_dataset, read_log_vocabularies
+
+	# print help message
+	if "-h" in sys.argv or "--help" in sys.argv:
+		print("Usage: python match_store.py [build | query] [options]")
+		print("build: stores every match in the dataset in the match store (replacing what was in it)")
+		print("query: prints the log ids of the matches that pass every filter that's given")
+		print("\t-p or --player followed by a steamid3 that has to be in the match")
+		print("\t-m or --map followed by the name of the map the match was played on")
+		print("\t-g or --gamemode followed by the gamemode of the match")
+		print("\t--since followed by a date (YYYY-MM-DD) that the match was played on or after")
+		print("\t--until followed by a date (YYYY-MM-DD) that the match was played before")
+		exit(0)
+
+	if len(sys.argv) < 2 or sys.argv[1] not in ["build", "query"]:
+		print("First argument must be build or query. Use -h for help.")
+		exit(2)
+
+	store = MatchStore(match_store_path)
+	if sys.argv[1] == "build":
+		store.clear()
+		count = store.add_matches(read_log_dataset(), read_log_vocabularies())
+		print(f"Stored {count} matches in {match_store_path}")
+	else:
+		# names of the filter that each flag sets
+		flags = {"-p": "player", "--player": "player", "-m": "map_name", "--map": "map_name", "-g": "gamemode",\
+			"--gamemode": "gamemode", "--since": "since", "--until": "until"}
+		filters = {}
+		i = 2
+		while i < len(sys.argv):
+			if sys.argv[i] not in flags:
+				print(f"Unknown argument {sys.argv[i]}. Use -h for help.")
+				exit(2)
+			if i + 1 >= len(sys.argv):
+				print(f"{sys.argv[i]} requires a value after it.")
+				exit(2)
+			filters[flags[sys.argv[i]]] = sys.argv[i + 1]
+			i += 2
+		log_ids = store.find_matches(**filters)
+		for log_id in log_ids:
+			print(log_id)
+		print(f"{log_ids.size} matches")
+	store.close()
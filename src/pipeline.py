@@ -0,0 +1,353 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# pipeline
+#
+# Module for running each stage of collecting data and training only when something it depends on has changed
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for storing the manifest
+import json
+# used for hashing the outputs and code of each stage
+import hashlib
+import inspect
+# used for checking which files exist
+import os
+# used for recording when each stage was built
+import time
+# used for everything that collects data from logs
+from collect_log_data import data_path, profile_data_path, log_data_path, sid3_data_path, dataset_path,\
+	rejected_logs_path, inputs_matrix_path, outputs_matrix_path, lineups_matrix_path, mirror_matrix_path,\
+	stats_matrix_path, encoders_path, default_fetch_workers, create_http_client, get_logs, read_log_ids, read_sid3s,\
+	get_cached_log_path, fetch_raw_logs, fetch_log_data, prepare_log_data
+# used for finding the files of the dataset
+from log_dataset import dataset_exists, get_dataset_files
+# used for hashing the constants that the code of each stage uses
+import numpy as np
+
+# name of the file that records the hash of each stage's outputs and what they were built from
+manifest_file = "pipeline.json"
+# path to the manifest
+manifest_path = f"{data_path}/{manifest_file}"
+# version of the manifest format
+manifest_version = 1
+
+# size of the pieces that files are read in while hashing them
+hash_block_size = 1 << 20
+# folder of the code that gets hashed (code from anywhere else, like numpy, isn't part of a stage)
+code_path = os.path.dirname(os.path.abspath(__file__))
+# types of the constants that get hashed along with the code that uses them (anything else, like an ssl context, has no
+# repr that stays the same between runs)
+constant_types = (bool, int, float, str, bytes, type(None), list, tuple, dict, np.ndarray, np.generic)
+
+# returns the sha256 hash of the contents of a list of files, or None if any of them are missing
+# only the contents are hashed (not the names), so a file that gets rewritten with the same contents under a new name
+# (like a new generation of the dataset) has the same hash
+def hash_files(paths):
+	digest = hashlib.sha256()
+	for path in paths:
+		if not os.path.isfile(path):
+			return None
+		digest.update(f"{os.path.getsize(path)}\n".encode())
+		with open(path, "rb") as file:
+			for block in iter(lambda: file.read(hash_block_size), b""):
+				digest.update(block)
+	return digest.hexdigest()
+
+# returns whether a function or class is part of the code in code_path
+def _is_stage_code(value):
+	if not (inspect.isfunction(value) or inspect.isclass(value)):
+		return False
+	try:
+		source_path = inspect.getsourcefile(value)
+	except TypeError:
+		return False
+	return source_path is not None and os.path.dirname(os.path.abspath(source_path)) == code_path
+
+# returns a list of every code object of a function (including the functions and lambdas defined inside it)
+def _get_code_objects(code):
+	code_objects = [code]
+	for constant in code.co_consts:
+		if inspect.iscode(constant):
+			code_objects += _get_code_objects(constant)
+	return code_objects
+
+# returns a list of the functions of a function or class (a class's methods, or the function itself)
+def _get_functions(value):
+	if inspect.isfunction(value):
+		return [value]
+	functions = []
+	for attribute in vars(value).values():
+		attribute = getattr(attribute, "__func__", attribute)
+		if isinstance(attribute, property):
+			attribute = attribute.fget
+		if inspect.isfunction(attribute):
+			functions.append(attribute)
+	return functions
+
+# returns a dictionary of the functions and classes in code_path that a list of functions and classes run (including
+# themselves) by their qualified names, along with a dictionary of the constants they use by their qualified names
+# the names that each function looks up in its module are followed until nothing new is found, so the helpers a stage
+# uses are part of its code without listing them, and code that a stage never runs (like the code of a later stage in
+# the same module) isn't
+def get_stage_code(functions):
+	code = {}
+	constants = {}
+	pending = list(functions)
+	while pending:
+		value = pending.pop()
+		name = f"{value.__module__}.{value.__qualname__}"
+		if name in code or not _is_stage_code(value):
+			continue
+		code[name] = value
+		if inspect.isclass(value):
+			pending += [base for base in value.__bases__ if _is_stage_code(base)]
+		for function in _get_functions(value):
+			for code_object in _get_code_objects(function.__code__):
+				for used_name in code_object.co_names:
+					if used_name not in function.__globals__:
+						continue
+					used_value = function.__globals__[used_name]
+					if _is_stage_code(used_value):
+						pending.append(used_value)
+					elif isinstance(used_value, constant_types):
+						constants[f"{function.__module__}.{used_name}"] = used_value
+	return code, constants
+
+# returns the sha256 hash of the source code of a list of functions and classes along with every function, class, and
+# constant in code_path that they use, so changing how a stage is built makes it stale but changing code that it
+# doesn't run doesn't
+def hash_code(functions):
+	code, constants = get_stage_code(functions)
+	digest = hashlib.sha256()
+	for name in sorted(code):
+		digest.update(f"{name}\n{inspect.getsource(code[name])}".encode())
+	for name in sorted(constants):
+		value = constants[name]
+		digest.update(f"{name}=".encode())
+		digest.update(value.tobytes() if isinstance(value, np.ndarray) else repr(value).encode())
+	return digest.hexdigest()
+
+# one step of the pipeline
+# name is what the stage is called in the manifest
+# fingerprint() returns a hash of the stage's outputs, or None if they're missing
+# build() makes the stage's outputs (None for stages that only track files that are made some other way, like the
+# list of profiles)
+# depends is a list of the names of the stages whose outputs this stage is built from
+# params is a dictionary of the settings the stage is built with
+# code is a list of the functions that build the stage (a change to any of them, or to anything they use, rebuilds the
+# stage)
+class Stage:
+	def __init__(self, name, fingerprint, build=None, depends=(), params=None, code=()):
+		self.name = name
+		self.fingerprint = fingerprint
+		self.build = build
+		self.depends = list(depends)
+		self.params = dict(params or {})
+		if code:
+			self.params["code"] = hash_code(code)
+
+# runs stages in order, rebuilding a stage only when it's missing, its outputs were changed, its parameters or code
+# changed, or the outputs of a stage it depends on changed since it was built
+# a stage that gets rebuilt into the same outputs doesn't make the stages after it stale
+# data that was made before there was a manifest is adopted the first time the pipeline is run on it, so stages whose
+# outputs are already there are recorded as built instead of being rebuilt (unless a stage they depend on gets built)
+class Pipeline:
+	def __init__(self, stages, path=manifest_path):
+		self.stages = {stage.name: stage for stage in stages}
+		self.path = path
+		# whether there's no manifest yet, so the outputs that are already there get adopted
+		self.adopt = not os.path.isfile(path)
+		self.manifest = self._read_manifest()
+
+	# adds a stage to the end of the pipeline (replacing any stage with the same name)
+	def add_stage(self, stage):
+		self.stages[stage.name] = stage
+
+	# returns the dictionary of the entry of each stage in the manifest (empty if there's no manifest yet)
+	def _read_manifest(self):
+		if not os.path.isfile(self.path):
+			return {}
+		with open(self.path, "r") as manifest_file:
+			manifest = json.load(manifest_file)
+		# a manifest from another version makes every stage rebuild
+		if manifest.get("version") != manifest_version:
+			return {}
+		return manifest["stages"]
+
+	# writes the manifest to a temporary file and then renames it so a crash never leaves a half written manifest
+	def _store_manifest(self):
+		os.makedirs(os.path.dirname(self.path), exist_ok=True)
+		temp_path = f"{self.path}.{os.getpid()}.tmp"
+		with open(temp_path, "w") as manifest_file:
+			json.dump({"version": manifest_version, "stages": self.manifest}, manifest_file, indent=1)
+		os.replace(temp_path, self.path)
+
+	# returns a list of the names of a stage and every stage it depends on, in the order they need to be run
+	def _get_order(self, name, order=None):
+		order = [] if order is None else order
+		if name not in self.stages:
+			raise ValueError(f"Unknown stage {name}.")
+		for dependency in self.stages[name].depends:
+			self._get_order(dependency, order)
+		if name not in order:
+			order.append(name)
+		return order
+
+	# returns whether a stage that has never been built has outputs to adopt instead
+	# built is a list of the names of the stages that were (or would be) built before it
+	def _can_adopt(self, stage, fingerprints, built):
+		return self.adopt and stage.name not in self.manifest and fingerprints[stage.name] is not None and\
+			not any(dependency in built for dependency in stage.depends)
+
+	# records a stage as built from the current outputs of it and the stages it depends on
+	def _record(self, stage, fingerprints):
+		self.manifest[stage.name] = {
+			"params": stage.params,
+			"inputs": {dependency: fingerprints[dependency] for dependency in stage.depends},
+			"output": fingerprints[stage.name],
+			"built": time.time()
+		}
+		# store the manifest after every stage so a crash doesn't rebuild the stages that finished
+		self._store_manifest()
+
+	# returns the reason a stage needs to be rebuilt, or None if it's up to date
+	# fingerprints is a dictionary of the current hash of the outputs of each stage that has been checked
+	def _get_stale_reason(self, stage, fingerprints):
+		entry = self.manifest.get(stage.name)
+		if entry is None:
+			return "never built"
+		if entry["params"] != stage.params:
+			return "parameters or code changed"
+		for dependency in stage.depends:
+			if entry["inputs"].get(dependency) != fingerprints[dependency]:
+				return f"{dependency} changed"
+		if fingerprints[stage.name] is None:
+			return "outputs missing"
+		if entry["output"] != fingerprints[stage.name]:
+			return "outputs changed"
+		return None
+
+	# returns a dictionary of the reason each stage up to target needs to be rebuilt (None if it doesn't), assuming
+	# stages that are stale get rebuilt into different outputs
+	def status(self, target):
+		fingerprints = {}
+		reasons = {}
+		for name in self._get_order(target):
+			stage = self.stages[name]
+			fingerprints[name] = stage.fingerprint()
+			if stage.build is None:
+				reasons[name] = None
+				continue
+			if self._can_adopt(stage, fingerprints, [dependency for dependency in reasons if reasons[dependency]]):
+				reasons[name] = None
+				continue
+			stale_dependency = next((dependency for dependency in stage.depends if reasons[dependency]), None)
+			reasons[name] = self._get_stale_reason(stage, fingerprints) or\
+				(f"{stale_dependency} is stale" if stale_dependency else None)
+		return reasons
+
+	# builds every stage up to target that is stale (along with the stages in force)
+	# returns a list of the names of the stages that were built
+	def run(self, target, force=(), verbose=True):
+		fingerprints = {}
+		built = []
+		for name in self._get_order(target):
+			stage = self.stages[name]
+			fingerprints[name] = stage.fingerprint()
+			if stage.build is None:
+				if fingerprints[name] is None:
+					raise FileNotFoundError(f"Missing outputs of the {name} stage.")
+				continue
+
+			if name not in force and self._can_adopt(stage, fingerprints, built):
+				if verbose:
+					print(f"Adopting the outputs of stage {name} that are already there.")
+				self._record(stage, fingerprints)
+				continue
+			reason = "forced" if name in force else self._get_stale_reason(stage, fingerprints)
+			if reason is None:
+				if verbose:
+					print(f"Stage {name} is up to date.")
+				continue
+
+			if verbose:
+				print(f"Building stage {name} ({reason})...")
+			stage.build()
+			fingerprints[name] = stage.fingerprint()
+			if fingerprints[name] is None:
+				raise FileNotFoundError(f"Stage {name} didn't make all of its outputs.")
+			self._record(stage, fingerprints)
+			built.append(name)
+		return built
+
+# returns the hash of the ids of the logs in the log id data file that are in the log cache
+def _fingerprint_raw_logs():
+	if not os.path.isfile(log_data_path):
+		return None
+	digest = hashlib.sha256()
+	for log_id in read_log_ids():
+		if os.path.isfile(get_cached_log_path(log_id)):
+			digest.update(f"{log_id}\n".encode())
+	return digest.hexdigest()
+
+# returns the hash of the columns of the dataset and the rejected logs
+def _fingerprint_records():
+	if not dataset_exists(dataset_path):
+		return None
+	return hash_files(get_dataset_files(dataset_path) + [rejected_logs_path])
+
+# downloads every log in the log id data file that isn't in the log cache yet
+def _download_raw_logs(max_workers, rate_limit, verbose):
+	missing_logs = [log_id for log_id in read_log_ids() if not os.path.isfile(get_cached_log_path(log_id))]
+	if verbose:
+		print(f"Downloading {len(missing_logs)} logs that aren't cached...")
+	client = create_http_client(rate_limit=rate_limit, pool_size=max_workers)
+	for _ in fetch_raw_logs(missing_logs, client, max_workers=max_workers, use_cache=True):
+		pass
+	client.close()
+
+# returns the stages that collect and prepare the data (profiles -> log ids -> raw logs -> records -> prepared)
+# if pages is None, the log ids that are already stored are used instead of crawling for them
+# cyclical_dates, player_form, player_ratings, and player_synergy are the same as in prepare_log_data()
+# the rest of the arguments are the same as get_logs() and fetch_log_data()
+def get_data_stages(pages=None, include_randos=True, verbose=True, max_workers=default_fetch_workers, rate_limit=None,\
+	backend="api", processes=None, cyclical_dates=False, player_form=False,\
+	player_ratings=False, player_synergy=False):
+	if pages is None:
+		log_ids_stage = Stage("log_ids", lambda: hash_files([log_data_path, sid3_data_path]))
+	else:
+		log_ids_stage = Stage("log_ids", lambda: hash_files([log_data_path, sid3_data_path]),\
+			build=lambda: get_logs(pages, verbose=verbose, backend=backend), depends=["profiles"],\
+			params={"pages": pages, "backend": backend})
+	return [
+		Stage("profiles", lambda: hash_files([profile_data_path])),
+		log_ids_stage,
+		Stage("raw_logs", _fingerprint_raw_logs, build=lambda: _download_raw_logs(max_workers, rate_limit, verbose),\
+			depends=["log_ids"], code=[_download_raw_logs]),
+		# the raw logs are already downloaded, so the records are built offline from the log cache
+		Stage("records", _fingerprint_records, build=lambda: fetch_log_data(read_log_ids(), read_sid3s(),\
+			include_randos=include_randos, verbose=verbose, max_workers=max_workers, offline=True,\
+			processes=processes), depends=["log_ids", "raw_logs"], params={"include_randos": include_randos},\
+			code=[fetch_log_data, read_log_ids, read_sid3s]),
+		Stage("prepared", lambda: hash_files([inputs_matrix_path, outputs_matrix_path, lineups_matrix_path,\
+			mirror_matrix_path, stats_matrix_path, encoders_path]),\
+			build=lambda: prepare_log_data(verbose=verbose, cyclical_dates=cyclical_dates, player_form=player_form,\
+			player_ratings=player_ratings, player_synergy=player_synergy), depends=["records"],\
+			params={"cyclical_dates": cyclical_dates, "player_form": player_form, "player_ratings": player_ratings,\
+			"player_synergy": player_synergy},\
+			code=[prepare_log_data])
+	]
+
+# prints whether each stage of collecting and preparing the data is up to date
+if __name__ == "__main__":
+	pipeline = Pipeline(get_data_stages())
+	for name, reason in pipeline.status("prepared").items():
+		print(f"{name}: {'up to date' if reason is None else reason}")
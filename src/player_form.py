@@ -0,0 +1,193 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# player_form
+#
+# Module for working out how well each player was playing going into each match from the matches they played before
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for the running totals of each player
+import numpy as np
+# used for the layout of the lineup and stats of each log
+from log_records import players_per_log
+from log_validator import team_size, player_stat_keys, medic_stat_keys, slot_classes, stat_offsets
+# used for scaling the form features into inputs
+from feature_encoders import FeatureScaler
+
+# default number of days it takes for a match to count half as much towards a player's form
+default_half_life = 90
+# number of players that the running totals start out with room for
+default_player_capacity = 1024
+
+# running totals that are kept for each player (each one is decayed over time)
+total_names = ["games", "wins", "minutes", "kills", "deaths", "damage", "medic_games", "ubers", "drops"]
+# index of each running total
+total_index = {name: index for index, name in enumerate(total_names)}
+# features of each player's form, in the order they're returned
+form_names = ["games", "damage_per_minute", "kill_death_ratio", "win_rate", "uber_rate", "drop_rate"]
+# value of each form feature that's scaled to 1 as an input (anything above it is clipped to 1)
+# games are decayed, so a player who plays every day levels off at about 130, and kill/death ratios are clipped at 4
+# since a few players with hardly any deaths would otherwise squash everyone else's ratio down near 0
+form_scales = {"games": 100, "damage_per_minute": 500, "kill_death_ratio": 4, "win_rate": 1, "uber_rate": 30,\
+	"drop_rate": 5}
+
+# index of each stat in a player's part of the stats row
+player_stat_index = {key: index for index, key in enumerate(player_stat_keys)}
+# whether each slot in the lineup is a medic
+medic_slots = np.array([slot_classes[slot % team_size] == "medic" for slot in range(players_per_log)])
+
+# returns an array of what each player in each match adds to their running totals
+# stats is the array of stats rows and scores is the array of [red score, blu score] of each match
+# returns an array with a row for each match, a row in that for each slot of the lineup, and a column for each total
+def get_match_totals(stats, scores):
+	stats = np.asarray(stats, dtype=np.float64)
+	scores = np.asarray(scores, dtype=np.float64).reshape(-1, 2)
+	totals = np.zeros((scores.shape[0], players_per_log, len(total_names)))
+	if scores.shape[0] == 0:
+		return totals
+	offsets = np.array(stat_offsets)
+
+	totals[:, :, total_index["games"]] = 1
+	# a win counts as 1, a tie as half, and a loss as 0 for each player on the team
+	red_result = (np.sign(scores[:, 0] - scores[:, 1]) + 1) / 2
+	totals[:, :team_size, total_index["wins"]] = red_result[:, None]
+	totals[:, team_size:, total_index["wins"]] = 1 - red_result[:, None]
+	# match length is in seconds
+	totals[:, :, total_index["minutes"]] = stats[:, :1] / 60
+	totals[:, :, total_index["kills"]] = stats[:, offsets + player_stat_index["kills"]]
+	totals[:, :, total_index["deaths"]] = stats[:, offsets + player_stat_index["deaths"]]
+	totals[:, :, total_index["damage"]] = stats[:, offsets + player_stat_index["dmg"]]
+	# medic stats come right after the rest of a medic's stats
+	medic_offsets = offsets[medic_slots] + len(player_stat_keys)
+	totals[:, medic_slots, total_index["medic_games"]] = 1
+	totals[:, medic_slots, total_index["ubers"]] = stats[:, medic_offsets + medic_stat_keys.index("ubers")]
+	totals[:, medic_slots, total_index["drops"]] = stats[:, medic_offsets + medic_stat_keys.index("drops")]
+	return totals
+
+# keeps exponentially decayed running totals of every player's matches so their form going into a match can be found
+# without looking back through their history
+# each total is multiplied by 0.5 for every half_life days that pass, so recent matches count the most
+# totals are only decayed when a player is looked up or updated, so each match takes the same amount of time no matter
+# how many matches or players there have been
+class PlayerFormTracker:
+	def __init__(self, half_life=default_half_life, capacity=default_player_capacity):
+		if half_life <= 0:
+			raise ValueError("half_life parameter must be positive.")
+		# half life in seconds
+		self.half_life = half_life * 24 * 60 * 60
+		# index of each player's row in the arrays
+		self.players = {}
+		self.totals = np.zeros((capacity, len(total_names)))
+		# timestamp that each player's totals were last decayed to
+		self.times = np.zeros(capacity, dtype=np.int64)
+
+	def __len__(self):
+		return len(self.players)
+
+	# returns the rows of an array of account ids, adding rows for players that haven't been seen yet
+	def _get_rows(self, players):
+		rows = []
+		for player in np.asarray(players).reshape(-1).tolist():
+			row = self.players.get(player)
+			if row is None:
+				row = len(self.players)
+				self.players[player] = row
+				# double the size of the arrays when they run out of room
+				if row >= self.totals.shape[0]:
+					self.totals = np.concatenate((self.totals, np.zeros_like(self.totals)))
+					self.times = np.concatenate((self.times, np.zeros_like(self.times)))
+			rows.append(row)
+		return np.array(rows, dtype=np.int64)
+
+	# decays the totals of rows of players to a timestamp
+	def _decay(self, rows, timestamp):
+		# players that have never played have no totals to decay
+		elapsed = np.maximum(timestamp - self.times[rows], 0)
+		self.totals[rows] *= (0.5 ** (elapsed / self.half_life))[:, None]
+		self.times[rows] = timestamp
+
+	# returns an array with a row of the form features (form_names) of each player (account id) at a timestamp
+	# players that haven't played any matches have all features as 0
+	def get_form(self, players, timestamp):
+		rows = self._get_rows(players)
+		self._decay(rows, timestamp)
+		return get_form_features(self.totals[rows])
+
+	# adds a match that was played at a timestamp to the running totals of the players in it
+	# totals is the array from get_match_totals() of the match (a row for each player)
+	def update(self, players, timestamp, totals):
+		rows = self._get_rows(players)
+		self._decay(rows, timestamp)
+		self.totals[rows] += totals
+
+# returns an array of the form features (form_names) from an array of running totals (the last axis is the totals)
+def get_form_features(totals):
+	totals = np.asarray(totals, dtype=np.float64)
+	features = np.zeros((*totals.shape[:-1], len(form_names)))
+
+	# divides two arrays of totals, giving 0 where there's nothing to divide by
+	def ratio(numerators, denominators):
+		return np.divide(numerators, denominators, out=np.zeros_like(numerators), where=denominators > 0)
+
+	games = totals[..., total_index["games"]]
+	medic_games = totals[..., total_index["medic_games"]]
+	features[..., form_names.index("games")] = games
+	features[..., form_names.index("damage_per_minute")] = ratio(totals[..., total_index["damage"]],\
+		totals[..., total_index["minutes"]])
+	# deaths are at least as much as one game's worth so players who never die don't get an infinite ratio
+	features[..., form_names.index("kill_death_ratio")] = ratio(totals[..., total_index["kills"]],\
+		np.maximum(totals[..., total_index["deaths"]], np.minimum(games, 1)))
+	features[..., form_names.index("win_rate")] = ratio(totals[..., total_index["wins"]], games)
+	features[..., form_names.index("uber_rate")] = ratio(totals[..., total_index["ubers"]], medic_games)
+	features[..., form_names.index("drop_rate")] = ratio(totals[..., total_index["drops"]], medic_games)
+	return features
+
+# returns the form of every player in every match just before the match was played
+# players, timestamps, stats, and scores are the columns of the dataset (see log_dataset.py)
+# matches are gone through in order of when they were played, so a match's form only comes from matches that were
+# played before it (matches played at the same time don't see each other)
+# tracker is an optional PlayerFormTracker to continue from (a new one with half_life is made if it's None), which
+# has every match added to it afterwards
+# returns an array with a row for each match (in the same order as the columns), a row in that for each slot of the
+# lineup, and a column for each form feature (form_names)
+def get_player_form(players, timestamps, stats, scores, half_life=default_half_life, tracker=None):
+	players = np.asarray(players).reshape(-1, players_per_log)
+	timestamps = np.asarray(timestamps, dtype=np.int64).reshape(-1)
+	match_totals = get_match_totals(stats, scores)
+	if tracker is None:
+		tracker = PlayerFormTracker(half_life=half_life)
+
+	form = np.zeros((players.shape[0], players_per_log, len(form_names)))
+	order = np.argsort(timestamps, kind="stable")
+	start = 0
+	while start < order.size:
+		# every match played at the same time gets its form before any of them are added
+		end = start + 1
+		while end < order.size and timestamps[order[end]] == timestamps[order[start]]:
+			end += 1
+		for match in order[start:end]:
+			form[match] = tracker.get_form(players[match], timestamps[match])
+		for match in order[start:end]:
+			tracker.update(players[match], timestamps[match], match_totals[match])
+		start = end
+	return form
+
+# returns the FeatureScaler of the form features (form_scales), which is stored with the encoders
+def get_form_scaler():
+	return FeatureScaler([form_scales[name] for name in form_names])
+
+# returns the form of the players in each match as scalar inputs to the goblin
+# form is the array from get_player_form(), and scaler is the FeatureScaler it's scaled with (from get_form_scaler() if
+# it's None), so every match is scaled the same no matter what other matches there are
+# returns an array with a row for each match and a column for each form feature of each slot in the lineup
+def get_form_inputs(form, scaler=None):
+	scaler = get_form_scaler() if scaler is None else scaler
+	form = np.asarray(form, dtype=np.float64)
+	return scaler.scale(form).reshape(form.shape[0], players_per_log * len(form_names))
@@ -0,0 +1,358 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# player_ratings
+#
+# Module for rating each player (overall and on each class) from the results of the matches they played and predicting
+# matches from the ratings without a neural network
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for timing how long rating the dataset takes
+import time
+# used for the ratings of each player
+import numpy as np
+# used for the layout of the lineup
+from log_records import players_per_log
+from log_validator import class_slots, team_size, slot_classes
+# used for giving each player a row in the arrays
+from feature_encoders import CategoryEncoder, fit_encoder, unknown_code
+
+# rating every player starts at
+initial_rating = 1500
+# rating deviation every player starts at, which is also the most a deviation can be
+initial_deviation = 350
+# least a rating deviation can be, so ratings never stop moving
+min_deviation = 30
+# how much a rating deviation grows for each rating period a player doesn't play
+default_deviation_growth = 35
+# default number of seconds in a rating period (one day)
+default_rating_period = 24 * 60 * 60
+
+# scale of glicko ratings
+glicko_scale = np.log(10) / 400
+# column of each player's overall rating, which is followed by a column for their rating on each class
+overall_column = 0
+rating_column_count = 1 + len(class_slots)
+# column of the class rating of each slot in the lineup
+class_columns = np.array([1 + list(class_slots).index(slot_classes[slot % team_size])\
+	for slot in range(players_per_log)])
+# whether each slot in the lineup is on red
+red_slots = np.arange(players_per_log) < team_size
+
+# returns an array of how well red did in each match (1 for a win, 0.5 for a tie, and 0 for a loss)
+# scores is the array of [red score, blu score] of each match
+def get_match_results(scores):
+	scores = np.asarray(scores, dtype=np.float64).reshape(-1, 2)
+	return (np.sign(scores[:, 0] - scores[:, 1]) + 1) / 2
+
+# returns how much a rating deviation lowers the effect of a rating difference (g in glicko)
+def _get_deviation_weight(deviations):
+	return 1 / np.sqrt(1 + 3 * (glicko_scale * deviations) ** 2 / np.pi ** 2)
+
+# returns the chance of winning of a rating difference that's been weighted by _get_deviation_weight()
+# (the same as 1 / (1 + 10 ** (-difference / 400)), but exp is faster than raising 10 to a power)
+def _get_win_chance(differences):
+	return 1 / (1 + np.exp(-glicko_scale * differences))
+
+# returns an array of the chance that red wins each match from the ratings and rating deviations of each slot in the
+# lineup (arrays with a row for each match and a column for each slot)
+# each team is rated as the average rating of its players
+def get_expected_results(ratings, deviations):
+	ratings = np.asarray(ratings, dtype=np.float64).reshape(-1, players_per_log)
+	variances = np.asarray(deviations, dtype=np.float64).reshape(-1, players_per_log) ** 2
+	difference = ratings[:, red_slots].mean(axis=1) - ratings[:, ~red_slots].mean(axis=1)
+	deviation = np.sqrt(variances[:, red_slots].mean(axis=1) + variances[:, ~red_slots].mean(axis=1))
+	return _get_win_chance(_get_deviation_weight(deviation) * difference)
+
+# keeps a glicko rating and rating deviation of every player overall and on each class, in arrays with a row for each
+# player and a column for their overall rating and each class
+# each player's row is their code from player_encoder (the same CategoryEncoder the goblin's players are encoded with),
+# so the ratings, the model, and its encoders all share one index of players
+# players the encoder doesn't know get the unknown row, which is never rated, so they're always rated as new players
+# (update() gives them rows of their own after the encoder's with add_players(), so newcomers get rated as matches are
+# added one at a time, without changing the row of any player the encoder knows)
+# matches are rated in rating periods (every match in a period is rated from the ratings at the start of it), so a
+# whole period is rated with a few array operations no matter how many matches are in it, and adding a single match
+# only touches the 12 players in it
+# a player's rating deviation grows with each period they don't play, so the ratings of players who come back after a
+# break move faster
+class RatingTracker:
+	def __init__(self, player_encoder, period=default_rating_period, deviation_growth=default_deviation_growth):
+		if period <= 0:
+			raise ValueError("period parameter must be positive.")
+		# number of seconds in a rating period
+		self.period = period
+		self.deviation_growth = deviation_growth
+		self.player_encoder = player_encoder
+		# a row for each code of the encoder (including the unknown code)
+		capacity = len(player_encoder) + 1
+		self.ratings = np.full((capacity, rating_column_count), initial_rating, dtype=np.float64)
+		self.deviations = np.full((capacity, rating_column_count), initial_deviation, dtype=np.float64)
+		# rating period that each rating was last updated in (-1 if it never has been)
+		self.periods = np.full((capacity, rating_column_count), -1, dtype=np.int64)
+		# rating period that's being rated (matches can keep being added to it until a match from a later period is)
+		self.open_period = None
+		# totals of the matches of each rating in the open period (only the ones that were used get cleared)
+		self._information = np.zeros((capacity, rating_column_count))
+		self._surprise = np.zeros((capacity, rating_column_count))
+		# whether each rating has been rated in the open period, and its rating and deviation from the start of it
+		self._opened = np.zeros((capacity, rating_column_count), dtype=bool)
+		self._start_ratings = np.zeros((capacity, rating_column_count))
+		self._start_deviations = np.zeros((capacity, rating_column_count))
+
+	def __len__(self):
+		return len(self.player_encoder)
+
+	# returns the rows of an array of account ids (in the same shape)
+	def _get_rows(self, players):
+		return self.player_encoder.encode(players)
+
+	# gives every player (account id) in an array that the encoder doesn't know a row after the rows of the players it
+	# does know
+	def add_players(self, players):
+		players = np.asarray(players).reshape(-1)
+		new_players = list(dict.fromkeys(players[self._get_rows(players) == unknown_code].tolist()))
+		if len(new_players) == 0:
+			return
+		self.player_encoder = CategoryEncoder([*self.player_encoder.classes, *new_players], self.player_encoder.divisor)
+		shape = (len(new_players), rating_column_count)
+		self.ratings = np.concatenate((self.ratings, np.full(shape, initial_rating, dtype=np.float64)))
+		self.deviations = np.concatenate((self.deviations, np.full(shape, initial_deviation, dtype=np.float64)))
+		self.periods = np.concatenate((self.periods, np.full(shape, -1, dtype=np.int64)))
+		self._information = np.concatenate((self._information, np.zeros(shape)))
+		self._surprise = np.concatenate((self._surprise, np.zeros(shape)))
+		self._opened = np.concatenate((self._opened, np.zeros(shape, dtype=bool)))
+		self._start_ratings = np.concatenate((self._start_ratings, np.zeros(shape)))
+		self._start_deviations = np.concatenate((self._start_deviations, np.zeros(shape)))
+
+	# returns the rating period of a timestamp
+	def get_period(self, timestamp):
+		return np.asarray(timestamp, dtype=np.int64) // self.period
+
+	# returns the ratings and rating deviations at the start of a period of an array of indexes into the flat arrays
+	def _get_state(self, indexes, period):
+		last_periods = self.periods.reshape(-1)[indexes]
+		idle_periods = np.where(last_periods < 0, 0, np.maximum(period - last_periods, 0))
+		deviations = np.minimum(np.sqrt(self.deviations.reshape(-1)[indexes] ** 2 +\
+			self.deviation_growth ** 2 * idle_periods), initial_deviation)
+		ratings = self.ratings.reshape(-1)[indexes]
+		# ratings that were already rated in the open period are from where they started it
+		if period == self.open_period:
+			opened = self._opened.reshape(-1)[indexes]
+			ratings = np.where(opened, self._start_ratings.reshape(-1)[indexes], ratings)
+			deviations = np.where(opened, self._start_deviations.reshape(-1)[indexes], deviations)
+		return ratings, deviations
+
+	# starts rating a period, clearing the totals of the period that was being rated
+	def _open_period(self, period):
+		if self.open_period is not None and period < self.open_period:
+			raise ValueError("Matches must be rated in order of when they were played.")
+		if period == self.open_period:
+			return
+		opened = np.flatnonzero(self._opened)
+		self._information.reshape(-1)[opened] = 0
+		self._surprise.reshape(-1)[opened] = 0
+		self._opened.reshape(-1)[opened] = False
+		self.open_period = period
+
+	# returns the ratings and rating deviations of each slot of the lineups of rows of players at the start of a period
+	# each slot gets the average of the player's overall rating and their rating on the slot's class
+	def _get_lineup_state(self, rows, period):
+		overall_ratings, overall_deviations = self._get_state(rows * rating_column_count + overall_column, period)
+		class_ratings, class_deviations = self._get_state(rows * rating_column_count + class_columns, period)
+		return (overall_ratings + class_ratings) / 2, np.sqrt((overall_deviations ** 2 + class_deviations ** 2) / 2)
+
+	# rates every match of rows of players that was played in a period
+	# results is the array of how well red did in each match (from get_match_results())
+	# returns the ratings and rating deviations of each slot from before the matches were rated (the same as
+	# _get_lineup_state())
+	def _update_rows(self, rows, period, results):
+		rows = rows.reshape(-1, players_per_log)
+		self._open_period(period)
+		# how well each slot did
+		slot_results = np.where(red_slots, results[:, None], 1 - results[:, None])
+		states = []
+		for columns in [np.full(players_per_log, overall_column), class_columns]:
+			indexes = rows * rating_column_count + columns
+			ratings, deviations = self._get_state(indexes, period)
+			states.append((ratings, deviations))
+			# every player is rated against the average rating of the other team
+			team_ratings = np.column_stack((ratings[:, red_slots].mean(axis=1), ratings[:, ~red_slots].mean(axis=1)))
+			team_variances = np.column_stack(((deviations[:, red_slots] ** 2).mean(axis=1),\
+				(deviations[:, ~red_slots] ** 2).mean(axis=1)))
+			opponents = np.where(red_slots, 1, 0)
+			weights = _get_deviation_weight(np.sqrt(team_variances[:, opponents]))
+			expected = _get_win_chance(weights * (ratings - team_ratings[:, opponents]))
+
+			# keep where each rating started the period, so matches added later in it are rated from there too
+			flat_indexes = indexes.reshape(-1)
+			opened = self._opened.reshape(-1)
+			self._start_ratings.reshape(-1)[flat_indexes] = ratings.reshape(-1)
+			self._start_deviations.reshape(-1)[flat_indexes] = deviations.reshape(-1)
+			opened[flat_indexes] = True
+
+			# add up the results of every match of each player in the period
+			# players in more than one match get the same new rating written for each of them
+			information = self._information.reshape(-1)
+			surprise = self._surprise.reshape(-1)
+			# (np.add.at is only fast with flat arrays)
+			np.add.at(information, indexes.reshape(-1), ((glicko_scale * weights) ** 2 * expected *\
+				(1 - expected)).reshape(-1))
+			np.add.at(surprise, indexes.reshape(-1), (weights * (slot_results - expected)).reshape(-1))
+			variances = 1 / (1 / deviations ** 2 + information[indexes])
+			self.ratings.reshape(-1)[indexes] = ratings + glicko_scale * variances * surprise[indexes]
+			self.deviations.reshape(-1)[indexes] = np.maximum(np.sqrt(variances), min_deviation)
+			self.periods.reshape(-1)[indexes] = period
+		# players the encoder doesn't know don't share what they did with each other
+		self.ratings[unknown_code] = initial_rating
+		self.deviations[unknown_code] = initial_deviation
+		self.periods[unknown_code] = -1
+		self._information[unknown_code] = 0
+		self._surprise[unknown_code] = 0
+		self._opened[unknown_code] = False
+
+		(overall_ratings, overall_deviations), (class_ratings, class_deviations) = states
+		return (overall_ratings + class_ratings) / 2, np.sqrt((overall_deviations ** 2 + class_deviations ** 2) / 2)
+
+	# returns the ratings and rating deviations of each slot of lineups of players (account ids) at a timestamp
+	# players is an array with a row for each match (a single lineup can be passed as one row)
+	def get_ratings(self, players, timestamp):
+		rows = self._get_rows(np.asarray(players).reshape(-1, players_per_log))
+		return self._get_lineup_state(rows, self.get_period(timestamp))
+
+	# rates matches of lineups of players (account ids) that were played at a timestamp from their scores (an array of
+	# [red score, blu score] of each match)
+	# matches added in the same rating period are rated from the ratings at the start of the period (the same as if they
+	# had all been added at once), and players the encoder doesn't know are added to it
+	def update(self, players, timestamp, scores):
+		players = np.asarray(players).reshape(-1, players_per_log)
+		self.add_players(players)
+		rows = self._get_rows(players)
+		self._update_rows(rows, self.get_period(timestamp), get_match_results(scores))
+
+	# returns the chance that red wins each match of lineups of players (account ids) at a timestamp
+	def predict(self, players, timestamp):
+		return get_expected_results(*self.get_ratings(players, timestamp))
+
+	# stores the ratings in a .npz file so more matches can be rated later
+	# the players of the encoder are stored with them so the rows can be checked against the encoder they're read with
+	def store(self, path):
+		np.savez(path, period=self.period, deviation_growth=self.deviation_growth,\
+			players=np.asarray(self.player_encoder.classes, dtype=np.int64), ratings=self.ratings,\
+			deviations=self.deviations, periods=self.periods,\
+			open_period=-1 if self.open_period is None else self.open_period, information=self._information,\
+			surprise=self._surprise, opened=self._opened, start_ratings=self._start_ratings,\
+			start_deviations=self._start_deviations)
+
+# returns the RatingTracker stored in a .npz file by RatingTracker.store()
+# player_encoder is the CategoryEncoder the ratings were made with (like the one stored with the model), which must have
+# the same players in the same order as the start of the stored players (the players added to the tracker by update()
+# come after them), and one is made from the stored players if it's None
+def read_rating_tracker(path, player_encoder=None):
+	with np.load(path) as data:
+		players = data["players"].tolist()
+		if player_encoder is None:
+			player_encoder = CategoryEncoder(players)
+		elif list(player_encoder.classes) != players[:len(player_encoder)]:
+			raise ValueError(f"Ratings in {path} were made with a different player encoder.")
+		tracker = RatingTracker(player_encoder, period=int(data["period"]),\
+			deviation_growth=float(data["deviation_growth"]))
+		tracker.add_players(players[len(player_encoder):])
+		tracker.ratings[:] = data["ratings"]
+		tracker.deviations[:] = data["deviations"]
+		tracker.periods[:] = data["periods"]
+		# trackers stored before matches were kept open for the rest of their period start the next one from scratch
+		if "open_period" in data and int(data["open_period"]) >= 0:
+			tracker.open_period = int(data["open_period"])
+			tracker._information[:] = data["information"]
+			tracker._surprise[:] = data["surprise"]
+			tracker._opened[:] = data["opened"]
+			tracker._start_ratings[:] = data["start_ratings"]
+			tracker._start_deviations[:] = data["start_deviations"]
+	return tracker
+
+# returns the ratings and rating deviations of every player in every match just before the match was played
+# players, timestamps, and scores are the columns of the dataset (see log_dataset.py)
+# matches are rated one rating period at a time in order of when they were played, so a match's ratings only come from
+# matches that were played in earlier periods
+# tracker is an optional RatingTracker to continue from, which has every match rated in it afterwards
+# if tracker is None, a new one with period is made whose players are coded with player_encoder (fitted on every player
+# if it's None)
+# returns two arrays with a row for each match (in the same order as the columns) and a column for each slot
+def get_player_ratings(players, timestamps, scores, period=default_rating_period, tracker=None, player_encoder=None):
+	players = np.asarray(players).reshape(-1, players_per_log)
+	timestamps = np.asarray(timestamps, dtype=np.int64).reshape(-1)
+	results = get_match_results(scores)
+	if tracker is None:
+		tracker = RatingTracker(fit_encoder(players) if player_encoder is None else player_encoder, period=period)
+	rows = tracker._get_rows(players)
+
+	ratings = np.zeros(players.shape)
+	deviations = np.zeros(players.shape)
+	order = np.argsort(timestamps, kind="stable")
+	periods = tracker.get_period(timestamps[order])
+	# index in order where each rating period starts
+	starts = np.flatnonzero(np.diff(periods, prepend=periods[:1] - 1))
+	for start, end in zip(starts, [*starts[1:], order.size]):
+		matches = order[start:end]
+		ratings[matches], deviations[matches] = tracker._update_rows(rows[matches], periods[start], results[matches])
+	return ratings, deviations
+
+# returns the ratings of the players in each match as scalar inputs to the goblin
+# ratings is the array from get_player_ratings(), and each rating is turned into the chance that the player would beat
+# a player with the initial rating, so the inputs are between 0 and 1 and mean the same thing for every dataset
+def get_rating_inputs(ratings):
+	return 1 / (1 + 10 ** (-(np.asarray(ratings, dtype=np.float64) - initial_rating) / 400))
+
+# if this is being run as its own program to see how well the ratings predict matches
+if __name__ == "__main__":
+	import sys
+	from collect_log_data import read_log_dataset
+
+	period = default_rating_period
+
+	# loop through each argument
+	i = 1
+	while i < len(sys.argv):
+		# argument to change the length of a rating period
+		if sys.argv[i] == "-p" or sys.argv[i] == "--period":
+			i += 1
+			# make sure there is a follow up argument that is a positive number of days
+			if i >= len(sys.argv):
+				print(f"ERROR: {sys.argv[i-1]} requires a positive number after it.")
+				exit(2)
+			try:
+				period = int(float(sys.argv[i]) * default_rating_period)
+			except ValueError:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive number after it.")
+				exit(2)
+			if period < 1:
+				print(f"ERROR: {sys.argv[i-1]} requires a positive number after it.")
+				exit(2)
+		# if the argument isn't recognized
+		else:
+			print(f"ERROR: Argument {i} not recognized: {sys.argv[i]}")
+			exit(2)
+
+		i += 1
+
+	dataset = read_log_dataset()
+	start_time = time.time()
+	ratings, deviations = get_player_ratings(dataset["players"], dataset["timestamps"], dataset["scores"],\
+		period=period)
+	elapsed = time.time() - start_time
+
+	# see how often the team that was expected to win did (ties aren't counted)
+	expected = get_expected_results(ratings, deviations)
+	results = get_match_results(dataset["scores"])
+	decided = results != 0.5
+	accuracy = np.mean((expected[decided] > 0.5) == (results[decided] == 1)) * 100 if np.any(decided) else 0
+	print(f"Rated {results.size} matches in {elapsed:.2f} seconds")
+	print(f"Predicted the winner of {accuracy:.2f}% of {np.count_nonzero(decided)} matches that weren't ties")
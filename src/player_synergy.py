@@ -0,0 +1,287 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# player_synergy
+#
+# Module for counting how often each pair of players played together and against each other, and how often they won
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for the arrays of codes and features
+import numpy as np
+# used for the sparse player by player matrices
+from scipy import sparse
+# used for giving each player a row and column in the matrices and scaling the features into inputs
+from feature_encoders import fit_encoder, FeatureScaler
+# used for the layout of the lineup
+from log_records import players_per_log
+from log_validator import team_size
+# used for how well red did in each match
+from player_ratings import get_match_results
+
+# default number of seconds in each block of matches when working out the synergy of every match (thirteen weeks)
+# the pair table of every block before is rebuilt after each block, and longer blocks sort more pairs at once
+default_synergy_period = 13 * 7 * 24 * 60 * 60
+# names of the player by player matrices
+synergy_matrix_names = ["games_together", "wins_together", "games_against", "wins_against"]
+# features of each team's synergy, in the order they're returned
+synergy_names = ["win_rate_together", "games_together", "head_to_head_win_rate"]
+# value of each synergy feature that's scaled to 1 as an input (anything above it is clipped to 1)
+# games together are the average over every pair of teammates, and a team that has played a season or two together has
+# played about 50
+synergy_scales = {"win_rate_together": 1, "games_together": 50, "head_to_head_win_rate": 1}
+
+# totals of each match that the synergy features are worked out from (they can be added up across sets of matrices)
+total_names = ["red_games_together", "red_wins_together", "blu_games_together", "blu_wins_together", "games_against",\
+	"red_wins_against"]
+
+# returns a sparse matrix with a row for each match and a value in the column of each player on one team
+# codes is the array of the player codes of the team's slots, and values is the value of each match (1 if it's None)
+def _get_team_matrix(codes, size, values=None):
+	match_count = codes.shape[0]
+	data = np.ones(codes.size) if values is None else np.repeat(np.asarray(values, dtype=np.float64), codes.shape[1])
+	indptr = np.arange(match_count + 1, dtype=np.int64) * codes.shape[1]
+	return sparse.csr_matrix((data, codes.reshape(-1), indptr), shape=(match_count, size))
+
+# returns a dictionary of sparse player by player matrices (synergy_matrix_names) of the matches of an array of player
+# codes (a row for each match and a column for each slot) that results are the results of (from get_match_results())
+# size is the number of codes
+# games_together[a, b] is how many matches a and b played on the same team (the diagonal is how many matches each
+# player played), wins_together[a, b] is how many of those they won, games_against[a, b] is how many matches they played
+# on different teams, and wins_against[a, b] is how many of those a won (ties count as half a win)
+# every matrix is made from sparse products of the match by player matrices of each team, so it only takes time for
+# the pairs of players that actually played together
+def build_synergy_matrices(codes, results, size):
+	codes = np.asarray(codes).reshape(-1, players_per_log)
+	results = np.asarray(results, dtype=np.float64).reshape(-1)
+	red = _get_team_matrix(codes[:, :team_size], size)
+	blu = _get_team_matrix(codes[:, team_size:], size)
+	red_wins = _get_team_matrix(codes[:, :team_size], size, results)
+	blu_wins = _get_team_matrix(codes[:, team_size:], size, 1 - results)
+	return {
+		"games_together": (red.T @ red + blu.T @ blu).tocsr(),
+		"wins_together": (red.T @ red_wins + blu.T @ blu_wins).tocsr(),
+		"games_against": (red.T @ blu + blu.T @ red).tocsr(),
+		"wins_against": (red_wins.T @ blu + blu_wins.T @ red).tocsr()
+	}
+
+# returns the synergy matrices of the matches in the dataset that were played from since up to (but not including)
+# until (unix timestamps, where None means there's no limit), along with the CategoryEncoder the players are coded with
+# players, timestamps, and scores are the columns of the dataset (see log_dataset.py), and player_encoder is fitted on
+# every player if it's None (players the encoder doesn't know all share the unknown code)
+def get_synergy_matrices(players, timestamps, scores, since=None, until=None, player_encoder=None):
+	players = np.asarray(players).reshape(-1, players_per_log)
+	timestamps = np.asarray(timestamps, dtype=np.int64).reshape(-1)
+	if player_encoder is None:
+		player_encoder = fit_encoder(players)
+	in_slice = np.ones(timestamps.size, dtype=bool)
+	if since is not None:
+		in_slice &= timestamps >= since
+	if until is not None:
+		in_slice &= timestamps < until
+	return build_synergy_matrices(player_encoder.encode(players[in_slice]), get_match_results(scores)[in_slice],\
+		len(player_encoder) + 1), player_encoder
+
+# slots of every pair of teammates on red, then on blu
+teammate_pairs = np.array([(first + team * team_size, second + team * team_size) for team in range(2)\
+	for first in range(team_size) for second in range(first + 1, team_size)])
+# slots of every pair of a red player and a blu player
+opponent_pairs = np.array([(red, blu + team_size) for red in range(team_size) for blu in range(team_size)])
+
+# returns the keys of the pairs of players that each match's totals come from, with a row for each match of the
+# teammate pairs and then the opponent pairs
+# a pair's key is (first code * size + second code) * 2, plus 1 for opponents, so teammates and opponents are counted
+# separately (teammates have the lowest code first, since they're the same both ways, and opponents have red first)
+def _get_pair_keys(codes, size):
+	codes = np.asarray(codes, dtype=np.int64).reshape(-1, players_per_log)
+	first = codes[:, teammate_pairs[:, 0]]
+	second = codes[:, teammate_pairs[:, 1]]
+	return np.hstack(((np.minimum(first, second) * size + np.maximum(first, second)) * 2,\
+		(codes[:, opponent_pairs[:, 0]] * size + codes[:, opponent_pairs[:, 1]]) * 2 + 1))
+
+# returns a table of every pair of players in a dictionary of synergy matrices, as the sorted keys of the pairs (see
+# _get_pair_keys()), an array with a row of the games and wins of each pair, and size
+# every row of a CSR matrix is sorted, so the pairs of the matrices only need their sorted runs merged
+def get_pair_table(matrices):
+	size = matrices[synergy_matrix_names[0]].shape[0]
+	matrices = [matrices[name].tocoo() for name in synergy_matrix_names]
+	keys = np.concatenate([(matrix.row.astype(np.int64) * size + matrix.col) * 2 + (index >= 2)\
+		for index, matrix in enumerate(matrices)])
+	order = np.argsort(keys, kind="stable")
+	is_new = np.diff(keys[order], prepend=-1) != 0
+	inverse = np.empty(keys.size, dtype=np.int64)
+	inverse[order] = np.cumsum(is_new) - 1
+	values = np.zeros((np.count_nonzero(is_new), 2))
+	start = 0
+	for index, matrix in enumerate(matrices):
+		values[:, index % 2] += np.bincount(inverse[start:start + matrix.nnz], weights=matrix.data,\
+			minlength=values.shape[0])
+		start += matrix.nnz
+	return keys[order][is_new], values, size
+
+# returns the pair table of a smaller pair table added onto a pair table
+# pairs that are already in the table are added onto in place, and the rest are inserted where they go, so it only
+# takes one copy of the table
+def _merge_pair_tables(pair_table, added_table):
+	keys, values, size = pair_table
+	added_keys, added_values, _ = added_table
+	positions = np.searchsorted(keys, added_keys)
+	found = positions < keys.size
+	found[found] = keys[positions[found]] == added_keys[found]
+	values[positions[found]] += added_values[found]
+	return np.insert(keys, positions[~found], added_keys[~found]),\
+		np.insert(values, positions[~found], added_values[~found], axis=0), size
+
+# returns the position of each key in an array of sorted keys (like np.searchsorted()), where order is the order that
+# sorts the keys (they're sorted if it's None)
+# binary searches of sorted keys are much faster, since each search starts where the last one ended
+def _search_sorted(sorted_keys, keys, order=None):
+	if order is None:
+		order = np.argsort(keys)
+	positions = np.empty(keys.size, dtype=np.int64)
+	positions[order] = np.searchsorted(sorted_keys, keys[order])
+	return positions
+
+# returns an array with a row of the games and wins of each pair key, looked up in a pair table (pairs that aren't in
+# the table are zeros), where order is the order that sorts the keys (or None)
+def _lookup_pairs(pair_table, keys, order=None):
+	table_keys, values, _ = pair_table
+	if table_keys.size == 0:
+		return np.zeros((keys.size, 2))
+	positions = np.minimum(_search_sorted(table_keys, keys, order), table_keys.size - 1)
+	return values[positions] * (table_keys[positions] == keys)[:, None]
+
+# returns an array of the totals (total_names) of each match from arrays of the games and wins of each of the matches'
+# pairs (from _get_pair_keys()), with a row for each match and a column for each pair
+def _get_pair_value_totals(games, wins):
+	pairs_per_team = len(teammate_pairs) // 2
+	teammates = len(teammate_pairs)
+	totals = np.zeros((games.shape[0], len(total_names)))
+	for team, team_name in enumerate(["red", "blu"]):
+		team_pairs = slice(team * pairs_per_team, (team + 1) * pairs_per_team)
+		totals[:, total_names.index(f"{team_name}_games_together")] = games[:, team_pairs].sum(axis=1)
+		totals[:, total_names.index(f"{team_name}_wins_together")] = wins[:, team_pairs].sum(axis=1)
+	totals[:, total_names.index("games_against")] = games[:, teammates:].sum(axis=1)
+	totals[:, total_names.index("red_wins_against")] = wins[:, teammates:].sum(axis=1)
+	return totals
+
+# returns an array of the totals (total_names) of the pairs of players in matches of an array of player codes, looked
+# up in a pair table from get_pair_table()
+def get_pair_totals(pair_table, codes):
+	keys = _get_pair_keys(codes, pair_table[2])
+	values = _lookup_pairs(pair_table, keys.reshape(-1))
+	return _get_pair_value_totals(values[:, 0].reshape(keys.shape), values[:, 1].reshape(keys.shape))
+
+# returns the synergy features (synergy_names) of each team from an array of totals from get_pair_totals()
+# win rates of teams whose players never played together (or against each other) are 0.5
+# returns an array with a row for each match, a row in that for red and blu, and a column for each feature
+def get_totals_features(totals):
+	totals = np.asarray(totals, dtype=np.float64)
+	features = np.zeros((totals.shape[0], 2, len(synergy_names)))
+	pairs_per_team = team_size * (team_size - 1) / 2
+
+	# divides two arrays of totals, giving 0.5 where there's nothing to divide by
+	def rate(wins, games):
+		return np.divide(wins, games, out=np.full_like(wins, 0.5), where=games > 0)
+
+	games_against = totals[:, total_names.index("games_against")]
+	red_wins_against = totals[:, total_names.index("red_wins_against")]
+	for team, team_name in enumerate(["red", "blu"]):
+		games_together = totals[:, total_names.index(f"{team_name}_games_together")]
+		features[:, team, synergy_names.index("win_rate_together")] =\
+			rate(totals[:, total_names.index(f"{team_name}_wins_together")], games_together)
+		features[:, team, synergy_names.index("games_together")] = games_together / pairs_per_team
+	features[:, 0, synergy_names.index("head_to_head_win_rate")] = rate(red_wins_against, games_against)
+	features[:, 1, synergy_names.index("head_to_head_win_rate")] = rate(games_against - red_wins_against,\
+		games_against)
+	return features
+
+# returns the synergy features (synergy_names) of each team in matches of an array of player codes, looked up in a
+# dictionary of synergy matrices
+# returns an array with a row for each match, a row in that for red and blu, and a column for each feature
+def get_synergy_features(matrices, codes):
+	return get_totals_features(get_pair_totals(get_pair_table(matrices), codes))
+
+# returns the totals (total_names) that each of a block of matches got from the pair table of every block before it
+# and the matches in the block that were played before it
+# codes and results are the block's, and times are the index of each match's timestamp in the block's sorted timestamps
+# the pairs each match adds are sorted by key and then time with their wins summed up as they go, so the games and wins
+# a pair got before a time are the rows and wins up to that key and time minus the ones up to the start of that key
+def _get_block_totals(pair_table, codes, results, times):
+	size = pair_table[2]
+	codes = np.asarray(codes, dtype=np.int64).reshape(-1, players_per_log)
+	results = np.asarray(results, dtype=np.float64)[:, None]
+	keys = _get_pair_keys(codes, size)
+	teammates = len(teammate_pairs)
+	pairs_per_team = teammates // 2
+	time_count = times.max(initial=0) + 1
+
+	# what each match adds to its pairs (opponents are added from both sides)
+	added_keys = np.hstack((keys, (codes[:, opponent_pairs[:, 1]] * size + codes[:, opponent_pairs[:, 0]]) * 2 + 1))
+	added_wins = np.hstack((np.repeat(results, pairs_per_team, axis=1), np.repeat(1 - results, pairs_per_team,\
+		axis=1), np.repeat(results, len(opponent_pairs), axis=1), np.repeat(1 - results, len(opponent_pairs), axis=1)))
+	added_keys = (added_keys * time_count + times[:, None]).reshape(-1)
+	order = np.argsort(added_keys)
+	added_keys = added_keys[order]
+	# sum of the wins of the first i added pairs in row i
+	running_wins = np.concatenate(([0], np.cumsum(added_wins.reshape(-1)[order])))
+
+	lookup_keys = (keys * time_count).reshape(-1)
+	lookup_order = np.argsort(lookup_keys)
+	key_starts = _search_sorted(added_keys, lookup_keys, lookup_order)
+	time_starts = _search_sorted(added_keys, lookup_keys + np.repeat(times, keys.shape[1]), lookup_order)
+	# the lookup keys are in the same order as the keys since times only fill the space between keys
+	values = _lookup_pairs(pair_table, keys.reshape(-1), lookup_order)
+	games = values[:, 0] + time_starts - key_starts
+	wins = values[:, 1] + running_wins[time_starts] - running_wins[key_starts]
+	return _get_pair_value_totals(games.reshape(keys.shape), wins.reshape(keys.shape))
+
+# returns the synergy features of every match in the dataset from every match that was played before it (matches
+# played at the same time don't see each other)
+# players, timestamps, and scores are the columns of the dataset (see log_dataset.py)
+# matches are taken in blocks of period seconds, and each block looks up the pair table of every block before it and
+# then adds its own synergy matrices onto the table, so the table is only rebuilt once per block (matches in the same
+# block see each other through _get_block_totals(), so the period only changes how fast it is and not the features)
+# returns an array with a row for each match (in the same order as the columns), a row in that for red and blu, and a
+# column for each feature (synergy_names)
+def get_player_synergy(players, timestamps, scores, period=default_synergy_period, player_encoder=None):
+	players = np.asarray(players).reshape(-1, players_per_log)
+	timestamps = np.asarray(timestamps, dtype=np.int64).reshape(-1)
+	if player_encoder is None:
+		player_encoder = fit_encoder(players)
+	codes = player_encoder.encode(players)
+	results = get_match_results(scores)
+	size = len(player_encoder) + 1
+
+	totals = np.zeros((players.shape[0], len(total_names)))
+	pair_table = (np.zeros(0, dtype=np.int64), np.zeros((0, 2)), size)
+	order = np.argsort(timestamps, kind="stable")
+	blocks = timestamps[order] // period
+	# index in order where each block starts
+	starts = np.flatnonzero(np.diff(blocks, prepend=blocks[:1] - 1))
+	for start, end in zip(starts, [*starts[1:], order.size]):
+		matches = order[start:end]
+		times = np.unique(timestamps[matches], return_inverse=True)[1].reshape(-1)
+		totals[matches] = _get_block_totals(pair_table, codes[matches], results[matches], times)
+		pair_table = _merge_pair_tables(pair_table, get_pair_table(build_synergy_matrices(codes[matches],\
+			results[matches], size)))
+	return get_totals_features(totals)
+
+# returns the FeatureScaler of the synergy features (synergy_scales), which is stored with the encoders
+def get_synergy_scaler():
+	return FeatureScaler([synergy_scales[name] for name in synergy_names])
+
+# returns the synergy of the teams in each match as scalar inputs to the goblin
+# features is the array from get_player_synergy(), and scaler is the FeatureScaler it's scaled with (from
+# get_synergy_scaler() if it's None), so every match is scaled the same no matter what other matches there are
+# returns an array with a row for each match and a column for each feature of red and then blu
+def get_synergy_inputs(features, scaler=None):
+	scaler = get_synergy_scaler() if scaler is None else scaler
+	features = np.asarray(features, dtype=np.float64)
+	return scaler.scale(features).reshape(features.shape[0], 2 * len(synergy_names))
@@ -0,0 +1,222 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# stream_pipeline
+#
+# Module for collecting log data as a stream of generators so memory stays bounded and rows get stored as they're made
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for crawling, downloading, and storing logs
+from collect_log_data import data_path, default_fetch_workers, create_http_client, commid_to_steamid3, read_profiles,\
+	resolve_steam_ids, read_watermarks, crawl_log_ids, store_logs, read_log_ids, read_sid3s, read_checked_logs,\
+	read_log_vocabularies, fetch_raw_logs, encode_log_record, add_date_columns, store_log_data,\
+	print_rejection_counts
+# used for encoding the rows into the prepared data the same way prepare_log_data() does
+from collect_log_data import inputs_matrix_path, outputs_matrix_path, lineups_matrix_path, stats_matrix_path,\
+	encoders_path, prepare_log_data, encode_log_inputs, encode_log_outputs, get_cyclical_date_features,\
+	get_match_dates, append_matrices
+from feature_encoders import read_encoders
+from lineup_encoding import canonicalize_lineups, get_lineup_columns
+# used for building each chunk of rows
+from log_records import RecordBuilder, log_record_columns, new_vocabularies
+# used for checking that logs are valid and extracting data from them
+from log_validator import parse_log_records
+# used for counting rejected logs
+from collections import Counter
+# used for making sure files exist
+import os
+# used for putting data into arrays
+import numpy as np
+
+# default number of logs to store at a time
+default_chunk_size = 1000
+
+# yields each log id once, in the order they're first seen
+# found_logs is a set that every log id gets added to (so the caller can store them afterwards)
+# skip_logs is an optional set of log ids to not yield (logs that were already checked)
+def unique_log_ids(log_ids, found_logs, skip_logs=None):
+	for log_id in log_ids:
+		log_id = str(log_id)
+		if log_id in found_logs:
+			continue
+		found_logs.add(log_id)
+		if skip_logs is not None and log_id in skip_logs:
+			continue
+		yield log_id
+
+# turns the stream of (log id, record, rejection code) from parse_log_records() into a stream of
+# (log id, row, rejection code), where row is a dictionary of every column of log_record_columns
+# the row is None if the log was rejected or couldn't be downloaded
+# vocabularies is the dictionary of the Vocabulary of the gamemode and map codes of the dataset
+def encode_log_records(parsed_logs, vocabularies):
+	for log_id, record, rejection in parsed_logs:
+		if record is None:
+			yield log_id, None, rejection
+			continue
+		yield log_id, encode_log_record(log_id, record, vocabularies), None
+
+# stores the stream of (log id, row, rejection code) from encode_log_records() into the dataset in chunks of chunk_size
+# used logs
+# yields each chunk (a dictionary of arrays of each column, along with the date columns) along with the list of
+# (log id, rejection code) pairs of logs that were rejected in it, once it has been stored, so rows can be used before
+# the whole stream is finished
+# vocabularies is the dictionary of the Vocabulary that the rows were encoded with by encode_log_records()
+# if append is true, the rows get added to the end of the dataset
+def write_log_chunks(encoded_logs, vocabularies, chunk_size=default_chunk_size, append=False):
+	if type(chunk_size) is not int or chunk_size < 1:
+		raise ValueError("chunk_size parameter must be a positive integer.")
+
+	records = RecordBuilder(log_record_columns, capacity=chunk_size)
+	rejected_logs = []
+	# whether anything has been stored yet (the first chunk replaces the dataset unless appending)
+	stored = False
+
+	for log_id, row, rejection in encoded_logs:
+		# logs that couldn't be downloaded aren't stored since they might be valid next time
+		if rejection is not None:
+			rejected_logs.append((log_id, rejection))
+		elif row is not None:
+			records.append(**row)
+
+		if len(records) >= chunk_size:
+			chunk = add_date_columns(records.finalize())
+			store_log_data(chunk, vocabularies, rejected_logs, append=append or stored)
+			yield chunk, rejected_logs
+			stored = True
+			records.clear()
+			rejected_logs = []
+
+	# store the last partial chunk (or an empty dataset if nothing was stored)
+	if len(records) > 0 or len(rejected_logs) > 0 or not stored:
+		chunk = add_date_columns(records.finalize())
+		store_log_data(chunk, vocabularies, rejected_logs, append=append or stored)
+		yield chunk, rejected_logs
+
+# returns the prepared inputs, outputs, lineup columns, and stats of a chunk of rows from write_log_chunks()
+# encoders is the dictionary of encoders that the data was prepared with and vocabularies is the dictionary of the
+# Vocabulary of the gamemode and map codes in the chunk
+# the lineups are put in order and the inputs are laid out the same way as prepare_log_data() with cyclical_dates
+def encode_prepared_chunk(chunk, vocabularies, encoders, cyclical_dates=False):
+	players, stats = canonicalize_lineups(chunk["players"], chunk["stats"])
+	inputs = [encode_log_inputs(players, chunk["gamemodes"], chunk["maps"], chunk["dates"], chunk["weekdays"],\
+		vocabularies, encoders)]
+	if cyclical_dates:
+		inputs.append(get_cyclical_date_features(chunk["dates"], chunk["weekdays"],\
+			get_match_dates(chunk["timestamps"])["hours"]))
+	return np.hstack(inputs), encode_log_outputs(chunk["scores"]), get_lineup_columns(players, encoders["players"]),\
+		stats
+
+# returns the encoders that the prepared data was made with if the rows of a stream can be added onto it, or None if the
+# whole dataset needs to be prepared once the stream is finished
+# rows is the number of rows in the dataset, which the prepared data has to have too (it doesn't if a stream was stopped
+# between storing a chunk and adding it to the prepared data)
+# the prepared inputs also need to have the columns that encode_prepared_chunk() makes with cyclical_dates, so data
+# that was prepared with the form, ratings, or synergy of the players (which need every match before a row) isn't
+# added onto
+def read_prepared_encoders(rows, vocabularies, cyclical_dates=False):
+	paths = [inputs_matrix_path, outputs_matrix_path, lineups_matrix_path, stats_matrix_path, encoders_path]
+	if not all(os.path.isfile(path) for path in paths):
+		return None
+	encoders = read_encoders(encoders_path)
+	# encoders from before the years were scaled by a stored scale
+	if "years" not in encoders:
+		return None
+	matrices = [np.load(path, mmap_mode="r") for path in paths[:-1]]
+	if any(matrix.shape[0] != rows for matrix in matrices):
+		return None
+	empty_chunk = add_date_columns(RecordBuilder(log_record_columns).finalize())
+	inputs = encode_prepared_chunk(empty_chunk, vocabularies, encoders, cyclical_dates=cyclical_dates)[0]
+	if matrices[0].shape[1] != inputs.shape[1]:
+		return None
+	return encoders
+
+# crawls each player's logs, downloads them, checks them, stores them, and prepares them as one stream, so logs start
+# getting downloaded as soon as their ids are found and at most a chunk of rows is held in memory at a time
+# when adding onto data that was already prepared, each chunk is encoded with the encoders it was prepared with and
+# added onto the end of the prepared .npy files as soon as it's stored, otherwise the whole dataset is prepared once the
+# stream is finished so the encoders are fitted on every log
+# the arguments are the same as get_logs(), fetch_log_data(), and prepare_log_data()
+# chunk_size is how many used logs are stored at a time
+# returns the number of logs that were used and rejected
+def stream_log_data(pages, include_randos=True, verbose=True, max_workers=default_fetch_workers, rate_limit=None,\
+	use_cache=True, offline=False, incremental=False, since=None, backend="api", client=None, processes=None,\
+	chunk_size=default_chunk_size, cyclical_dates=False, player_form=False, player_ratings=False,\
+	player_synergy=False):
+	if verbose:
+		print("Streaming logs from list of players...")
+
+	# if pages isn't valid
+	if type(pages) is not int or pages < 1:
+		raise ValueError("Pages parameter must be a positive integer.")
+	if client is None:
+		client = create_http_client(rate_limit=rate_limit, pool_size=max_workers)
+
+	# when running offline, reuse the log ids and steamid3s from the last time logs were collected
+	if offline:
+		log_ids = read_log_ids()
+		sid3s = read_sid3s()
+	else:
+		profiles = read_profiles()
+		steam_ids = resolve_steam_ids(profiles, verbose=verbose)
+		sid3s = [commid_to_steamid3(steam_ids[profile]) for profile in profiles]
+		watermarks = read_watermarks()
+		log_ids = crawl_log_ids(profiles, steam_ids, pages, client, backend=backend, watermarks=watermarks,\
+			incremental=incremental, since=since, verbose=False)
+
+	# if there isn't already a folder for the data, create one
+	if not os.path.isdir(data_path):
+		os.mkdir(data_path)
+
+	# logs that were already checked by an earlier run, and the number of logs already in the dataset
+	checked_logs, used_log_count = read_checked_logs() if incremental else (None, 0)
+	vocabularies = new_vocabularies()
+	if incremental and used_log_count > 0:
+		vocabularies = read_log_vocabularies()
+	# encoders of the prepared data that each chunk gets added onto (the form, ratings, and synergy of the players
+	# need every match before a row, so they're always prepared once the stream is finished)
+	encoders = None
+	if incremental and used_log_count > 0 and not (player_form or player_ratings or player_synergy):
+		encoders = read_prepared_encoders(used_log_count, vocabularies, cyclical_dates=cyclical_dates)
+
+	# steamid3s that every player in a log has to be in (None lets any player be in a log)
+	valid_sid3s = None if include_randos else set(sid3s)
+	# every log id that was found while crawling
+	found_logs = set()
+
+	# log ids -> raw json -> validated records -> dataset rows -> stored chunks -> prepared rows
+	unique_ids = unique_log_ids(log_ids, found_logs, checked_logs)
+	raw_logs = fetch_raw_logs(unique_ids, client, max_workers=max_workers, use_cache=use_cache, offline=offline)
+	parsed_logs = parse_log_records(raw_logs, sid3s=valid_sid3s, processes=processes)
+	encoded_logs = encode_log_records(parsed_logs, vocabularies)
+
+	used_count = 0
+	rejection_counts = Counter()
+	for chunk, rejected_logs in write_log_chunks(encoded_logs, vocabularies, chunk_size=chunk_size, append=incremental):
+		if encoders is not None and chunk["used_logs"].size > 0:
+			append_matrices(*encode_prepared_chunk(chunk, vocabularies, encoders, cyclical_dates=cyclical_dates),\
+				used_log_count + used_count)
+		used_count += chunk["used_logs"].size
+		rejection_counts.update(rejection for _, rejection in rejected_logs)
+		if verbose:
+			print(f"\rFound {len(found_logs)} logs, stored {used_count} and rejected {rejection_counts.total()}...",\
+				end="")
+
+	if verbose:
+		print(f"\nUsed {used_count} logs and rejected {rejection_counts.total()} logs.")
+		print_rejection_counts(rejection_counts)
+	# store the log ids and steamid3s that were found while crawling
+	if not offline:
+		store_logs(list(found_logs), sid3s, watermarks, incremental=incremental, verbose=verbose)
+	# prepare the whole dataset if the chunks weren't added onto the prepared data as they were stored
+	if encoders is None and used_log_count + used_count > 0:
+		prepare_log_data(verbose=verbose, cyclical_dates=cyclical_dates, player_form=player_form,\
+			player_ratings=player_ratings, player_synergy=player_synergy)
+
+	return used_count, rejection_counts.total()
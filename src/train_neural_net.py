@@ -19,8 +19,19 @@ from sklearn.model_selection import train_test_split
 from tensorflow import keras
 # used for iterating through multiple lists at once
 import itertools
+# used for the predictions and targets when testing accuracy
+import numpy as np
 # used for making sure files and folders exist
 import os
+# used for only training when the prepared data or the training settings changed
+from pipeline import Stage, Pipeline, get_data_stages, hash_files
+# used for reading the prepared data and the encoders it was encoded with
+from collect_log_data import read_log_data, encoders_path, lineups_matrix_path, mirror_matrix_path
+# used for storing the encoders next to the model
+from feature_encoders import store_encoders, read_encoders
+# used for feeding the lineups in as sparse columns
+from lineup_encoding import get_lineup_width, read_columns, mirror_matches
+from log_records import players_per_log
 
 # path to where neural network data is stored
 nn_path = "../nn"
@@ -30,16 +41,35 @@ nn_file_ext = ".json"
 weight_file_ext = ".h5"
 # file extension for nn training and test accuracy saves
 acc_file_ext = ".acc"
+# default number of values each player in the lineup is embedded into when training on sparse lineups
+default_embedding_size = 16
+
+# returns the path to the encoders that are stored next to a model
+def get_encoders_path(score_file_name="goblin"):
+	return f"{nn_path}/{score_file_name}_encoders{nn_file_ext}"
 
 # creates neural network(s) for predicting tf2 matches, trains it, tests it (optional), then stores it in a json file
+# encoders is the dictionary of encoders the inputs were encoded with (see feature_encoders.py), which get stored next
+# to the neural network so matches can be encoded the same way when predicting
+# lineups is an optional array of the sparse lineup columns of each match (see lineup_encoding.py) that lineup_width is
+# the width of, which get fed in through an embedding instead of the player columns of inputs (inputs should only have
+# the rest of the columns)
+# looking up the embedding of each player's column and averaging them is the same as multiplying the multi-hot lineup
+# matrix by the embedding weights, but only uses the columns that are in each match, so memory and time grow with the
+# number of matches instead of the number of players
+# mirror_columns is an optional array of the input column that each input column comes from when red and blu are
+# swapped (see get_mirror_columns() in lineup_encoding.py), which adds a mirrored copy of each training match
+# (matches are mirrored after being split, so the mirror of a test match is never trained on)
 def train_goblin(inputs, score_targets, stat_targets=None, score_nodes=None, score_activations=None, score_loss = None,\
-	score_opt=None, score_epochs=20, score_file_name="goblin", test=True, verbose=True):
+	score_opt=None, score_epochs=20, score_file_name="goblin", test=True, verbose=True, encoders=None, lineups=None,\
+	lineup_width=None, embedding_size=default_embedding_size, mirror_columns=None):
 	if verbose:
 		print("Building the goblin...")
 	
 	# default number of hidden layers for the score predictor to 1 with the average of the input and target nodes
 	if score_nodes is None:
-		score_nodes = [int((2/3) * inputs.shape[1]) + score_targets.shape[1]]
+		input_size = inputs.shape[1] + (0 if lineups is None else embedding_size)
+		score_nodes = [int((2/3) * input_size) + score_targets.shape[1]]
 		#score_nodes = [int((inputs.shape[1] + score_targets.shape[1]) / 2)]
 	
 	# use relu on single hidden default layer
@@ -58,35 +88,65 @@ def train_goblin(inputs, score_targets, stat_targets=None, score_nodes=None, sco
 	if len(score_nodes) != len(score_activations):
 		raise ValueError("score_nodes and score_activations lists aren't the same length.")
 
+	if lineups is not None and lineup_width is None:
+		raise ValueError("lineup_width parameter is required with lineups.")
+
 	# split score data into train and test sets
-	score_train_inputs, score_test_inputs, score_train_targets, score_test_targets =\
-		train_test_split(inputs, score_targets, test_size=0.1)
+	if lineups is None:
+		score_train_inputs, score_test_inputs, score_train_targets, score_test_targets =\
+			train_test_split(inputs, score_targets, test_size=0.1)
+		if mirror_columns is not None:
+			score_train_inputs, score_train_targets, _ = mirror_matches(score_train_inputs, score_train_targets,\
+				mirror_columns)
+		train_shape = score_train_inputs.shape
+	else:
+		train_inputs, test_inputs, train_lineups, test_lineups, score_train_targets, score_test_targets =\
+			train_test_split(inputs, lineups, score_targets, test_size=0.1)
+		if mirror_columns is not None:
+			train_inputs, score_train_targets, train_lineups = mirror_matches(train_inputs, score_train_targets,\
+				mirror_columns, train_lineups, lineup_width)
+		train_shape = train_inputs.shape
+		# the lineups go into the first input of the goblin and the rest of the inputs go into the second
+		score_train_inputs = [train_lineups, train_inputs]
+		score_test_inputs = [test_lineups, test_inputs]
 	
 	if verbose:
-		print("Shape of train inputs:", score_train_inputs.shape)
+		print("Shape of train inputs:", train_shape)
 		print("Shape of train targets:", score_train_targets.shape)
-	
-	# create neural network for predicting scores of matches
-	score_goblin = keras.models.Sequential()
 
 	if verbose:
 		print("Adding input layer...")
 	
 	# give it an input layer
-	score_goblin.add(keras.layers.InputLayer(input_shape=(inputs.shape[1],)))
+	dense_inputs = keras.layers.Input(shape=(inputs.shape[1],), name="Input_Layer")
+	layer = dense_inputs
+	if lineups is not None:
+		if verbose:
+			print(f"Adding lineup embedding layer with {lineup_width} columns and {embedding_size} values...")
+
+		# embed each player's column and average them, which is the multi-hot lineup times the embedding weights
+		lineup_inputs = keras.layers.Input(shape=(players_per_log,), dtype="int32", name="Lineup_Layer")
+		embedded = keras.layers.Embedding(input_dim=lineup_width, output_dim=embedding_size,\
+			name="Lineup_Embedding")(lineup_inputs)
+		embedded = keras.layers.GlobalAveragePooling1D(name="Lineup_Pooling")(embedded)
+		layer = keras.layers.Concatenate(name="Lineup_Concatenate")([embedded, dense_inputs])
 
 	# give it hidden layers
 	for (nodes, activation, i) in zip(score_nodes, score_activations, range(1, len(score_nodes)+1)):
 		if verbose:
 			print(f"Adding dense hidden layer with {nodes} nodes and activation function {activation}...")
 		
-		score_goblin.add(keras.layers.Dense(units=nodes, activation=activation, name=f"Hidden_Layer_{i}"))
+		layer = keras.layers.Dense(units=nodes, activation=activation, name=f"Hidden_Layer_{i}")(layer)
 	
 	if verbose:
 		print("Adding output layer...")
 
 	# give it an output layer
-	score_goblin.add(keras.layers.Dense(units=score_targets.shape[1], activation="sigmoid", name="Output_Layer"))
+	outputs = keras.layers.Dense(units=score_targets.shape[1], activation="sigmoid", name="Output_Layer")(layer)
+
+	# create neural network for predicting scores of matches
+	score_goblin = keras.Model(inputs=dense_inputs if lineups is None else [lineup_inputs, dense_inputs],\
+		outputs=outputs)
 
 	if verbose:
 		print(f"Compiling the goblin...")
@@ -160,6 +220,13 @@ def train_goblin(inputs, score_targets, stat_targets=None, score_nodes=None, sco
 	# save weights to h5 file
 	score_goblin.save_weights(score_weights_path)
 
+	# save the encoders the inputs were encoded with
+	if encoders is not None:
+		encoders_file_path = get_encoders_path(score_file_name)
+		if verbose:
+			print(f"Storing goblin encoders into {encoders_file_path}...")
+		store_encoders(encoders, encoders_file_path)
+
 	# if the accuracy was tested, save that
 	if test:
 		score_acc_path = f"{nn_path}/{score_file_name}_acc{acc_file_ext}"
@@ -176,6 +243,45 @@ def train_goblin(inputs, score_targets, stat_targets=None, score_nodes=None, sco
 def load_goblin(load_stats=False, verbose=True):
 	pass
 
+# returns the dictionary of encoders stored next to a model by train_goblin()
+def load_goblin_encoders(score_file_name="goblin"):
+	return read_encoders(get_encoders_path(score_file_name))
+
+# returns the pipeline stage that trains the goblin from the prepared data (see pipeline.py)
+# score_nodes, score_activations, and learning_rate are the settings the goblin is trained with (learning_rate uses
+# SGD, None uses train_goblin()'s default optimizer) and are stored in the manifest so changing them retrains it
+# if sparse_lineups is true, the goblin is trained on the sparse lineup columns instead of the scalar player inputs
+# if mirror is true, a copy of each training match with red and blu swapped is trained on too
+def get_model_stage(score_file_name="goblin", score_epochs=20, score_nodes=None, score_activations=None,\
+	learning_rate=None, verbose=True, sparse_lineups=False, mirror=False):
+	score_paths = [f"{nn_path}/{score_file_name}{nn_file_ext}", f"{nn_path}/{score_file_name}_weights{weight_file_ext}",\
+		get_encoders_path(score_file_name)]
+
+	def build():
+		inputs, targets = read_log_data(verbose=verbose)
+		encoders = read_encoders(encoders_path)
+		lineups = None
+		lineup_width = None
+		mirror_columns = read_columns(mirror_matrix_path) if mirror else None
+		if sparse_lineups:
+			# the player columns come first in the inputs and get replaced by the lineups
+			inputs = inputs[:, players_per_log:]
+			lineups = read_columns(lineups_matrix_path)
+			lineup_width = get_lineup_width(encoders["players"])
+			if mirror:
+				# the player columns only come from each other when mirrored, so the rest just shift over
+				mirror_columns = mirror_columns[players_per_log:] - players_per_log
+		score_opt = None if learning_rate is None else keras.optimizers.SGD(learning_rate=learning_rate)
+		train_goblin(inputs, targets, score_nodes=score_nodes, score_activations=score_activations,\
+			score_opt=score_opt, score_epochs=score_epochs, score_file_name=score_file_name, verbose=verbose,\
+			encoders=encoders, lineups=lineups, lineup_width=lineup_width, mirror_columns=mirror_columns)
+
+	return Stage("model", lambda: hash_files(score_paths), build=build, depends=["prepared"],\
+		params={"name": score_file_name, "epochs": score_epochs, "nodes": score_nodes,\
+		"activations": score_activations, "learning_rate": learning_rate, "sparse_lineups": sparse_lineups,\
+		"mirror": mirror},\
+		code=[get_model_stage])
+
 # if this is being run as its own program to train the neural net(s)
 if __name__ == "__main__":
 	import sys
@@ -186,6 +292,9 @@ if __name__ == "__main__":
 	pages = 0
 	epochs = 20
 	score_nn_file_name = "goblin"
+	force = False
+	sparse_lineups = False
+	mirror = False
 
 	# loop through each argument
 	i = 1
@@ -234,6 +343,15 @@ if __name__ == "__main__":
 				exit(2)
 
 			score_nn_file_name = sys.argv[i]
+		# argument to train the goblin even if it was already trained on the same data with the same settings
+		elif sys.argv[i] == "-f" or sys.argv[i] == "--force":
+			force = True
+		# argument to feed the lineups in as sparse columns through an embedding instead of as scalar inputs
+		elif sys.argv[i] == "--sparse-lineups":
+			sparse_lineups = True
+		# argument to also train on a copy of each match with red and blu swapped
+		elif sys.argv[i] == "--mirror":
+			mirror = True
 		# if the argument isn't recognized
 		else:
 			print(f"ERROR: Argument {i} not recognized: {sys.argv[i]}")
@@ -243,23 +361,10 @@ if __name__ == "__main__":
 	
 	delimiter = "-" * 50
 
-	# if new data was requested with an argument
-	if new_data:
-
-		# get a fresh set of logs and data
-		log_ids, sid3s = get_logs(pages, verbose=verbose)
-		if verbose:
-			print(delimiter)
-		num_logs, used_logs, players, gamemodes, maps, dates, weekdays, scores, stats = fetch_log_data(\
-			log_ids, sid3s, verbose=verbose)
-		if verbose:
-			print(delimiter)
-		inputs, targets, stats = prepare_log_data(\
-			players=players, gamemodes=gamemodes, maps=maps, dates=dates, weekdays=weekdays, scores=scores, stats=stats,\
-			verbose=verbose)
-	# if new data was not requested, just fetch the current data from the data file
-	else:
-		inputs, targets = read_log_data(verbose=verbose)
+	# only the stages whose inputs changed get rebuilt (new data always crawls for a fresh set of log ids)
+	pipeline = Pipeline(get_data_stages(pages=pages if new_data else None, verbose=verbose))
+	pipeline.run("prepared", force=["log_ids"] if new_data else [], verbose=verbose)
+	inputs, targets = read_log_data(verbose=verbose)
 	
 	if verbose:
 		print(delimiter)
@@ -276,6 +381,8 @@ if __name__ == "__main__":
 	hidden_nodes = int((2/3) * inputs.shape[1]) + targets.shape[1]
 	hidden_nodes2 = int(hidden_nodes / 3)
 	hidden_nodes1 = hidden_nodes2 * 2
-	train_goblin(inputs, targets, score_epochs=epochs, score_nodes=[hidden_nodes1, hidden_nodes2],\
-		score_activations=["relu", "relu"], score_file_name=score_nn_file_name, verbose=verbose,\
-		score_opt=keras.optimizers.SGD(learning_rate=0.00001))
+	model_stage = get_model_stage(score_file_name=score_nn_file_name, score_epochs=epochs,\
+		score_nodes=[hidden_nodes1, hidden_nodes2], score_activations=["relu", "relu"], learning_rate=0.00001,\
+		verbose=verbose, sparse_lineups=sparse_lineups, mirror=mirror)
+	pipeline.add_stage(model_stage)
+	pipeline.run("model", force=["model"] if force else [], verbose=verbose)
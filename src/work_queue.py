@@ -0,0 +1,139 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# work_queue
+#
+# Module for sharing batches of logs between workers with an sqlite database of leases
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for storing the queue in a file that every worker can open
+import sqlite3
+# used for storing the log ids of each batch
+import json
+# used for checking when leases run out
+import time
+
+# states that a batch can be in
+pending_status = "pending"
+leased_status = "leased"
+done_status = "done"
+failed_status = "failed"
+
+# default seconds that a worker holds onto a batch before other workers can take it
+default_lease_time = 600
+# default number of times a batch can be claimed before it's marked as failed
+# (so one batch that keeps crashing workers doesn't get retried forever)
+default_max_claims = 5
+
+# queue of batches of log ids that workers claim for a limited amount of time (a lease)
+# if a worker dies, its lease runs out and the batch gets claimed by another worker, so no work is lost
+# every change happens in its own transaction, so any number of processes (or machines sharing a file system that
+# supports file locking) can use the same queue file
+class WorkQueue:
+	def __init__(self, path, timeout=60):
+		self.path = path
+		# isolation_level=None so transactions are only started when they're asked for
+		self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+		self.connection.execute("""CREATE TABLE IF NOT EXISTS batches (
+			id INTEGER PRIMARY KEY,
+			log_ids TEXT NOT NULL,
+			status TEXT NOT NULL,
+			worker TEXT,
+			lease_expires REAL,
+			claims INTEGER NOT NULL DEFAULT 0,
+			shard TEXT
+		)""")
+		self.connection.execute("CREATE INDEX IF NOT EXISTS batches_status ON batches (status, lease_expires)")
+		self.connection.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+	def close(self):
+		self.connection.close()
+
+	# removes every batch and setting and fills the queue with batches of batch_size log ids
+	# settings is a dictionary of values that every worker needs to agree on
+	def populate(self, log_ids, batch_size, settings=None):
+		if type(batch_size) is not int or batch_size < 1:
+			raise ValueError("batch_size parameter must be a positive integer.")
+		log_ids = [str(log_id) for log_id in log_ids]
+		batches = [(json.dumps(log_ids[start:start + batch_size]), pending_status)\
+			for start in range(0, len(log_ids), batch_size)]
+
+		self.connection.execute("BEGIN IMMEDIATE")
+		try:
+			self.connection.execute("DELETE FROM batches")
+			self.connection.execute("DELETE FROM settings")
+			self.connection.executemany("INSERT INTO batches (log_ids, status) VALUES (?, ?)", batches)
+			self.connection.executemany("INSERT INTO settings (key, value) VALUES (?, ?)",\
+				[(key, json.dumps(value)) for key, value in (settings or {}).items()])
+			self.connection.execute("COMMIT")
+		except:
+			self.connection.execute("ROLLBACK")
+			raise
+		return len(batches)
+
+	# returns a dictionary of the settings the queue was populated with
+	def settings(self):
+		return {key: json.loads(value) for key, value in self.connection.execute("SELECT key, value FROM settings")}
+
+	# claims the next batch that is pending or whose lease ran out
+	# returns the batch id and its list of log ids, or None if there's nothing left to claim
+	def claim(self, worker, lease_time=default_lease_time, max_claims=default_max_claims):
+		self.connection.execute("BEGIN IMMEDIATE")
+		try:
+			now = time.time()
+			# batches that were claimed too many times are given up on
+			self.connection.execute("UPDATE batches SET status = ?, worker = NULL, lease_expires = NULL "\
+				"WHERE status = ? AND lease_expires < ? AND claims >= ?", (failed_status, leased_status, now, max_claims))
+			row = self.connection.execute("SELECT id, log_ids FROM batches WHERE status = ? OR "\
+				"(status = ? AND lease_expires < ?) ORDER BY id LIMIT 1", (pending_status, leased_status, now)).fetchone()
+			if row is not None:
+				self.connection.execute("UPDATE batches SET status = ?, worker = ?, lease_expires = ?, claims = claims + 1 "\
+					"WHERE id = ?", (leased_status, worker, now + lease_time, row[0]))
+			self.connection.execute("COMMIT")
+		except:
+			self.connection.execute("ROLLBACK")
+			raise
+		if row is None:
+			return None
+		return row[0], json.loads(row[1])
+
+	# gives a worker more time to finish a batch
+	# returns false if the worker doesn't hold the lease anymore (it ran out and another worker claimed it)
+	def renew(self, batch_id, worker, lease_time=default_lease_time):
+		cursor = self.connection.execute("UPDATE batches SET lease_expires = ? WHERE id = ? AND status = ? AND worker = ?",\
+			(time.time() + lease_time, batch_id, leased_status, worker))
+		return cursor.rowcount == 1
+
+	# marks a batch as done and records the path of the shard its results were stored in
+	# returns false if the worker doesn't hold the lease anymore
+	def complete(self, batch_id, worker, shard):
+		cursor = self.connection.execute("UPDATE batches SET status = ?, shard = ?, lease_expires = NULL "\
+			"WHERE id = ? AND status = ? AND worker = ?", (done_status, shard, batch_id, leased_status, worker))
+		return cursor.rowcount == 1
+
+	# returns a dictionary of how many batches are in each state
+	# batches whose lease ran out are counted as pending since they'll be claimed again
+	def progress(self):
+		counts = dict.fromkeys([pending_status, leased_status, done_status, failed_status], 0)
+		rows = self.connection.execute("SELECT CASE WHEN status = ? AND lease_expires < ? THEN ? ELSE status END, COUNT(*) "\
+			"FROM batches GROUP BY 1", (leased_status, time.time(), pending_status))
+		for status, count in rows:
+			counts[status] += count
+		return counts
+
+	# returns a list of (batch id, shard path) of every batch that's done, in order
+	def done_batches(self):
+		return self.connection.execute("SELECT id, shard FROM batches WHERE status = ? ORDER BY id",\
+			(done_status,)).fetchall()
+
+	# returns a list of (batch id, list of log ids) of every batch that failed, in order
+	def failed_batches(self):
+		return [(batch_id, json.loads(log_ids)) for batch_id, log_ids in self.connection.execute(\
+			"SELECT id, log_ids FROM batches WHERE status = ? ORDER BY id", (failed_status,))]
@@ -0,0 +1,60 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# test_feature_encoders
+#
+# Tests for encoding values into codes and scalar values
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for running the tests (python -m unittest discover tests)
+import unittest
+# used for a temporary encoders file
+import tempfile
+# used for importing the modules in src
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+from feature_encoders import CategoryEncoder, FeatureScaler, fit_encoder, store_encoders, read_encoders, unknown_code
+
+class CategoryEncoderTest(unittest.TestCase):
+	def setUp(self):
+		self.encoder = fit_encoder(np.array([[30, 10], [20, 10]]), extra_values=[40])
+
+	def test_codes(self):
+		# values are coded in sorted order starting at 1, with the extra values after them
+		self.assertEqual(self.encoder.classes, [10, 20, 30, 40])
+		self.assertTrue(np.array_equal(self.encoder.encode(np.array([[10, 40], [30, 20]])), [[1, 4], [3, 2]]))
+		self.assertTrue(np.array_equal(self.encoder.scale([10, 40]), [0.25, 1]))
+
+	def test_unknown_values(self):
+		codes = self.encoder.encode(np.array([[10, 50], [60, 20]]))
+		self.assertTrue(np.array_equal(codes, [[1, unknown_code], [unknown_code, 2]]))
+		self.assertTrue(np.all(self.encoder.scale([50, 60]) == 0))
+		self.assertEqual(list(self.encoder.decode(codes[0])), [10, None])
+
+	def test_empty_encoder(self):
+		codes = CategoryEncoder().encode(np.array([[1, 2, 3]]))
+		self.assertEqual(codes.shape, (1, 3))
+		self.assertTrue(np.all(codes == unknown_code))
+
+	def test_store_and_read(self):
+		encoders = {"players": self.encoder, "form": FeatureScaler([2, 4])}
+		with tempfile.TemporaryDirectory() as directory:
+			path = f"{directory}/encoders.json"
+			store_encoders(encoders, path)
+			read = read_encoders(path)
+		self.assertTrue(np.array_equal(read["players"].encode([40, 10, 50]), [4, 1, unknown_code]))
+		self.assertTrue(np.array_equal(read["form"].scale([[1, 8]]), [[0.5, 1]]))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,101 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# test_fetch_checkpoint
+#
+# Tests for saving the progress of collecting logs and resuming it
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for running the tests (python -m unittest discover tests)
+import unittest
+# used for a temporary checkpoint folder
+import tempfile
+# used for importing the modules in src
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+from fetch_checkpoint import FetchCheckpoint
+from log_records import RecordBuilder, new_vocabularies, players_per_log, stats_per_log
+
+# adds a row for a log to records, with a map coded by vocabularies
+def add_row(records, vocabularies, log_id, map_name):
+	records.append(used_logs=str(log_id), players=np.full(players_per_log, log_id),\
+		gamemodes=vocabularies["gamemodes"].code("cp"), maps=vocabularies["maps"].code(map_name), timestamps=log_id,\
+		scores=[log_id % 6, 0], stats=np.full(stats_per_log, log_id))
+
+class FetchCheckpointTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.path = f"{self.directory.name}/checkpoint"
+		self.log_ids = [str(log_id) for log_id in range(10, 20)]
+		self.parameters = {"include_randos": False}
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def test_resume(self):
+		checkpoint = FetchCheckpoint(self.path, self.log_ids, self.parameters)
+		records = RecordBuilder(capacity=2)
+		rejected_logs = []
+		vocabularies = new_vocabularies()
+		# two saves, so the rows are split across part files
+		add_row(records, vocabularies, 10, "cp_process")
+		rejected_logs.append(("11", "bad_score"))
+		checkpoint.save(2, records, rejected_logs, vocabularies)
+		add_row(records, vocabularies, 12, "cp_gullywash")
+		add_row(records, vocabularies, 13, "cp_process")
+		checkpoint.save(4, records, rejected_logs, vocabularies)
+		# rows after the last save are lost when a run is interrupted
+		add_row(records, vocabularies, 14, "koth_product")
+
+		resumed_records = RecordBuilder()
+		resumed_rejections = []
+		resumed_vocabularies = new_vocabularies()
+		cursor = FetchCheckpoint(self.path, self.log_ids, self.parameters).load(resumed_records, resumed_rejections,\
+			resumed_vocabularies)
+		self.assertEqual(cursor, 4)
+		self.assertEqual(resumed_rejections, [("11", "bad_score")])
+		self.assertEqual(list(resumed_vocabularies["maps"].values), ["cp_process", "cp_gullywash"])
+		saved = records.finalize()
+		resumed = resumed_records.finalize()
+		for name in saved:
+			self.assertTrue(np.array_equal(resumed[name], saved[name][:3]), name)
+
+	def test_nothing_to_resume(self):
+		checkpoint = FetchCheckpoint(self.path, self.log_ids, self.parameters)
+		self.assertEqual(checkpoint.load(RecordBuilder(), [], new_vocabularies()), 0)
+
+	def test_different_run(self):
+		records = RecordBuilder()
+		vocabularies = new_vocabularies()
+		add_row(records, vocabularies, 10, "cp_process")
+		FetchCheckpoint(self.path, self.log_ids, self.parameters).save(1, records, [], vocabularies)
+		# a checkpoint is never resumed for different logs or settings
+		with self.assertRaises(ValueError):
+			FetchCheckpoint(self.path, self.log_ids[:-1], self.parameters).load(RecordBuilder(), [], new_vocabularies())
+		with self.assertRaises(ValueError):
+			FetchCheckpoint(self.path, self.log_ids, {"include_randos": True}).load(RecordBuilder(), [],\
+				new_vocabularies())
+
+	def test_clear(self):
+		records = RecordBuilder()
+		vocabularies = new_vocabularies()
+		add_row(records, vocabularies, 10, "cp_process")
+		checkpoint = FetchCheckpoint(self.path, self.log_ids, self.parameters)
+		checkpoint.save(1, records, [], vocabularies)
+		checkpoint.clear()
+		self.assertFalse(os.path.exists(self.path))
+		self.assertEqual(checkpoint.load(RecordBuilder(), [], new_vocabularies()), 0)
+
+if __name__ == "__main__":
+	unittest.main()
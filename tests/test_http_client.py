@@ -0,0 +1,122 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# test_http_client
+#
+# Tests for the pooled http client against a local stand-in http server
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for running the tests (python -m unittest discover tests)
+import unittest
+# used for the local stand-in server
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+# used for importing the modules in src
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from http_client import HttpClient, HttpError, max_redirects
+
+# handler of the stand-in server, which answers each path the way logs.tf could
+# /ok always works, /flaky fails with 503 and a retry-after header until it has been asked flaky_failures times,
+# /redirect redirects to /ok, /loop redirects to itself, and every other path is missing
+class StandInHandler(BaseHTTPRequestHandler):
+	# http/1.1 so connections are kept alive between requests
+	protocol_version = "HTTP/1.1"
+
+	def do_GET(self):
+		server = self.server
+		with server.lock:
+			server.requests[self.path] = server.requests.get(self.path, 0) + 1
+			count = server.requests[self.path]
+		if self.path == "/ok":
+			self._respond(200, b"ok")
+		elif self.path == "/flaky":
+			if count <= server.flaky_failures:
+				self._respond(503, b"", {"Retry-After": "0"})
+			else:
+				self._respond(200, b"recovered")
+		elif self.path == "/redirect":
+			self._respond(302, b"", {"Location": "/ok"})
+		elif self.path == "/loop":
+			self._respond(302, b"", {"Location": "/loop"})
+		else:
+			self._respond(404, b"")
+
+	def _respond(self, status, body, headers=None):
+		self.send_response(status)
+		for name, value in (headers or {}).items():
+			self.send_header(name, value)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	# keeps the test output clean
+	def log_message(self, format, *args):
+		pass
+
+class HttpClientTest(unittest.TestCase):
+	def setUp(self):
+		self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+		self.server.lock = threading.Lock()
+		self.server.requests = {}
+		self.server.flaky_failures = 2
+		self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+		self.thread.start()
+		self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+		self.client = HttpClient(max_attempts=3, timeout=5, backoff_base=0)
+
+	def tearDown(self):
+		self.client.close()
+		self.server.shutdown()
+		self.server.server_close()
+
+	def test_reuses_connection(self):
+		for _ in range(3):
+			self.assertEqual(self.client.get(f"{self.url}/ok").read(), b"ok")
+		self.assertEqual(self.client.stats()["connections"], 1)
+
+	def test_retries_after_retry_after(self):
+		response = self.client.get(f"{self.url}/flaky")
+		self.assertEqual(response.read(), b"recovered")
+		self.assertEqual(self.server.requests["/flaky"], 3)
+		self.assertEqual(self.client.stats()["retries"], 2)
+
+	def test_gives_up_after_max_attempts(self):
+		self.server.flaky_failures = 10
+		with self.assertRaises(HttpError) as context:
+			self.client.get(f"{self.url}/flaky")
+		self.assertEqual(context.exception.status, 503)
+		self.assertEqual(self.server.requests["/flaky"], 3)
+		self.assertEqual(self.client.stats()["failures"], 1)
+
+	def test_follows_redirect(self):
+		response = self.client.get(f"{self.url}/redirect")
+		self.assertEqual(response.read(), b"ok")
+		self.assertEqual(response.url, f"{self.url}/ok")
+
+	def test_redirect_loop_fails(self):
+		with self.assertRaises(HttpError) as context:
+			self.client.get(f"{self.url}/loop")
+		self.assertEqual(context.exception.status, 302)
+		# a redirect loop isn't retried
+		self.assertEqual(self.server.requests["/loop"], max_redirects + 1)
+		self.assertEqual(self.client.stats()["failures"], 1)
+
+	def test_missing_is_not_retried(self):
+		with self.assertRaises(HttpError) as context:
+			self.client.get(f"{self.url}/missing")
+		self.assertEqual(context.exception.status, 404)
+		self.assertEqual(self.server.requests["/missing"], 1)
+
+if __name__ == "__main__":
+	unittest.main()
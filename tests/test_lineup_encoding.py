@@ -0,0 +1,133 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# test_lineup_encoding
+#
+# Tests for putting lineups in a canonical order and mirroring matches by swapping red and blu
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for running the tests (python -m unittest discover tests)
+import unittest
+# used for importing the modules in src
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+from feature_encoders import fit_encoder
+from log_records import players_per_log, stats_per_log
+from log_validator import stat_offsets
+from lineup_encoding import canonicalize_lineups, get_mirror_columns, mirror_lineup_columns, mirror_matches,\
+	get_lineup_columns, get_lineup_width, slot_blocks, slot_stat_counts, team_swap
+
+# returns random lineups of matches from a pool of players, and stats rows where every stat of a player is their
+# account id (so it can be told which player the stats belong to)
+def get_matches(matches, seed):
+	rng = np.random.default_rng(seed)
+	players = np.array([rng.choice(np.arange(100, 200), players_per_log, replace=False) for _ in range(matches)])
+	stats = np.zeros((matches, stats_per_log), dtype=np.int64)
+	stats[:, 0] = rng.integers(600, 2400, matches)
+	for slot in range(players_per_log):
+		stats[:, stat_offsets[slot]:stat_offsets[slot] + slot_stat_counts[slot]] = players[:, slot:slot + 1]
+	return players, stats
+
+# returns the players and stats of each match with the players of each team and class block shuffled
+def shuffle_blocks(players, stats, seed):
+	rng = np.random.default_rng(seed)
+	players = players.copy()
+	stats = stats.copy()
+	for match in range(players.shape[0]):
+		order = np.arange(players_per_log)
+		for block in np.unique(slot_blocks):
+			slots = np.flatnonzero(slot_blocks == block)
+			order[slots] = rng.permutation(slots)
+		for slot in range(players_per_log):
+			stats[match, stat_offsets[slot]:stat_offsets[slot] + slot_stat_counts[slot]] = players[match, order[slot]]
+		players[match] = players[match, order]
+	return players, stats
+
+class CanonicalizeTest(unittest.TestCase):
+	def setUp(self):
+		self.players, self.stats = get_matches(50, 0)
+		self.canonical_players, self.canonical_stats = canonicalize_lineups(self.players, self.stats)
+
+	def test_blocks_are_sorted(self):
+		for block in np.unique(slot_blocks):
+			block_players = self.canonical_players[:, slot_blocks == block]
+			self.assertTrue(np.array_equal(block_players, np.sort(block_players, axis=1)))
+			# players only move within their team and class
+			self.assertTrue(np.array_equal(np.sort(block_players, axis=1),\
+				np.sort(self.players[:, slot_blocks == block], axis=1)))
+
+	def test_stats_follow_players(self):
+		self.assertTrue(np.array_equal(self.canonical_stats[:, 0], self.stats[:, 0]))
+		for slot in range(players_per_log):
+			slot_stats = self.canonical_stats[:, stat_offsets[slot]:stat_offsets[slot] + slot_stat_counts[slot]]
+			self.assertTrue(np.all(slot_stats == self.canonical_players[:, slot:slot + 1]))
+
+	def test_same_lineup_same_order(self):
+		players, stats = canonicalize_lineups(*shuffle_blocks(self.players, self.stats, 1))
+		self.assertTrue(np.array_equal(players, self.canonical_players))
+		self.assertTrue(np.array_equal(stats, self.canonical_stats))
+
+class MirrorTest(unittest.TestCase):
+	def setUp(self):
+		self.players, _ = canonicalize_lineups(*get_matches(20, 2))
+		self.encoder = fit_encoder(self.players)
+
+	def test_mirror_columns(self):
+		# a map column, a column for each slot, two columns for each team, and a column for each slot again
+		inputs = np.column_stack((np.full(len(self.players), -1), self.players, self.players[:, :1] * 10,\
+			self.players[:, 1:2] * 10, self.players[:, 2:3] * 10, self.players[:, 3:4] * 10, self.players + 1000))
+		columns = get_mirror_columns(inputs.shape[1], [(1, 1), (1 + players_per_log + 4, 1)],\
+			[(1 + players_per_log, 2)])
+		mirrored = inputs[:, columns]
+		self.assertTrue(np.array_equal(mirrored[:, 0], inputs[:, 0]))
+		self.assertTrue(np.array_equal(mirrored[:, 1:1 + players_per_log], self.players[:, team_swap]))
+		team_start = 1 + players_per_log
+		self.assertTrue(np.array_equal(mirrored[:, team_start:team_start + 4],\
+			inputs[:, [team_start + 2, team_start + 3, team_start, team_start + 1]]))
+		self.assertTrue(np.array_equal(mirrored[:, team_start + 4:], self.players[:, team_swap] + 1000))
+		# mirroring twice puts every column back
+		self.assertTrue(np.array_equal(columns[columns], np.arange(inputs.shape[1])))
+
+	def test_mirror_lineup_columns(self):
+		width = get_lineup_width(self.encoder)
+		lineups = get_lineup_columns(self.players, self.encoder)
+		mirrored = mirror_lineup_columns(lineups, width)
+		# the same as the lineup columns of the lineup with the teams swapped
+		self.assertTrue(np.array_equal(mirrored, get_lineup_columns(self.players[:, team_swap], self.encoder)))
+		self.assertEqual(mirrored.dtype, lineups.dtype)
+		self.assertTrue(np.array_equal(mirror_lineup_columns(mirrored, width), lineups))
+
+	def test_mirror_matches(self):
+		inputs = self.players.astype(np.float64)
+		targets = np.zeros((len(self.players), 12))
+		targets[:, 3] = 1
+		targets[:, 6 + 1] = 1
+		width = get_lineup_width(self.encoder)
+		lineups = get_lineup_columns(self.players, self.encoder)
+		columns = get_mirror_columns(players_per_log, [(0, 1)])
+		mirrored_inputs, mirrored_targets, mirrored_lineups = mirror_matches(inputs, targets, columns, lineups, width)
+		count = len(self.players)
+		self.assertTrue(np.array_equal(mirrored_inputs[:count], inputs))
+		self.assertTrue(np.array_equal(mirrored_inputs[count:], inputs[:, team_swap]))
+		# red's score of the mirrored match is blu's score of the match
+		self.assertTrue(np.all(mirrored_targets[count:, 1] == 1) and np.all(mirrored_targets[count:, 6 + 3] == 1))
+		self.assertEqual(mirrored_targets[count:].sum(), 2 * count)
+		self.assertTrue(np.array_equal(mirrored_lineups[count:], mirror_lineup_columns(lineups, width)))
+		self.assertIsNone(mirror_matches(inputs, targets, columns)[2])
+		# the players of the same class on each team stay in order when the teams are swapped
+		self.assertTrue(np.array_equal(canonicalize_lineups(inputs[:, team_swap], np.zeros((count, stats_per_log)))[0],\
+			inputs[:, team_swap]))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,114 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# test_log_dataset
+#
+# Tests for storing, appending to, and reading the columnar dataset
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for running the tests (python -m unittest discover tests)
+import unittest
+# used for a temporary dataset folder
+import tempfile
+# used for importing the modules in src
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+from log_dataset import store_dataset, load_dataset, find_rows, read_schema, get_dataset_files, append_npy,\
+	log_dataset_columns
+from log_records import new_vocabularies
+
+# returns a dictionary of random columns of a dataset with rows rows, whose log ids start at first_log
+# maps are named from map_names, so appends can bring new map names with them
+def get_rows(rows, first_log, map_names, seed):
+	rng = np.random.default_rng(seed)
+	vocabularies = new_vocabularies({"gamemodes": ["sixes"], "maps": map_names})
+	arrays = {name: rng.integers(0, 100, (rows, width)) for name, (_, width) in log_dataset_columns.items()}
+	# log ids out of order, so the log order has to be merged
+	arrays["used_logs"] = rng.permutation(np.arange(first_log, first_log + rows))
+	arrays["gamemodes"] = np.zeros(rows, dtype=np.int64)
+	arrays["maps"] = rng.integers(0, len(map_names), rows)
+	return arrays, vocabularies
+
+class LogDatasetTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.path = f"{self.directory.name}/dataset"
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	# checks that the dataset has the rows of each part in order, with map names instead of codes
+	def check_dataset(self, parts):
+		dataset = load_dataset(self.path, mmap=False)
+		schema = read_schema(self.path)
+		maps = np.array(schema["vocabularies"]["maps"])
+		self.assertEqual(schema["rows"], sum(len(arrays["used_logs"]) for arrays, _ in parts))
+		for name in ["used_logs", "players", "stats", "timestamps"]:
+			expected = np.concatenate([np.asarray(arrays[name]).reshape(len(arrays["used_logs"]), -1) for arrays, _ in\
+				parts])
+			self.assertTrue(np.array_equal(dataset[name].reshape(schema["rows"], -1), expected))
+		expected_maps = np.concatenate([np.array(vocabularies["maps"].values)[arrays["maps"]] for arrays, vocabularies\
+			in parts])
+		self.assertTrue(np.array_equal(maps[dataset["maps"]], expected_maps))
+		used_logs = np.concatenate([arrays["used_logs"] for arrays, _ in parts])
+		self.assertTrue(np.array_equal(find_rows(dataset, used_logs), np.arange(used_logs.size)))
+
+	def test_append_writes_only_new_rows(self):
+		parts = [get_rows(50, 1000, ["cp_process", "koth_product"], 0)]
+		store_dataset(self.path, *parts[0])
+		generation = read_schema(self.path)["generation"]
+		files = get_dataset_files(self.path)
+		inodes = {path: os.stat(path).st_ino for path in files}
+		for seed, (first_log, map_names) in enumerate([(500, ["cp_gullywash", "cp_process"]), (2000, ["cp_sunshine"])]):
+			parts.append(get_rows(20, first_log, map_names, seed + 1))
+			store_dataset(self.path, *parts[-1], append=True)
+			self.check_dataset(parts)
+		# the same column files grew instead of being rewritten into a new generation
+		self.assertEqual(read_schema(self.path)["generation"], generation)
+		self.assertEqual({path: os.stat(path).st_ino for path in get_dataset_files(self.path)}, inodes)
+		# only the files of the current log order and columns are left
+		self.assertEqual(len(os.listdir(self.path)), len(files) + 2)
+
+	def test_unfinished_append_is_ignored(self):
+		parts = [get_rows(30, 0, ["cp_process"], 0)]
+		store_dataset(self.path, *parts[0])
+		# an append that crashed after growing a column but before the schema was replaced
+		append_npy(get_dataset_files(self.path)[0], np.zeros((7, 1)), 30)
+		self.check_dataset(parts)
+		parts.append(get_rows(10, 100, ["cp_process"], 1))
+		store_dataset(self.path, *parts[-1], append=True)
+		self.check_dataset(parts)
+
+	def test_append_without_room_rewrites(self):
+		parts = [get_rows(95, 0, ["cp_process"], 0)]
+		store_dataset(self.path, *parts[0])
+		# a column file whose header has no room for a longer number of rows (like ones stored by older versions of
+		# numpy)
+		path = get_dataset_files(self.path)[0]
+		array = np.load(path)
+		with open(path, "wb") as npy_file:
+			header = repr({"descr": np.lib.format.dtype_to_descr(array.dtype), "fortran_order": False,\
+				"shape": array.shape})
+			header += "\n"
+			npy_file.write(np.lib.format.MAGIC_PREFIX + bytes([1, 0]) + len(header).to_bytes(2, "little"))
+			npy_file.write(header.encode("latin1"))
+			npy_file.write(np.ascontiguousarray(array).tobytes())
+		self.assertFalse(append_npy(path, array[:10]))
+		parts.append(get_rows(10, 100, ["cp_process"], 1))
+		store_dataset(self.path, *parts[-1], append=True)
+		self.check_dataset(parts)
+		self.assertEqual(read_schema(self.path)["generation"], 2)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,122 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# test_log_validator
+#
+# Tests for checking logs and the codes they're rejected with
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for running the tests (python -m unittest discover tests)
+import unittest
+# used for making raw logs
+import json
+# used for importing the modules in src
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from log_validator import extract_log_record, parse_log_record, parse_log_records, rejection_reasons, class_slots,\
+	player_stat_keys, medic_stat_keys, player_count
+
+# returns the json data of a valid sixes log with players [U:1:1] to [U:1:12], red first and in lineup order
+def get_log():
+	players = {}
+	for team in ["Red", "Blue"]:
+		for class_name, count in class_slots.items():
+			for _ in range(count):
+				player = {key: len(players) + 1 for key in player_stat_keys}
+				if class_name == "medic":
+					player.update({key: 1 for key in medic_stat_keys})
+				player["team"] = team
+				player["class_stats"] = [{"type": class_name}]
+				players[f"[U:1:{len(players) + 1}]"] = player
+	return {
+		"version": 3,
+		"teams": {"Red": {"score": 3}, "Blue": {"score": 2}},
+		"players": players,
+		"names": {sid3: f"player {i}" for i, sid3 in enumerate(players)},
+		"info": {"total_length": 1800, "map": "cp_process_final", "date": 1600000000}
+	}
+
+class LogValidatorTest(unittest.TestCase):
+	def assertRejected(self, data, rejection, sid3s=None):
+		record, code = extract_log_record(data, sid3s=sid3s)
+		self.assertIsNone(record)
+		self.assertEqual(code, rejection)
+		self.assertIn(code, rejection_reasons)
+
+	def test_valid_log(self):
+		record, rejection = extract_log_record(get_log())
+		self.assertIsNone(rejection)
+		self.assertEqual(record["players"], [f"[U:1:{i}]" for i in range(1, player_count + 1)])
+		self.assertEqual((record["gamemode"], record["map"]), ("cp", "cp_process"))
+		self.assertEqual(record["scores"], [3, 2])
+		self.assertEqual(record["stats"][0], 1800)
+
+	def test_lineup_order(self):
+		data = get_log()
+		# players are put in their team's slots no matter which team is listed first
+		players = list(data["players"].items())
+		data["players"] = dict(players[player_count // 2:] + players[:player_count // 2])
+		record, rejection = extract_log_record(data)
+		self.assertIsNone(rejection)
+		self.assertEqual(record["players"], [f"[U:1:{i}]" for i in range(1, player_count + 1)])
+
+	def test_missing_keys(self):
+		data = get_log()
+		del data["teams"]["Blue"]["score"]
+		self.assertRejected(data, "missing_blu_score")
+		data = get_log()
+		del data["info"]
+		self.assertRejected(data, "missing_info")
+
+	def test_bad_values(self):
+		data = get_log()
+		data["version"] = 2
+		self.assertRejected(data, "bad_version")
+		data = get_log()
+		data["teams"]["Red"]["score"] = 6
+		self.assertRejected(data, "bad_score")
+		data = get_log()
+		data["info"]["map"] = "process"
+		self.assertRejected(data, "no_gamemode")
+
+	def test_bad_players(self):
+		data = get_log()
+		del data["players"]["[U:1:12]"]
+		self.assertRejected(data, "bad_player_count")
+		data = get_log()
+		data["players"]["[U:1:3]"]["class_stats"][0]["type"] = "pyro"
+		self.assertRejected(data, "off_class")
+		data = get_log()
+		data["players"]["[U:1:3]"]["class_stats"][0]["type"] = "scout"
+		self.assertRejected(data, "bad_class_count")
+		data = get_log()
+		del data["players"]["[U:1:6]"]["ubers"]
+		self.assertRejected(data, "missing_medic_stat")
+		self.assertRejected(get_log(), "unlisted_player", sid3s={"[U:1:1]"})
+
+	def test_names_are_not_checked(self):
+		data = get_log()
+		del data["names"]["[U:1:1]"]
+		_, rejection = extract_log_record(data)
+		self.assertIsNone(rejection)
+
+	def test_parse_log_records(self):
+		raw_logs = [(1, json.dumps(get_log()).encode()), (2, b"{"), (3, None)]
+		results = list(parse_log_records(raw_logs))
+		self.assertEqual([(log_id, rejection) for log_id, _, rejection in results], [(1, None), (2, "bad_json"),\
+			(3, None)])
+		self.assertEqual(results[0][1], parse_log_record(raw_logs[0][1])[0])
+		self.assertIsNone(results[2][1])
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,96 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# test_pipeline
+#
+# Tests for only rebuilding the stages of the pipeline that are stale
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for running the tests (python -m unittest discover tests)
+import unittest
+# used for a temporary data folder
+import tempfile
+# used for importing the modules in src
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pipeline import Stage, Pipeline, hash_files, get_stage_code
+from collect_log_data import fetch_log_data, prepare_log_data
+
+class PipelineTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.manifest_path = f"{self.directory.name}/pipeline.json"
+		self.builds = []
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	# returns a stage whose output is a file with the contents of the files of the stages it depends on after it
+	def get_stage(self, name, depends=()):
+		path = f"{self.directory.name}/{name}"
+
+		def build():
+			self.builds.append(name)
+			contents = "".join(open(f"{self.directory.name}/{dependency}").read() for dependency in depends)
+			with open(path, "w") as output_file:
+				output_file.write(f"{contents}{name}\n")
+
+		return Stage(name, lambda: hash_files([path]), build=build, depends=depends)
+
+	def get_pipeline(self):
+		return Pipeline([self.get_stage("first"), self.get_stage("second", ["first"])], path=self.manifest_path)
+
+	def write(self, name, contents):
+		with open(f"{self.directory.name}/{name}", "w") as output_file:
+			output_file.write(contents)
+
+	def test_builds_only_stale_stages(self):
+		self.assertEqual(self.get_pipeline().run("second", verbose=False), ["first", "second"])
+		self.assertEqual(self.get_pipeline().run("second", verbose=False), [])
+		# a stage whose outputs were changed gets rebuilt, and since it's rebuilt into the same outputs the stages after
+		# it don't
+		self.write("first", "changed\n")
+		self.assertEqual(self.get_pipeline().run("second", verbose=False), ["first"])
+
+	def test_adopts_outputs_without_a_manifest(self):
+		# data made before there was a manifest
+		self.write("first", "first\n")
+		self.write("second", "first\nsecond\n")
+		pipeline = self.get_pipeline()
+		self.assertEqual(pipeline.status("second"), {"first": None, "second": None})
+		self.assertEqual(pipeline.run("second", verbose=False), [])
+		self.assertEqual(self.builds, [])
+		self.assertTrue(os.path.isfile(self.manifest_path))
+		# once they're adopted, changes are picked up like any other stage
+		self.write("second", "edited\n")
+		self.assertEqual(self.get_pipeline().run("second", verbose=False), ["second"])
+
+	def test_adopting_stops_at_built_stages(self):
+		self.write("first", "first\n")
+		self.write("second", "first\nsecond\n")
+		self.assertEqual(self.get_pipeline().run("second", force=["first"], verbose=False), ["first", "second"])
+
+	def test_stage_code_is_what_the_stage_runs(self):
+		records_code = get_stage_code([fetch_log_data])[0]
+		prepared_code = get_stage_code([prepare_log_data])[0]
+		self.assertIn("collect_log_data.encode_log_record", records_code)
+		self.assertIn("log_validator.extract_log_record", records_code)
+		self.assertIn("collect_log_data.encode_log_inputs", prepared_code)
+		self.assertIn("player_synergy._merge_pair_tables", prepared_code)
+		self.assertIn("feature_encoders.CategoryEncoder", prepared_code)
+		# changing how the data is prepared doesn't rebuild the dataset
+		self.assertNotIn("collect_log_data.prepare_log_data", records_code)
+		self.assertNotIn("collect_log_data.encode_log_inputs", records_code)
+
+if __name__ == "__main__":
+	unittest.main()
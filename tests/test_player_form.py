@@ -0,0 +1,73 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# test_player_form
+#
+# Tests for working out each player's form from only the matches they played before a match
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for running the tests (python -m unittest discover tests)
+import unittest
+# used for importing the modules in src
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+from log_records import players_per_log, stats_per_log
+from player_form import get_player_form, form_names
+
+# number of seconds in a day
+day = 24 * 60 * 60
+
+# returns random lineups, stats, and scores of matches from a pool of players, where a lot of matches are played at the
+# same time
+def get_matches(matches, pool, seed):
+	rng = np.random.default_rng(seed)
+	players = np.array([rng.choice(pool, players_per_log, replace=False) for _ in range(matches)])
+	timestamps = rng.integers(0, matches // 4, matches) * day
+	stats = rng.integers(1, 1000, (matches, stats_per_log))
+	scores = rng.integers(0, 6, (matches, 2))
+	return players, timestamps, stats, scores
+
+class PlayerFormTest(unittest.TestCase):
+	def test_same_time_matches_dont_see_each_other(self):
+		players = np.tile(np.arange(players_per_log), (3, 1))
+		timestamps = np.array([day, day, 2 * day])
+		stats = np.full((3, stats_per_log), 100)
+		scores = np.array([[5, 0], [5, 0], [0, 5]])
+		form = get_player_form(players, timestamps, stats, scores)
+		games = form[:, :, form_names.index("games")]
+		# neither of the first two matches counts towards the other
+		self.assertTrue(np.all(games[:2] == 0))
+		# both of them count towards the match after them (a little less after a day of decay)
+		self.assertTrue(np.all((games[2] > 1.9) & (games[2] < 2)))
+		self.assertTrue(np.allclose(form[2, :players_per_log // 2, form_names.index("win_rate")], 1))
+
+	def test_later_matches_dont_change_form(self):
+		players, timestamps, stats, scores = get_matches(200, np.arange(40), 0)
+		form = get_player_form(players, timestamps, stats, scores)
+		for cutoff in np.unique(timestamps)[::7]:
+			# every match up to a time gets the same form without the matches after it
+			rows = timestamps <= cutoff
+			past_form = get_player_form(players[rows], timestamps[rows], stats[rows], scores[rows])
+			self.assertTrue(np.allclose(past_form, form[rows]))
+
+	def test_order_of_rows(self):
+		players, timestamps, stats, scores = get_matches(100, np.arange(30), 1)
+		form = get_player_form(players, timestamps, stats, scores)
+		# the form of each match doesn't depend on what order the rows are in
+		order = np.random.default_rng(2).permutation(len(players))
+		shuffled_form = get_player_form(players[order], timestamps[order], stats[order], scores[order])
+		self.assertTrue(np.allclose(shuffled_form, form[order]))
+
+if __name__ == "__main__":
+	unittest.main()
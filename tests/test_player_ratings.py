@@ -0,0 +1,120 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# test_player_ratings
+#
+# Tests for rating players in the rows of the player encoder
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for running the tests (python -m unittest discover tests)
+import unittest
+# used for a temporary ratings file
+import tempfile
+# used for importing the modules in src
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+from feature_encoders import fit_encoder, unknown_code
+from log_records import players_per_log
+from player_ratings import RatingTracker, read_rating_tracker, get_player_ratings, initial_rating, initial_deviation,\
+	overall_column, class_columns, default_rating_period
+
+# returns random lineups of matches from a pool of players, with a match every day
+def get_matches(matches, pool, seed):
+	rng = np.random.default_rng(seed)
+	players = np.array([rng.choice(pool, players_per_log, replace=False) for _ in range(matches)])
+	timestamps = np.arange(matches) * 24 * 60 * 60
+	scores = rng.integers(0, 6, (matches, 2))
+	return players, timestamps, scores
+
+class RatingTrackerTest(unittest.TestCase):
+	def setUp(self):
+		self.players, self.timestamps, self.scores = get_matches(60, np.arange(100, 130), 0)
+		self.encoder = fit_encoder(self.players)
+		self.tracker = RatingTracker(self.encoder)
+		get_player_ratings(self.players, self.timestamps, self.scores, tracker=self.tracker)
+
+	def test_rows_are_encoder_codes(self):
+		self.assertEqual(self.tracker.ratings.shape[0], len(self.encoder) + 1)
+		lineup = self.players[0]
+		rows = self.encoder.encode(lineup)
+		# (in the next period, since matches in the last one are rated from where it started)
+		ratings, _ = self.tracker.get_ratings(lineup, self.timestamps[-1] + default_rating_period)
+		expected = (self.tracker.ratings[rows, overall_column] + self.tracker.ratings[rows, class_columns]) / 2
+		self.assertTrue(np.allclose(ratings[0], expected))
+		# every player the encoder knows has played, so only the unknown row is left at the initial rating
+		self.assertTrue(np.all(self.tracker.ratings[1:, overall_column] != initial_rating))
+
+	def test_unknown_players_are_rated_as_new(self):
+		unknown_players = np.arange(1000, 1000 + players_per_log)
+		ratings, deviations = self.tracker.get_ratings(unknown_players, self.timestamps[-1] + 1)
+		self.assertTrue(np.all(ratings == initial_rating))
+		self.assertTrue(np.all(deviations == initial_deviation))
+		self.assertTrue(np.all(self.tracker.ratings[unknown_code] == initial_rating))
+		self.assertTrue(np.all(self.tracker.deviations[unknown_code] == initial_deviation))
+
+	def test_update_adds_new_players(self):
+		new_players = np.arange(1000, 1000 + players_per_log)
+		old_ratings = self.tracker.ratings.copy()
+		self.tracker.update(new_players, self.timestamps[-1] + 1, [[5, 0]])
+		# the players the encoder knew keep their rows, and the new ones are rated in rows after them
+		self.assertEqual(self.tracker.player_encoder.classes[:len(self.encoder)], self.encoder.classes)
+		self.assertTrue(np.array_equal(self.tracker.ratings[:len(old_ratings)], old_ratings))
+		rows = self.tracker._get_rows(new_players)
+		self.assertTrue(np.all(rows > len(self.encoder)))
+		self.assertTrue(np.all(self.tracker.ratings[rows, overall_column] != initial_rating))
+		self.assertTrue(np.all(self.tracker.ratings[unknown_code] == initial_rating))
+
+	def test_updates_match_batch(self):
+		# four matches in each rating period, added one at a time
+		players, _, scores = get_matches(80, np.arange(200, 230), 1)
+		timestamps = np.arange(80) * 6 * 60 * 60
+		batch = RatingTracker(fit_encoder(players))
+		batch_ratings, batch_deviations = get_player_ratings(players, timestamps, scores, tracker=batch)
+		tracker = RatingTracker(fit_encoder(players))
+		for i in range(len(players)):
+			ratings, deviations = tracker.get_ratings(players[i], timestamps[i])
+			self.assertTrue(np.allclose(ratings[0], batch_ratings[i]))
+			self.assertTrue(np.allclose(deviations[0], batch_deviations[i]))
+			tracker.update(players[i], timestamps[i], scores[i:i+1])
+		self.assertTrue(np.allclose(tracker.ratings, batch.ratings))
+		self.assertTrue(np.allclose(tracker.deviations, batch.deviations))
+		with self.assertRaises(ValueError):
+			tracker.update(players[0], timestamps[0], scores[:1])
+
+	def test_store_and_read(self):
+		with tempfile.TemporaryDirectory() as directory:
+			path = f"{directory}/ratings.npz"
+			self.tracker.store(path)
+			tracker = read_rating_tracker(path, self.encoder)
+			self.assertTrue(np.array_equal(tracker.ratings, self.tracker.ratings))
+			self.assertTrue(np.array_equal(tracker.predict(self.players, self.timestamps[-1]),\
+				self.tracker.predict(self.players, self.timestamps[-1])))
+			with self.assertRaises(ValueError):
+				read_rating_tracker(path, fit_encoder(np.arange(5)))
+
+	def test_store_and_read_open_period(self):
+		players, timestamps, scores = self.players[:2], np.full(2, self.timestamps[-1] + 1), self.scores[:2]
+		self.tracker.update(players[0], timestamps[0], scores[:1])
+		with tempfile.TemporaryDirectory() as directory:
+			path = f"{directory}/ratings.npz"
+			self.tracker.store(path)
+			tracker = read_rating_tracker(path, self.encoder)
+		# the match added after reading is rated with the one added before storing, from the start of the period
+		self.tracker.update(players[1], timestamps[1], scores[1:])
+		tracker.update(players[1], timestamps[1], scores[1:])
+		self.assertTrue(np.allclose(tracker.ratings, self.tracker.ratings))
+		self.assertTrue(np.allclose(tracker.deviations, self.tracker.deviations))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,86 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# test_player_synergy
+#
+# Tests for working out how well each team's players have done together from only the matches before a match
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for running the tests (python -m unittest discover tests)
+import unittest
+# used for importing the modules in src
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+from feature_encoders import fit_encoder
+from log_records import players_per_log
+from player_synergy import get_player_synergy, get_synergy_matrices, get_synergy_features, synergy_names
+
+# number of seconds in a day
+day = 24 * 60 * 60
+
+# returns random lineups and scores of matches from a pool of players, where a lot of matches are played at the same
+# time
+def get_matches(matches, pool, seed):
+	rng = np.random.default_rng(seed)
+	players = np.array([rng.choice(pool, players_per_log, replace=False) for _ in range(matches)])
+	timestamps = rng.integers(0, matches // 4, matches) * day
+	scores = rng.integers(0, 6, (matches, 2))
+	return players, timestamps, scores
+
+class PlayerSynergyTest(unittest.TestCase):
+	def setUp(self):
+		self.players, self.timestamps, self.scores = get_matches(200, np.arange(24), 0)
+		self.encoder = fit_encoder(self.players)
+		self.synergy = get_player_synergy(self.players, self.timestamps, self.scores, player_encoder=self.encoder)
+
+	def test_same_time_matches_dont_see_each_other(self):
+		players = np.tile(np.arange(players_per_log), (3, 1))
+		timestamps = np.array([day, day, 2 * day])
+		scores = np.array([[5, 0], [5, 0], [0, 5]])
+		synergy = get_player_synergy(players, timestamps, scores)
+		games_together = synergy[:, :, synergy_names.index("games_together")]
+		# neither of the first two matches counts towards the other
+		self.assertTrue(np.all(games_together[:2] == 0))
+		self.assertTrue(np.all(synergy[:2, :, synergy_names.index("head_to_head_win_rate")] == 0.5))
+		# both of them count towards the match after them
+		self.assertTrue(np.all(games_together[2] == 2))
+		self.assertTrue(np.allclose(synergy[2, :, synergy_names.index("win_rate_together")], [1, 0]))
+		self.assertTrue(np.allclose(synergy[2, :, synergy_names.index("head_to_head_win_rate")], [1, 0]))
+
+	def test_later_matches_dont_change_synergy(self):
+		for cutoff in np.unique(self.timestamps)[::7]:
+			# every match up to a time gets the same synergy without the matches after it
+			rows = self.timestamps <= cutoff
+			past_synergy = get_player_synergy(self.players[rows], self.timestamps[rows], self.scores[rows],\
+				player_encoder=self.encoder)
+			self.assertTrue(np.allclose(past_synergy, self.synergy[rows]))
+
+	def test_period_doesnt_change_synergy(self):
+		# blocks of a day, where every block is a single time, and one block with every match in it
+		for period in [day, 1000 * day]:
+			synergy = get_player_synergy(self.players, self.timestamps, self.scores, period=period,\
+				player_encoder=self.encoder)
+			self.assertTrue(np.allclose(synergy, self.synergy))
+
+	def test_matches_matrices(self):
+		# each match's synergy is the same as looking it up in the matrices of every match before it
+		codes = self.encoder.encode(self.players)
+		for match in np.random.default_rng(1).choice(len(self.players), 10, replace=False):
+			matrices, _ = get_synergy_matrices(self.players, self.timestamps, self.scores,\
+				until=self.timestamps[match], player_encoder=self.encoder)
+			features = get_synergy_features(matrices, codes[match:match + 1])
+			self.assertTrue(np.allclose(features[0], self.synergy[match]))
+
+if __name__ == "__main__":
+	unittest.main()
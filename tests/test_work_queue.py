@@ -0,0 +1,116 @@
+########################################################################################################################
+#
+#
+# Goblin Net: Neural Networks that Predict the Outcome of competitive Team Fortress 2 Matches
+#
+# test_work_queue
+#
+# Tests for the work queue's leases and merging the shards of each batch
+#
+# Authors / Contributors:
+# Chandler Calkins
+#
+#
+########################################################################################################################
+
+# used for running the tests (python -m unittest discover tests)
+import unittest
+# used for pointing the merge at a temporary queue and catching what it stores
+from unittest import mock
+# used for a temporary queue and shards folder
+import tempfile
+# used for importing the modules in src
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+import distributed_collection
+from work_queue import WorkQueue
+from log_records import RecordBuilder, new_vocabularies, players_per_log, stats_per_log
+
+class WorkQueueTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.queue = WorkQueue(f"{self.directory.name}/queue.sqlite")
+		self.queue.populate(range(10), 4, settings={"incremental": False})
+
+	def tearDown(self):
+		self.queue.close()
+		self.directory.cleanup()
+
+	def test_batches(self):
+		self.assertEqual(self.queue.settings(), {"incremental": False})
+		claimed = [self.queue.claim("worker") for _ in range(3)]
+		self.assertEqual([log_ids for _, log_ids in claimed], [["0", "1", "2", "3"], ["4", "5", "6", "7"], ["8", "9"]])
+		self.assertIsNone(self.queue.claim("worker"))
+		self.assertEqual(self.queue.progress()["leased"], 3)
+
+	def test_lease_expiry(self):
+		# a lease that already ran out, like the lease of a worker that died
+		batch_id, log_ids = self.queue.claim("dead", lease_time=-1)
+		self.assertEqual(self.queue.progress()["pending"], 3)
+		self.assertEqual(self.queue.claim("alive"), (batch_id, log_ids))
+		# the worker that lost the lease can't renew or finish the batch anymore
+		self.assertFalse(self.queue.renew(batch_id, "dead"))
+		self.assertFalse(self.queue.complete(batch_id, "dead", "shard"))
+		self.assertTrue(self.queue.renew(batch_id, "alive"))
+		self.assertTrue(self.queue.complete(batch_id, "alive", "shard"))
+		self.assertEqual(self.queue.done_batches(), [(batch_id, "shard")])
+
+	def test_max_claims(self):
+		for _ in range(2):
+			batch_id, log_ids = self.queue.claim("worker", lease_time=-1, max_claims=2)
+		# the batch ran out of claims, so the next batch is claimed and it's given up on
+		self.assertNotEqual(self.queue.claim("worker", max_claims=2)[0], batch_id)
+		self.assertEqual(self.queue.failed_batches(), [(batch_id, log_ids)])
+
+class MergeShardsTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.queue_path = f"{self.directory.name}/queue.sqlite"
+		queue = WorkQueue(self.queue_path)
+		queue.populate(range(4), 2, settings={"incremental": False})
+		# each shard codes its maps in the order it found them
+		for maps in [["cp_process", "cp_gullywash"], ["koth_product", "cp_process"]]:
+			batch_id, log_ids = queue.claim("worker")
+			records = RecordBuilder()
+			vocabularies = new_vocabularies()
+			for log_id, map_name in zip(log_ids, maps):
+				records.append(used_logs=log_id, players=np.full(players_per_log, int(log_id)),\
+					gamemodes=vocabularies["gamemodes"].code(map_name.split("_")[0]),\
+					maps=vocabularies["maps"].code(map_name), timestamps=int(log_id), scores=[1, 0],\
+					stats=np.zeros(stats_per_log))
+			shard_path = f"{self.directory.name}/batch_{batch_id}.npz"
+			np.savez(shard_path, rejected_ids=np.array([], dtype=str), rejected_reasons=np.array([], dtype=str),\
+				**{f"{name}_values": np.array(vocabulary.values, dtype=str) for name, vocabulary in\
+				vocabularies.items()}, **records.finalize())
+			queue.complete(batch_id, "worker", shard_path)
+		queue.close()
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def test_codes_are_remapped(self):
+		with mock.patch.object(distributed_collection, "work_queue_path", self.queue_path),\
+			mock.patch.object(distributed_collection, "store_log_data") as store_log_data:
+			self.assertEqual(distributed_collection.merge_shards(verbose=False), 4)
+		records, vocabularies, rejected_logs = store_log_data.call_args.args
+		self.assertEqual(records["used_logs"].tolist(), ["0", "1", "2", "3"])
+		maps = np.array(vocabularies["maps"].values)[records["maps"].reshape(-1)]
+		self.assertEqual(maps.tolist(), ["cp_process", "cp_gullywash", "koth_product", "cp_process"])
+		gamemodes = np.array(vocabularies["gamemodes"].values)[records["gamemodes"].reshape(-1)]
+		self.assertEqual(gamemodes.tolist(), ["cp", "cp", "koth", "cp"])
+		self.assertEqual(rejected_logs, [])
+
+	def test_unfinished_batches(self):
+		queue = WorkQueue(self.queue_path)
+		queue.populate(range(4), 2)
+		queue.close()
+		with mock.patch.object(distributed_collection, "work_queue_path", self.queue_path):
+			with self.assertRaises(ValueError):
+				distributed_collection.merge_shards(verbose=False)
+
+if __name__ == "__main__":
+	unittest.main()